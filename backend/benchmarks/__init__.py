@@ -0,0 +1,3 @@
+"""Offline benchmarks and evaluation scripts for backend components.
+Run modules from the backend root, e.g. python -m benchmarks.fuzzy_benchmark.
+"""
@@ -0,0 +1,92 @@
+"""Benchmark IVF search against the flat FAISS scan as corpora grow.
+Reports build time, per-query latency and recall@k against the exact flat
+results at several corpus sizes and nprobe settings.
+
+Usage: python -m benchmarks.ann_benchmark [--pages 2000 7000] [--queries 200]
+"""
+
+import os
+import time
+import random
+import argparse
+from typing import List, Optional
+
+os.environ.setdefault("EMBEDDING_CACHE_BACKEND", "memory")
+
+from src.services.core_service.rag import HybridRAGService
+from benchmarks.quantization_recall import (
+    make_corpus,
+    make_queries,
+    recall,
+    search_ids,
+)
+
+# Pages per run; the synthetic pages split into about three chunks each
+PAGES = (2_000, 7_000, 20_000)
+NPROBES = (8, 32, 64)
+
+
+def service(k: int, ann_min_chunks: int, ivf_nprobe: int = 32) -> HybridRAGService:
+    """Create a local-embedding service that returns unthresholded hits."""
+    rag = HybridRAGService(
+        faiss_k=k,
+        ann_min_chunks=ann_min_chunks,
+        ivf_nprobe=ivf_nprobe,
+        embedding_provider="local",
+        quantization="none",
+        rerank_factor=0,
+    )
+    # Recall compares rankings, so no hit may be cut by the threshold
+    rag.faiss_score_threshold = float("-inf")
+    return rag
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse arguments, run every corpus size and print a results table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=list(PAGES))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    print(
+        f"{'chunks':>8} {'index':>10} {'build ms':>9} "
+        f"{'ms/query':>9} {f'recall@{args.k}':>10}"
+    )
+    for pages in args.pages:
+        flat = service(args.k, ann_min_chunks=0)
+        child_docs, _ = flat._build_child_documents(make_corpus(pages, rng))
+        queries = [
+            flat.embeddings.embed_query(query)
+            for query in make_queries(child_docs, args.queries, rng)
+        ]
+        vectors = flat.embeddings.embed_documents(
+            [doc.page_content for doc in child_docs]
+        )
+
+        start = time.perf_counter()
+        store = flat._vectorstore_from_vectors(child_docs, vectors)
+        build_ms = (time.perf_counter() - start) * 1000
+        truth, ms = search_ids(flat, store, queries)
+        print(
+            f"{len(child_docs):>8} {'flat':>10} {build_ms:>9.0f} "
+            f"{ms:>9.2f} {1.0:>10.3f}"
+        )
+
+        ivf = service(args.k, ann_min_chunks=1)
+        start = time.perf_counter()
+        store = ivf._vectorstore_from_vectors(child_docs, vectors)
+        build_ms = (time.perf_counter() - start) * 1000
+        for nprobe in NPROBES:
+            ivf.ivf_nprobe = nprobe
+            found, ms = search_ids(ivf, store, queries)
+            print(
+                f"{len(child_docs):>8} {f'ivf/{nprobe}':>10} {build_ms:>9.0f} "
+                f"{ms:>9.2f} {recall(truth, found):>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Measure how the chunk candidate pool size affects parent retrieval.
+Pulls bm25_k = faiss_k chunk hits per query at several pool sizes, folds
+them into parents with each chunk aggregation, and reports recall and MRR
+of the queried page among the returned parents, plus query latency. A
+share of long pages lets one parent fill a small pool on its own.
+
+Usage: python -m benchmarks.candidate_pool [--pages 1000] [--parents 5]
+"""
+
+import os
+import time
+import random
+import argparse
+from typing import List, Optional
+
+os.environ.setdefault("EMBEDDING_CACHE_BACKEND", "memory")
+
+from src.services.core_service.fusion import RankFusion
+from src.services.core_service.rag import HybridRAGService
+from benchmarks.fusion_eval import evaluate, make_corpus, make_labeled_queries
+
+POOLS = (3, 10, 30, 100)
+AGGREGATIONS = ("max", "sum")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse arguments, sweep pool size and aggregation, print a table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--parents", type=int, default=5)
+    parser.add_argument("--long-share", type=float, default=0.15)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    rag = HybridRAGService(
+        parent_k=args.parents,
+        embedding_provider="local",
+        quantization="none",
+        rerank_factor=0,
+    )
+    index = rag.build_index(make_corpus(args.pages, rng, args.long_share))
+    queries = make_labeled_queries(index, args.queries, rng)
+    print(f"{len(index.child_docs)} chunks in {len(index.parents)} pages")
+
+    print(
+        f"{'pool':>5} {'aggregate':>9} {'parents':>8} {'MRR':>7} "
+        f"{f'recall@{args.parents}':>9} {'ms/query':>9}"
+    )
+    for pool in POOLS:
+        for aggregation in AGGREGATIONS:
+            rag.bm25_k = rag.faiss_k = pool
+            rag.fusion = RankFusion(aggregation=aggregation)
+            returned = sum(
+                len(rag.retrieve_parents(query, index=index)) for query, _ in queries
+            )
+            start = time.perf_counter()
+            result = evaluate(rag, index, queries, args.parents)
+            ms = (time.perf_counter() - start) / len(queries) * 1000
+            print(
+                f"{pool:>5} {aggregation:>9} {returned / len(queries):>8.2f} "
+                f"{result['mrr']:>7.3f} {result['recall']:>9.3f} {ms:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Compare BM25/FAISS fusion methods on a synthetic history corpus.
+Each query is a remembered snippet of one page, sometimes with a typo or
+reduced to its topic words, and that page is the only relevant parent.
+Reports MRR and recall@k of the page, how often the top parent is marked
+dominant, and how often a dominant parent is the right one.
+
+Usage: python -m benchmarks.fusion_eval [--pages 1000] [--margin 0.25]
+"""
+
+import os
+import random
+import argparse
+from typing import List, Optional, Tuple, get_args
+
+os.environ.setdefault("EMBEDDING_CACHE_BACKEND", "memory")
+
+from langchain_core.documents import Document
+
+from src.services.core_service.fusion import FusionMethod, RankFusion
+from src.services.core_service.rag import HybridIndex, HybridRAGService
+from benchmarks.quantization_recall import FILLER, TOPICS
+
+SYLLABLES = "ka lo mi ren tso vu pa ne ri sho ta gu bel dor fin".split()
+
+
+def make_corpus(
+    pages: int, rng: random.Random, long_share: float = 0.0
+) -> List[Document]:
+    """Generate pages of topic words, filler and a few page-specific terms.
+    The specific terms stand in for names and titles that set real pages
+    apart from others on the same topic. A long_share of pages are six
+    times longer, like documentation or long-form articles.
+    """
+    names = sorted(
+        {"".join(rng.choices(SYLLABLES, k=rng.randint(2, 3))) for _ in range(4000)}
+    )
+    docs = []
+    for n in range(pages):
+        topic = rng.choice(sorted(TOPICS))
+        vocab = TOPICS[topic].split()
+        own = rng.sample(names, k=6)
+        length = rng.randint(60, 160) * (6 if rng.random() < long_share else 1)
+        words = []
+        for _ in range(length):
+            roll = rng.random()
+            pool = own if roll < 0.15 else vocab if roll < 0.5 else FILLER
+            words.append(rng.choice(pool))
+        docs.append(
+            Document(
+                page_content=" ".join(words),
+                metadata={"source": f"https://example.com/{topic}/{n}"},
+            )
+        )
+    return docs
+
+
+def make_labeled_queries(
+    index: HybridIndex, count: int, rng: random.Random
+) -> List[Tuple[str, str]]:
+    """Sample (query, source) pairs from random chunks of the index."""
+    queries = []
+    for _ in range(count):
+        chunk = rng.choice(index.child_docs)
+        words = chunk.page_content.split()
+        start = rng.randrange(max(1, len(words) - 6))
+        words = words[start : start + rng.randint(3, 6)]
+        roll = rng.random()
+        if roll < 0.3:
+            # Misremembered spelling of one word
+            i = rng.randrange(len(words))
+            if len(words[i]) > 4:
+                j = rng.randrange(1, len(words[i]) - 1)
+                words[i] = words[i][:j] + words[i][j + 1 :]
+        elif roll < 0.6:
+            words = [w for w in words if w not in FILLER] or words
+        source = index.parents[chunk.metadata["parent_id"]].metadata["source"]
+        queries.append((" ".join(words), source))
+    return queries
+
+
+def evaluate(
+    rag: HybridRAGService,
+    index: HybridIndex,
+    queries: List[Tuple[str, str]],
+    k: int,
+) -> dict:
+    """Run every query and score the rank of its source page."""
+    reciprocal = hits = dominant = dominant_right = 0.0
+    for query, source in queries:
+        ranked: List[Document] = rag.retrieve_parents(query, index=index)
+        sources = [doc.metadata["source"] for doc in ranked]
+        if source in sources:
+            rank = sources.index(source) + 1
+            reciprocal += 1 / rank
+            hits += rank <= k
+        if ranked and ranked[0].metadata["dominant"]:
+            dominant += 1
+            dominant_right += sources[0] == source
+    return {
+        "mrr": reciprocal / len(queries),
+        "recall": hits / len(queries),
+        "dominant": dominant / len(queries),
+        "precision": dominant_right / dominant if dominant else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse arguments, evaluate every fusion method and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--margin", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    rag = HybridRAGService(
+        bm25_k=args.k * 2,
+        faiss_k=args.k * 2,
+        embedding_provider="local",
+        quantization="none",
+        rerank_factor=0,
+    )
+    index = rag.build_index(make_corpus(args.pages, rng))
+    queries = make_labeled_queries(index, args.queries, rng)
+
+    print(
+        f"{'method':>8} {'MRR':>7} {f'recall@{args.k}':>9} "
+        f"{'dominant':>9} {'dom. precision':>15}"
+    )
+    for method in get_args(FusionMethod):
+        rag.fusion = RankFusion(method=method, dominance_margin=args.margin)
+        result = evaluate(rag, index, queries, args.k)
+        precision = result["precision"]
+        print(
+            f"{method:>8} {result['mrr']:>7.3f} {result['recall']:>9.3f} "
+            f"{result['dominant']:>9.2f} "
+            f"{'-' if precision is None else f'{precision:.3f}':>15}"
+        )
+
+
+if __name__ == "__main__":
+    main()
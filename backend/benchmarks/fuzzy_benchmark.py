@@ -0,0 +1,106 @@
+"""Benchmark the FuzzyIndex against the difflib typo-expansion path.
+Reports build time, per-token lookup latency and result agreement at
+1k, 10k and 100k vocabulary sizes.
+
+Usage: python -m benchmarks.fuzzy_benchmark [--sizes 1000 10000] [--queries 300]
+"""
+
+import time
+import random
+import difflib
+import argparse
+from typing import List, Optional, Set
+
+from src.services.core_service.fuzzy import FuzzyIndex
+
+LETTERS = "etaoinshrdlcumwfgypbvkjxqz0123456789"
+WEIGHTS = [12, 9, 8, 7, 7, 7, 6, 6, 6, 4, 4, 3, 3, 2, 2, 2, 2, 2, 2, 1.5]
+WEIGHTS += [1, 0.8, 0.2, 0.2, 0.1, 0.1] + [0.3] * 10
+SIZES = (1_000, 10_000, 100_000)
+
+
+def make_vocabulary(size: int, rng: random.Random) -> Set[str]:
+    """Generate a vocabulary of roughly English-shaped tokens."""
+    vocab: Set[str] = set()
+    while len(vocab) < size:
+        length = rng.randint(2, 14)
+        vocab.add("".join(rng.choices(LETTERS, WEIGHTS, k=length)))
+    return vocab
+
+
+def make_typo(word: str, rng: random.Random) -> str:
+    """Apply one random deletion, insertion, substitution or swap."""
+    i = rng.randrange(len(word))
+    op = rng.choice("dist")
+    if op == "d":
+        return word[:i] + word[i + 1 :]
+    if op == "i":
+        return word[:i] + rng.choice(LETTERS) + word[i:]
+    if op == "s":
+        return word[:i] + rng.choice(LETTERS) + word[i + 1 :]
+    return word[:i] + word[i + 1 : i + 2] + word[i : i + 1] + word[i + 2 :]
+
+
+def make_queries(vocab: Set[str], count: int, rng: random.Random) -> List[str]:
+    """Mix typo'd vocabulary words, exact hits and unrelated tokens."""
+    words = sorted(vocab)
+    queries = [make_typo(rng.choice(words), rng) for _ in range(count * 7 // 10)]
+    queries += [rng.choice(words) for _ in range(count // 10)]
+    queries += list(make_vocabulary(count - len(queries), rng))
+    return queries
+
+
+def run(size: int, queries: int, rng: random.Random, cutoff: float = 0.8) -> dict:
+    """Benchmark one vocabulary size and return the measurements."""
+    vocab = make_vocabulary(size, rng)
+    tokens = make_queries(vocab, queries, rng)
+
+    start = time.perf_counter()
+    index = FuzzyIndex(vocab, cutoff=cutoff)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    baseline = []
+    for token in tokens:
+        matches = difflib.get_close_matches(token, vocab, n=1, cutoff=cutoff)
+        baseline.append(matches[0] if matches else None)
+    difflib_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [index.closest(token, cutoff=cutoff) for token in tokens]
+    index_s = time.perf_counter() - start
+
+    agree = sum(a == b for a, b in zip(baseline, indexed))
+    return {
+        "size": size,
+        "build_ms": build_s * 1000,
+        "difflib_us": difflib_s / len(tokens) * 1e6,
+        "index_us": index_s / len(tokens) * 1e6,
+        "speedup": difflib_s / index_s if index_s else float("inf"),
+        "agreement": agree / len(tokens),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse arguments, run every size and print a results table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    header = f"{'vocab':>8} {'build ms':>9} {'difflib us/tok':>15} "
+    header += f"{'index us/tok':>13} {'speedup':>8} {'agreement':>10}"
+    print(header)
+    for size in args.sizes:
+        row = run(size, args.queries, rng)
+        print(
+            f"{row['size']:>8} {row['build_ms']:>9.1f} {row['difflib_us']:>15.1f} "
+            f"{row['index_us']:>13.1f} {row['speedup']:>7.1f}x "
+            f"{row['agreement']:>9.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
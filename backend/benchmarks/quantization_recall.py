@@ -0,0 +1,139 @@
+"""Evaluate quantized FAISS indexes against the flat index.
+Builds a synthetic browsing-history corpus, embeds it with the offline
+hashing embedder and reports index size, compression and recall@k of the
+SQ8 and PQ indexes, with and without exact re-ranking. Sizes include the
+float16 vectors that re-ranking stores beside the codes.
+
+Usage: python -m benchmarks.quantization_recall [--pages 1500] [--queries 200]
+"""
+
+import os
+import time
+import random
+import argparse
+from typing import List, Optional, Set
+
+os.environ.setdefault("EMBEDDING_CACHE_BACKEND", "memory")
+
+import faiss
+from langchain_core.documents import Document
+
+from src.services.core_service.rag import HybridRAGService
+
+TOPICS = {
+    "python": "asyncio coroutine generator decorator typing dataclass pytest wheel",
+    "cooking": "sourdough starter braise saute umami marinade knead oven skillet",
+    "travel": "itinerary layover hostel visa passport railpass museum ferry",
+    "finance": "dividend etf portfolio inflation bond yield brokerage index",
+    "fitness": "deadlift cadence tempo mobility protein hypertrophy interval",
+    "music": "chord arpeggio tempo synth reverb vinyl album playlist concert",
+    "gardening": "compost mulch perennial seedling pruning trellis soil aphid",
+    "astronomy": "nebula telescope eclipse exoplanet orbit galaxy redshift comet",
+}
+FILLER = "the a of to and in for with how guide best review tips why what new".split()
+CONFIGS = (("sq8", 0), ("sq8", 4), ("pq", 0), ("pq", 4))
+
+
+def make_corpus(pages: int, rng: random.Random) -> List[Document]:
+    """Generate history pages that mix one or two topics with filler."""
+    vocab = {name: words.split() for name, words in TOPICS.items()}
+    docs = []
+    for n in range(pages):
+        topics = rng.sample(sorted(vocab), k=rng.choice((1, 1, 2)))
+        words = []
+        for _ in range(rng.randint(60, 160)):
+            pool = vocab[rng.choice(topics)] if rng.random() < 0.45 else FILLER
+            words.append(rng.choice(pool))
+        docs.append(
+            Document(
+                page_content=" ".join(words),
+                metadata={"source": f"https://example.com/{topics[0]}/{n}"},
+            )
+        )
+    return docs
+
+
+def make_queries(chunks: List[Document], count: int, rng: random.Random) -> List[str]:
+    """Sample short queries from random chunks, like remembered snippets."""
+    queries = []
+    for _ in range(count):
+        words = rng.choice(chunks).page_content.split()
+        start = rng.randrange(max(1, len(words) - 6))
+        queries.append(" ".join(words[start : start + rng.randint(3, 6)]))
+    return queries
+
+
+def search_ids(
+    service: HybridRAGService, vectorstore, queries: List[List[float]], exact=None
+) -> tuple:
+    """Return the hit ids per query vector and the mean latency in ms."""
+    start = time.perf_counter()
+    hits = [
+        {doc.id for doc, _ in service._semantic_search(vectorstore, query, exact)}
+        for query in queries
+    ]
+    return hits, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def recall(truth: List[Set[str]], found: List[Set[str]]) -> float:
+    """Average fraction of the flat top-k that the candidate also returned."""
+    scores = [len(t & f) / len(t) for t, f in zip(truth, found) if t]
+    return sum(scores) / len(scores) if scores else 0.0
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse arguments, evaluate every configuration and print a table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=1500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    rng = random.Random(args.seed)
+
+    def service(quantization: str = "none", rerank_factor: int = 0):
+        rag = HybridRAGService(
+            faiss_k=args.k,
+            embedding_provider="local",
+            quantization=quantization,
+            rerank_factor=rerank_factor,
+        )
+        # Recall compares rankings, so no hit may be cut by the threshold
+        rag.faiss_score_threshold = float("-inf")
+        return rag
+
+    flat = service()
+    child_docs, _ = flat._build_child_documents(make_corpus(args.pages, rng))
+    queries = [
+        flat.embeddings.embed_query(query)
+        for query in make_queries(child_docs, args.queries, rng)
+    ]
+    vectors = flat.embeddings.embed_documents([doc.page_content for doc in child_docs])
+
+    store = flat._vectorstore_from_vectors(child_docs, vectors)
+    flat_bytes = len(faiss.serialize_index(store.index))
+    truth, flat_ms = search_ids(flat, store, queries)
+
+    print(f"{len(child_docs)} chunks, {len(queries)} queries, k={args.k}")
+    print(
+        f"{'index':>10} {'bytes':>10} {'smaller':>8} "
+        f"{f'recall@{args.k}':>10} {'ms/query':>9}"
+    )
+    print(f"{'flat':>10} {flat_bytes:>10} {1.0:>7.1f}x {1.0:>10.3f} {flat_ms:>9.2f}")
+    for quantization, rerank_factor in CONFIGS:
+        rag = service(quantization, rerank_factor)
+        store = rag._vectorstore_from_vectors(child_docs, vectors)
+        exact = rag._exact_vectors(vectors)
+        # Re-ranking keeps its vectors beside the codes, so they count too
+        size = len(faiss.serialize_index(store.index))
+        size += 0 if exact is None else exact.nbytes
+        found, ms = search_ids(rag, store, queries, exact)
+        name = quantization + (f"+rr{rerank_factor}" if rerank_factor else "")
+        print(
+            f"{name:>10} {size:>10} {flat_bytes / size:>7.1f}x "
+            f"{recall(truth, found):>10.3f} {ms:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
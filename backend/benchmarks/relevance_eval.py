@@ -0,0 +1,132 @@
+"""Evaluate local relevance filtering against a labeled fixture set.
+Indexes the fixture pages, retrieves candidates for every labeled query as
+a search would, and reports how often the local scorer skips the LLM judge
+and how well its kept/dropped decisions agree with the labels.
+Run it with the provider's embeddings and record the chosen threshold and
+margin in relevance.CALIBRATIONS, or in RELEVANCE_THRESHOLD and
+RELEVANCE_MARGIN for a deployment; until then that provider always uses
+the judge.
+
+Usage: python -m benchmarks.relevance_eval [--provider local] [--threshold 0.35]
+"""
+
+import os
+import json
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+os.environ.setdefault("EMBEDDING_CACHE_BACKEND", "memory")
+
+from langchain_core.documents import Document
+
+from src.services.core_service.rag import HybridRAGService
+from src.services.post_processing_service.post_processing import PostProcessing
+from src.services.post_processing_service.relevance import (
+    CALIBRATIONS,
+    LocalRelevanceScorer,
+)
+
+FIXTURE = Path(__file__).parent / "fixtures" / "relevance.json"
+# Remote embeddings have much higher baseline cosines than the local ones
+THRESHOLDS = (0.3, 0.35, 0.4, 0.45, 0.5, 0.6, 0.7, 0.8)
+MARGINS = (0.0, 0.05, 0.1, 0.15, 0.2)
+
+
+class NoJudge:
+    """LLM provider placeholder; the eval only exercises the local path."""
+
+    def all(self) -> Dict:
+        """Return no models."""
+        return {}
+
+
+def load_candidates(rag: HybridRAGService, fixture: dict) -> List[tuple]:
+    """Retrieve and prepare the judge candidates of every labeled query."""
+    parents = [
+        Document(
+            page_content=page["content"],
+            metadata={"source": page["url"], "date": page["date"]},
+        )
+        for page in fixture["pages"]
+    ]
+    index = rag.build_index(parents)
+    prep = PostProcessing(llm_provider=NoJudge())
+    cases = []
+    for case in fixture["queries"]:
+        docs = rag.retrieve_parents(case["query"], index=index)
+        if not docs:
+            continue
+        _, candidates, _ = prep._candidates(docs[0].metadata["source"], docs)
+        cases.append((case["query"], candidates, set(case["relevant"])))
+    return cases
+
+
+def evaluate(
+    scorer: LocalRelevanceScorer, cases: List[tuple]
+) -> Dict[str, Optional[float]]:
+    """Run the scorer over every case and compare local decisions to labels.
+    Agreement counts the non-summarized candidates whose kept/dropped
+    decision matches the label, over locally decided queries only.
+    """
+    agree = total = exact = local = 0
+    for query, candidates, relevant in cases:
+        kept = scorer.filter(candidates)
+        if kept is None:
+            continue
+        local += 1
+        kept_sources = {c["metadata"]["source"] for c in kept}
+        matches = [
+            (c["metadata"]["source"] in kept_sources)
+            == (c["metadata"]["source"] in relevant)
+            for c in candidates[1:]
+        ]
+        agree += sum(matches)
+        total += len(matches)
+        exact += all(matches)
+    return {
+        "skip_rate": local / len(cases) if cases else 0.0,
+        "agreement": agree / total if total else None,
+        "exact": exact / local if local else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse arguments, sweep threshold and margin and print a results table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fixture", type=Path, default=FIXTURE)
+    parser.add_argument("--provider", default="local")
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    fixture = json.loads(args.fixture.read_text())
+    rag = HybridRAGService(
+        bm25_k=args.k,
+        faiss_k=args.k,
+        embedding_provider=args.provider,
+        rerank_factor=0,
+    )
+    cases = load_candidates(rag, fixture)
+    candidates = sum(len(c) - 1 for _, c, _ in cases)
+    print(f"{len(cases)} queries, {candidates} candidates besides the summarized page")
+    print(f"{args.provider} calibration: {CALIBRATIONS.get(args.provider)}")
+
+    print(
+        f"{'threshold':>9} {'margin':>7} {'skip rate':>10} {'agreement':>10} {'exact':>7}"
+    )
+    thresholds = THRESHOLDS if args.threshold is None else (args.threshold,)
+    for threshold in thresholds:
+        for margin in MARGINS:
+            scorer = LocalRelevanceScorer(threshold=threshold, margin=margin)
+            result = evaluate(scorer, cases)
+            agreement, exact = result["agreement"], result["exact"]
+            print(
+                f"{threshold:>9.2f} {margin:>7.2f} {result['skip_rate']:>10.2f} "
+                f"{'-' if agreement is None else f'{agreement:.3f}':>10} "
+                f"{'-' if exact is None else f'{exact:.3f}':>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
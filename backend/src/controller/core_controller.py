@@ -3,15 +3,29 @@ Core API routes that mirror the legacy Flask endpoints.
 """
 
 import os
+import hmac
 import json
+import uuid
+import asyncio
 import redis
-from typing import Any, Dict
+import redis.asyncio as aioredis
+from typing import Any, Dict, List, Literal, Optional
 from dotenv import load_dotenv
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, status
 from fastapi.responses import StreamingResponse
 
 from src.models.core import DataRequest, SearchRequest, SearchResponse
-from src.services.core_service.main import Retrieval, CoreRetrieval
+from src.services.core_service.main import CoreRetrieval
+from src.services.core_service.answer_cache import AnswerCache
+from src.services.core_service.corpus_store import (
+    SUMMARY_FIELDS,
+    CorpusStore,
+    content_digest,
+)
+from src.services.core_service.index_store import DiskIndexStore, IndexStore
+from src.services.core_service.ingest import IngestError, NdjsonIngestor
+from src.utility.provider import EmbeddingsProvider
+from src.utility.path_finder import Finder
 from src.utility.logger import AppLogger
 
 logger = AppLogger.get_logger(__name__)
@@ -20,47 +34,392 @@ load_dotenv()
 
 redis_host = os.getenv("REDIS_HOST")
 redis_port = os.getenv("REDIS_PORT")
+data_ttl = 3600
 
+# Corpora, indexes and vectors are all binary, so responses are not decoded
 redis_client = redis.Redis(
     host=redis_host,
     port=int(redis_port) if redis_port else None,
     db=0,
-    decode_responses=True,
+    decode_responses=False,
+)
+
+async_redis_client = aioredis.Redis(
+    host=redis_host,
+    port=int(redis_port) if redis_port else 6379,
+    db=0,
+    decode_responses=False,
 )
 
+corpus_store = CorpusStore(
+    client=redis_client,
+    async_client=async_redis_client,
+    ttl=data_ttl,
+)
+
+# INDEX_STORE_BACKEND=disk keeps indexes as memory-mapped files on this node
+index_resident_bytes = int(os.getenv("INDEX_RESIDENT_MAX_BYTES") or 512 * 1024 * 1024)
+if os.getenv("INDEX_STORE_BACKEND") == "disk":
+    index_store = DiskIndexStore(
+        root=Finder().get_directory(name="indexes"),
+        ttl=data_ttl,
+        max_resident_bytes=index_resident_bytes,
+    )
+else:
+    index_store = IndexStore(
+        client=redis_client,
+        async_client=async_redis_client,
+        ttl=data_ttl,
+        max_resident_bytes=index_resident_bytes,
+    )
+
+semantic_threshold = os.getenv("ANSWER_CACHE_SIMILARITY")
+answer_cache = AnswerCache(
+    client=redis_client,
+    async_client=async_redis_client,
+    ttl=data_ttl,
+    similarity_threshold=float(semantic_threshold) if semantic_threshold else None,
+)
+
+ingestor = NdjsonIngestor()
+
+# Metrics are process-wide, so they are only served to holders of this token
+metrics_token = os.getenv("METRICS_TOKEN")
+
 router = APIRouter(prefix="/v1", tags=["Core"])
 
 
+def get_retrieval_service(request: Request) -> CoreRetrieval:
+    """Return the CoreRetrieval built at application startup.
+    The instance lives on the ServiceContainer in app.state, so the
+    service layer never sees the FastAPI request.
+    """
+    return request.app.state.services.core
+
+
+def require_metrics_token(authorization: Optional[str] = Header(default=None)):
+    """Admit only requests bearing METRICS_TOKEN.
+    The endpoint does not exist while no token is configured.
+    """
+    if not metrics_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not hmac.compare_digest(authorization or "", f"Bearer {metrics_token}"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+def _build_and_store_index(
+    service: CoreRetrieval, user_id: str, flag: str, history: list
+) -> None:
+    """Build the hybrid index for freshly saved data and persist it.
+    On failure the stale index is dropped so searches use the raw data.
+    """
+    try:
+        index = service.build_index(history=history, flag=flag)
+        index_store.save(user_id, flag, index)
+    except Exception as exc:
+        logger.warning(f"Index build failed for {user_id}:{flag}: {exc}")
+        index_store.delete(user_id, flag)
+
+
+def _load_index(
+    service: CoreRetrieval, user_id: str, flag: str, writable: bool = False
+):
+    """Load the prebuilt index for a user, or None if unavailable.
+    Pass writable=True to get a private copy that may be upserted.
+    """
+    try:
+        return index_store.load(
+            user_id, flag, service.rag.embeddings, writable=writable
+        )
+    except Exception as exc:
+        logger.warning(f"Failed to load index for {user_id}:{flag}: {exc}")
+        return None
+
+
+async def _aload_index(service: CoreRetrieval, user_id: str, flag: str):
+    """Async variant of _load_index for the async search endpoints."""
+    try:
+        return await index_store.aload(user_id, flag, service.rag.embeddings)
+    except Exception as exc:
+        logger.warning(f"Failed to load index for {user_id}:{flag}: {exc}")
+        return None
+
+
+def _load_history(user_id: str, flag: str) -> list:
+    """Load the raw history items stored for a user/flag key."""
+    return corpus_store.load(user_id, flag)
+
+
+async def _aload_history(user_id: str, flag: str) -> list:
+    """Async variant of _load_history."""
+    return await corpus_store.aload(user_id, flag)
+
+
+def _replace_data(
+    service: CoreRetrieval, user_id: str, flag: str, history: List[dict]
+) -> int:
+    """Store a full corpus and build its index; returns the item count."""
+    corpus_store.save(user_id, flag, history)
+    _build_and_store_index(service, user_id, flag, history)
+    return len(history)
+
+
+def _upsert_index(
+    service: CoreRetrieval,
+    user_id: str,
+    flag: str,
+    changed: List[dict],
+    corpus: List[dict],
+) -> None:
+    """Apply changed items to the stored index of a saved corpus.
+    Falls back to a full build when there is no index or the upsert fails.
+    """
+    index = _load_index(service, user_id, flag, writable=True)
+    if index is None:
+        _build_and_store_index(service, user_id, flag, corpus)
+        return
+
+    try:
+        index = service.upsert_index(index, changed=changed, flag=flag, corpus=corpus)
+        index_store.save(user_id, flag, index)
+    except Exception as exc:
+        logger.warning(f"Index upsert failed for {user_id}:{flag}: {exc}")
+        _build_and_store_index(service, user_id, flag, corpus)
+
+
+def _upsert_data(
+    service: CoreRetrieval, user_id: str, flag: str, incoming: List[dict]
+) -> int:
+    """Merge a delta payload into the stored corpus and its index.
+    Only new or changed items are re-indexed; returns how many there were.
+    """
+    # Stored digests tell whether anything changed without reading content
+    _, changed = service.merge_history(
+        stored=corpus_store.load(user_id, flag, fields=SUMMARY_FIELDS),
+        incoming=incoming,
+    )
+    if not changed:
+        corpus_store.touch(user_id, flag)
+        index_store.touch(user_id, flag)
+        answer_cache.touch(user_id, flag)
+        return 0
+
+    merged, changed = service.merge_history(
+        stored=_load_history(user_id, flag), incoming=incoming
+    )
+    corpus_store.save(user_id, flag, merged)
+    _upsert_index(service, user_id, flag, changed, merged)
+    return len(changed)
+
+
+SAVE_MODES = {"replace": _replace_data, "upsert": _upsert_data}
+
+
+def _save_history(
+    service: CoreRetrieval, user_id: str, flag: str, mode: str, history: List[dict]
+) -> int:
+    """Replace or upsert the stored corpus and rotate cached answers.
+    A replace always rotates them, even with no items, since the corpus
+    they were answered from is gone. Saves of one user and flag hold a
+    lock, so none of them works from a corpus another is changing.
+    Returns how many items were saved or changed.
+    """
+    with corpus_store.lock(user_id, flag):
+        updated = SAVE_MODES[mode](service, user_id, flag, history)
+        if mode == "replace" or updated:
+            answer_cache.invalidate(user_id, flag)
+    return updated
+
+
 @router.post("/save-data", response_model=Dict[str, Any])
-def save_data(payload: DataRequest):
+def save_data(
+    payload: DataRequest,
+    service: CoreRetrieval = Depends(get_retrieval_service),
+):
     """Persist user history/bookmark data to Redis with a short TTL.
-    Uses the payload user_id and flag to build a stable Redis key.
+    Items are stored as compressed columns under a per-user/flag key.
+    Builds and stores the hybrid index so searches can reuse it.
+    In upsert mode only new or changed items are merged and indexed.
+    A replace, or an upsert that changes anything, rotates the corpus
+    version, invalidating cached answers.
     """
     try:
-        redis_key = f"user:{payload.user_id}:{payload.flag}"
-        redis_client.set(redis_key, payload.json(), ex=3600)
+        history = [item.model_dump() for item in payload.data]
+        updated = _save_history(
+            service, payload.user_id, payload.flag, payload.mode, history
+        )
 
-        return {"success": True, "message": "Data saved successfully"}
+        return {
+            "success": True,
+            "message": "Data saved successfully",
+            "updated": updated,
+        }
 
     except Exception as exc:
         logger.error(f"Error saving data: {exc}", "red")
         raise HTTPException(status_code=500, detail="Failed to save user data")
 
 
+class StreamedSave:
+    """Stage a streamed upload and publish it once the body is complete.
+    Each batch is written to a staging corpus as one more segment and its
+    chunks are embedded into the embedding cache, so streaming holds no
+    more than a batch. commit then indexes the staged corpus in one pass,
+    collapsing duplicates and building the lexical parts as a plain save
+    does, with vectors read back from the cache. Until then searches see
+    the previous data, and discard drops what a failed upload staged.
+    """
+
+    def __init__(self, service: CoreRetrieval, user_id: str, flag: str, mode: str):
+        """Start a replace or upsert upload. An upsert reads the stored
+        digests once, up front, to skip unchanged items.
+        """
+        self.service = service
+        self.user_id = user_id
+        self.flag = flag
+        self.mode = mode
+        self.token = uuid.uuid4().hex
+        self.staged = False
+        self.stored: Dict[str, dict] = {}
+        if mode == "upsert":
+            self.stored = {
+                row["url"]: row
+                for row in corpus_store.load(user_id, flag, fields=SUMMARY_FIELDS)
+            }
+
+    def add(self, batch: List[dict]) -> None:
+        """Stage a batch and embed its chunks; an upsert skips unchanged items."""
+        if self.mode == "upsert":
+            batch = self.service.changed_items(self.stored, batch)
+            self.stored.update(
+                (
+                    item.get("url"),
+                    {
+                        "url": item.get("url"),
+                        "date": item.get("date"),
+                        "digest": content_digest(item.get("content")),
+                    },
+                )
+                for item in batch
+            )
+        if not batch:
+            return
+        corpus_store.stage(self.user_id, self.flag, self.token, batch)
+        self.staged = True
+        try:
+            self.service.warm_index(history=batch, flag=self.flag)
+        except Exception as exc:
+            # The index build at commit embeds whatever is missing
+            logger.warning(
+                f"Embedding ahead failed for {self.user_id}:{self.flag}: {exc}"
+            )
+
+    def commit(self) -> int:
+        """Publish the upload; returns how many items were saved or changed.
+        A replace indexes the staged corpus and swaps it in; an upsert
+        merges the staged changes as a save-data upsert does.
+        """
+        if self.mode == "upsert" or not self.staged:
+            history = (
+                corpus_store.load_staged(self.user_id, self.flag, self.token)
+                if self.staged
+                else []
+            )
+            return _save_history(
+                self.service, self.user_id, self.flag, self.mode, history
+            )
+
+        with corpus_store.lock(self.user_id, self.flag):
+            history = corpus_store.load_staged(self.user_id, self.flag, self.token)
+            _build_and_store_index(self.service, self.user_id, self.flag, history)
+            corpus_store.publish(self.user_id, self.flag, self.token)
+            answer_cache.invalidate(self.user_id, self.flag)
+        return len(history)
+
+    def discard(self) -> None:
+        """Drop whatever is still staged; safe to call after commit."""
+        corpus_store.discard(self.user_id, self.flag, self.token)
+
+
+@router.post("/save-data-stream", response_model=Dict[str, Any])
+async def save_data_stream(
+    request: Request,
+    user_id: str = Query(alias="userId"),
+    flag: str = Query(default="history"),
+    mode: Literal["replace", "upsert"] = Query(default="replace"),
+    service: CoreRetrieval = Depends(get_retrieval_service),
+):
+    """Save history uploaded as NDJSON, one HistoryItem per line.
+    Lines are validated batch by batch while the body streams in, and each
+    batch is staged and embedded before more than a couple of batches are
+    read, so the body is never held and a slow save slows the upload down.
+    The upload replaces or upserts the stored data only once the whole
+    body was read, and its index is built then, like a save-data call
+    over the same items; a bad line or a failure leaves the stored data
+    as it was and drops what was staged.
+    """
+    upload = None
+    try:
+        upload = await asyncio.to_thread(StreamedSave, service, user_id, flag, mode)
+
+        async def stage(batch: List[dict]) -> None:
+            await asyncio.to_thread(upload.add, batch)
+
+        received = await ingestor.ingest(request.stream(), stage)
+        updated = await asyncio.to_thread(upload.commit)
+    except IngestError as exc:
+        status_code = (
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            if exc.too_large
+            else status.HTTP_400_BAD_REQUEST
+        )
+        raise HTTPException(
+            status_code=status_code, detail=f"{exc} (nothing was saved)"
+        ) from exc
+    except Exception as exc:
+        logger.error(f"Error saving streamed data: {exc}")
+        raise HTTPException(status_code=500, detail="Failed to save user data")
+    finally:
+        if upload is not None:
+            await asyncio.to_thread(upload.discard)
+
+    return {
+        "success": True,
+        "message": "Data saved successfully",
+        "received": received,
+        "updated": updated,
+    }
+
+
 @router.post("/search")
-def search(
+async def search(
     payload: SearchRequest,
-    service: CoreRetrieval = Depends(Retrieval.get_retrieval_service),
+    service: CoreRetrieval = Depends(get_retrieval_service),
 ) -> SearchResponse:
     """Run a non-streaming RAG search against the cached user data.
-    Loads the stored history for the given user/flag key from Redis.
+    Uses the prebuilt index, falling back to the stored raw history.
+    Runs on the event loop so slow LLM calls do not hold a worker thread.
+    Answers for the current corpus version are served from the cache.
     """
-    redis_key = f"user:{payload.user_id}:{payload.flag}"
-    user_data = redis_client.get(redis_key)
-    history: dict = json.loads(user_data)
+    embeddings = service.rag.embeddings
+    cached, version = await answer_cache.aget(
+        payload.user_id, payload.flag, payload.query, embeddings=embeddings
+    )
+    if cached is not None:
+        return cached
+
+    index = await _aload_index(service, payload.user_id, payload.flag)
+    history_data = (
+        [] if index is not None else await _aload_history(payload.user_id, payload.flag)
+    )
     try:
-        history_data = history.get("data", [])
-        return service.invoke_rag(data=payload, history=history_data)
+        response = await service.ainvoke_rag(
+            data=payload, history=history_data, index=index
+        )
     except Exception as exc:
         logger.error(exc)
         raise HTTPException(
@@ -68,28 +427,86 @@ def search(
             detail=str(exc),
         ) from exc
 
+    await answer_cache.aset(
+        payload.user_id,
+        payload.flag,
+        payload.query,
+        version,
+        response,
+        embeddings=embeddings,
+    )
+    return response
+
 
 @router.post("/search-stream")
-def search_stream(
+async def search_stream(
     payload: SearchRequest,
-    service: CoreRetrieval = Depends(Retrieval.get_retrieval_service),
+    service: CoreRetrieval = Depends(get_retrieval_service),
 ):
     """Stream RAG search progress and results via Server-Sent Events.
     Reads user data from Redis and yields stepwise progress payloads.
     Emits a final event with the full response or an error event.
+    A cached answer is sent as the final event straight away.
     """
-    redis_key = f"user:{payload.user_id}:{payload.flag}"
-    user_data = redis_client.get(redis_key)
-    history: dict = json.loads(user_data) if user_data else {}
+    embeddings = service.rag.embeddings
+    cached, version = await answer_cache.aget(
+        payload.user_id, payload.flag, payload.query, embeddings=embeddings
+    )
+    if cached is not None:
+        index, history_data = None, []
+    else:
+        index = await _aload_index(service, payload.user_id, payload.flag)
+        history_data = (
+            []
+            if index is not None
+            else await _aload_history(payload.user_id, payload.flag)
+        )
 
-    def event_stream():
+    async def event_stream():
+        if cached is not None:
+            final_event = {"step": "final", "data": cached.model_dump()}
+            yield f"data: {json.dumps(final_event)}\n\n"
+            return
         try:
-            history_data = history.get("data", [])
-            for event in service.stream_rag(data=payload, history=history_data):
+            async for event in service.astream_rag(
+                data=payload, history=history_data, index=index
+            ):
                 yield f"data: {json.dumps(event)}\n\n"
+                if event["step"] == "final":
+                    await answer_cache.aset(
+                        payload.user_id,
+                        payload.flag,
+                        payload.query,
+                        version,
+                        SearchResponse(**event["data"]),
+                        embeddings=embeddings,
+                    )
         except Exception as exc:
             logger.error(exc)
             error_event = {"step": "error", "data": {"message": str(exc)}}
             yield f"data: {json.dumps(error_event)}\n\n"
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@router.get(
+    "/metrics",
+    response_model=Dict[str, Any],
+    dependencies=[Depends(require_metrics_token)],
+)
+def metrics(service: CoreRetrieval = Depends(get_retrieval_service)):
+    """Expose cache counters so savings can be monitored.
+    Reports embedding cache hits, misses and estimated time saved, how
+    embedding calls were batched, answer cache hit rates split into exact
+    and semantic hits, summary reuse, and how often relevance filtering
+    skipped the LLM judge. Counters cover every user, so the endpoint is
+    only enabled with METRICS_TOKEN set and needs it as a bearer token.
+    """
+    relevance = service.post_processing.relevance
+    return {
+        "embedding_cache": EmbeddingsProvider.cache_stats(),
+        "embedding_scheduler": EmbeddingsProvider.scheduler_stats(),
+        "answer_cache": answer_cache.stats.snapshot(),
+        "summary_cache": service.llm_rag.summary_cache.stats(),
+        "relevance": relevance.stats.snapshot() if relevance else None,
+    }
@@ -2,18 +2,29 @@
 This module defines the primary application controller for the FastAPI backend.
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 from src.utility.logger import AppLogger
 from src.controller.core_controller import router as core_router
+from src.services.core_service.container import ServiceContainer
 
 AppLogger.init(
     level=logging.INFO,
     log_to_file=True,
 )
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build the shared service graph at startup and release it on shutdown."""
+    app.state.services = ServiceContainer()
+    yield
+    app.state.services.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -3,7 +3,7 @@ Defines Pydantic schemas used across controllers and services.
 """
 
 from pydantic import BaseModel, Field
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Literal
 
 
 class Document:
@@ -55,10 +55,12 @@ class HistoryItem(BaseModel):
 class DataRequest(BaseModel):
     """Request schema for saving user data to cache.
     Includes user identity, flag type, and history items.
+    Upsert mode merges items by URL into the stored corpus.
     """
 
     user_id: str = Field(alias="userId")
     flag: str = Field(default="history")
+    mode: Literal["replace", "upsert"] = Field(default="replace")
     data: List[HistoryItem]
 
 
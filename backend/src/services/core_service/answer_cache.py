@@ -0,0 +1,218 @@
+"""Redis cache of final search answers per user corpus version.
+Repeated or near-identical queries skip retrieval and every LLM call.
+"""
+
+import re
+import uuid
+import numpy as np
+from typing import Dict, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from src.models.core import SearchResponse
+from src.utility.cache import CacheStats, content_key
+from src.utility.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+# Filler words that do not change what a history search is looking for
+STOPWORDS = frozenset(
+    "a about an and any are at by can did do for from have how i in is it me "
+    "my of on one or page show site that the this to was what when where "
+    "which who with".split()
+)
+
+
+class AnswerCacheStats(CacheStats):
+    """Hit/miss counters that also split hits by cache tier."""
+
+    def __init__(self):
+        """Start all counters at zero."""
+        super().__init__()
+        self.semantic_hits = 0
+
+    def record_semantic_hit(self) -> None:
+        """Count a hit served by the embedding similarity tier."""
+        with self._lock:
+            self.hits += 1
+            self.semantic_hits += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return counters with exact and semantic hits reported separately."""
+        stats = super().snapshot()
+        with self._lock:
+            stats["exact_hits"] = self.hits - self.semantic_hits
+            stats["semantic_hits"] = self.semantic_hits
+        return stats
+
+
+class AnswerCache:
+    """Cache SearchResponse payloads by (corpus version, normalized query).
+    The corpus version is a random token rotated by save_data, so answers
+    computed against an older corpus are never served again and simply
+    expire. With a similarity threshold set, a query whose embedding is
+    close enough to a cached query reuses that answer as well.
+    """
+
+    def __init__(
+        self,
+        client,
+        async_client,
+        ttl: int = 3600,
+        similarity_threshold: Optional[float] = None,
+        max_semantic_entries: int = 256,
+    ):
+        """Bind the cache to binary-safe sync/async Redis clients.
+        The semantic tier stays disabled while similarity_threshold is None.
+        """
+        self.client = client
+        self.async_client = async_client
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.max_semantic_entries = max_semantic_entries
+        self.stats = AnswerCacheStats()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Reduce a query to its content words, in their original order.
+        "that youtube video about rust" and "youtube video rust" agree, but
+        word order is kept, since "paris to london" is not "london to paris".
+        """
+        tokens = re.findall(r"[a-z0-9]+", query.lower())
+        content = [token for token in tokens if token not in STOPWORDS]
+        return " ".join(content or tokens)
+
+    @staticmethod
+    def version_key(user_id: str, flag: str) -> str:
+        """Build the Redis key holding a user's corpus version token."""
+        return f"user:{user_id}:{flag}:version"
+
+    @staticmethod
+    def answer_key(user_id: str, flag: str, version: str, normalized: str) -> str:
+        """Build the Redis key of one cached answer."""
+        digest = content_key(normalized)
+        return f"user:{user_id}:{flag}:answer:{version}:{digest}"
+
+    @staticmethod
+    def vectors_key(user_id: str, flag: str, version: str) -> str:
+        """Build the Redis hash mapping answer keys to query embeddings."""
+        return f"user:{user_id}:{flag}:answers:{version}"
+
+    def invalidate(self, user_id: str, flag: str) -> None:
+        """Rotate the corpus version after the user's data changed."""
+        self.client.set(self.version_key(user_id, flag), uuid.uuid4().hex, ex=self.ttl)
+
+    def touch(self, user_id: str, flag: str) -> None:
+        """Refresh the version TTL when saved data did not change."""
+        self.client.expire(self.version_key(user_id, flag), self.ttl)
+
+    async def aget(
+        self,
+        user_id: str,
+        flag: str,
+        query: str,
+        embeddings: Optional[Embeddings] = None,
+    ) -> Tuple[Optional[SearchResponse], Optional[str]]:
+        """Look up an answer for query against the current corpus.
+        Returns (response or None, version); a None version means the
+        corpus has no version yet and nothing should be cached for it.
+        """
+        raw_version = await self.async_client.get(self.version_key(user_id, flag))
+        if raw_version is None:
+            return None, None
+        version = raw_version.decode()
+
+        normalized = self.normalize_query(query)
+        key = self.answer_key(user_id, flag, version, normalized)
+        raw = await self.async_client.get(key)
+        if raw is not None:
+            self.stats.record(hits=1)
+            return SearchResponse.model_validate_json(raw), version
+
+        if embeddings is not None and self.similarity_threshold is not None:
+            response = await self._asemantic_get(
+                user_id, flag, version, query, embeddings
+            )
+            if response is not None:
+                self.stats.record_semantic_hit()
+                return response, version
+
+        self.stats.record(misses=1)
+        return None, version
+
+    async def _asemantic_get(
+        self,
+        user_id: str,
+        flag: str,
+        version: str,
+        query: str,
+        embeddings: Embeddings,
+    ) -> Optional[SearchResponse]:
+        """Return the cached answer of the most similar earlier query.
+        The raw query is embedded, so retrieval reuses the cached vector.
+        Only answers at or above similarity_threshold are reused.
+        """
+        stored = await self.async_client.hgetall(
+            self.vectors_key(user_id, flag, version)
+        )
+        if not stored:
+            return None
+
+        keys = list(stored)
+        matrix = np.stack([np.frombuffer(stored[k], dtype=np.float32) for k in keys])
+        vector = np.asarray(await embeddings.aembed_query(query), np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(vector)
+        similarities = matrix @ vector / np.where(norms == 0, 1.0, norms)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+
+        raw = await self.async_client.get(keys[best])
+        if raw is None:
+            return None
+        logger.info(
+            f"Semantic answer cache hit for {user_id}:{flag} "
+            f"(similarity {similarities[best]:.3f})"
+        )
+        return SearchResponse.model_validate_json(raw)
+
+    async def aset(
+        self,
+        user_id: str,
+        flag: str,
+        query: str,
+        version: Optional[str],
+        response: SearchResponse,
+        embeddings: Optional[Embeddings] = None,
+    ) -> None:
+        """Store a successful answer under the version it was computed for.
+        Writes are best-effort: the answer was already computed, so a
+        failed write is logged instead of failing the search.
+        """
+        if version is None or not response.success:
+            return
+        try:
+            await self._aset(user_id, flag, query, version, response, embeddings)
+        except Exception as exc:
+            logger.warning(f"Answer cache write failed for {user_id}:{flag}: {exc}")
+
+    async def _aset(
+        self,
+        user_id: str,
+        flag: str,
+        query: str,
+        version: str,
+        response: SearchResponse,
+        embeddings: Optional[Embeddings],
+    ) -> None:
+        """Write an answer and, with embeddings, its query vector."""
+        normalized = self.normalize_query(query)
+        key = self.answer_key(user_id, flag, version, normalized)
+        await self.async_client.set(key, response.model_dump_json(), ex=self.ttl)
+
+        if embeddings is None or self.similarity_threshold is None:
+            return
+        vectors_key = self.vectors_key(user_id, flag, version)
+        if await self.async_client.hlen(vectors_key) >= self.max_semantic_entries:
+            return
+        vector = np.asarray(await embeddings.aembed_query(query), np.float32)
+        await self.async_client.hset(vectors_key, key, vector.tobytes())
+        await self.async_client.expire(vectors_key, self.ttl)
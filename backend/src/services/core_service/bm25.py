@@ -0,0 +1,149 @@
+"""Vectorized BM25 scoring over a compact inverted index.
+Replaces rank_bm25 so a query only touches postings of its own terms.
+"""
+
+import io
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+
+class BM25Index:
+    """Okapi BM25 over CSR-style postings held in NumPy arrays.
+    Scores match rank_bm25.BM25Okapi, including its epsilon floor for
+    negative IDF values, but only documents containing a query term are
+    scored and returned.
+    """
+
+    def __init__(
+        self,
+        terms: Dict[str, int],
+        indptr: np.ndarray,
+        doc_ids: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ):
+        """Wrap prebuilt postings; use BM25Index.build for raw documents.
+        Derives IDF and per-document length norms once up front.
+        """
+        self.terms = terms
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+        n_docs = len(doc_lengths)
+        avgdl = float(doc_lengths.mean()) if n_docs else 0.0
+        self.length_norms = (
+            k1 * (1 - b + b * doc_lengths / avgdl)
+            if avgdl
+            else np.full(n_docs, k1, dtype=np.float64)
+        )
+
+        doc_freqs = np.diff(indptr).astype(np.float64)
+        idf = np.log(n_docs - doc_freqs + 0.5) - np.log(doc_freqs + 0.5)
+        average_idf = float(idf.mean()) if len(idf) else 0.0
+        self.idf = np.where(idf < 0, self.epsilon * average_idf, idf)
+
+    @classmethod
+    def build(cls, tokenized_docs: Sequence[List[str]], **params) -> "BM25Index":
+        """Build the inverted index from already tokenized documents."""
+        terms: Dict[str, int] = {}
+        postings: List[List[Tuple[int, int]]] = []
+        doc_lengths = np.zeros(len(tokenized_docs), dtype=np.float64)
+
+        for doc_id, tokens in enumerate(tokenized_docs):
+            doc_lengths[doc_id] = len(tokens)
+            for term, freq in Counter(tokens).items():
+                term_id = terms.setdefault(term, len(terms))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((doc_id, freq))
+
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(p) for p in postings])
+        doc_ids = np.empty(indptr[-1], dtype=np.int32)
+        term_freqs = np.empty(indptr[-1], dtype=np.float32)
+        for term_id, entries in enumerate(postings):
+            start = indptr[term_id]
+            for offset, (doc_id, freq) in enumerate(entries):
+                doc_ids[start + offset] = doc_id
+                term_freqs[start + offset] = freq
+
+        return cls(terms, indptr, doc_ids, term_freqs, doc_lengths, **params)
+
+    def __len__(self) -> int:
+        """Return the number of indexed documents."""
+        return len(self.doc_lengths)
+
+    def search(self, query_tokens: List[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the top-k (doc ids, scores) for a tokenized query.
+        Repeated query tokens count repeatedly, as in rank_bm25.
+        Results are ordered by descending score.
+        """
+        scores = np.zeros(len(self.doc_lengths), dtype=np.float64)
+        touched = []
+        for token in query_tokens:
+            term_id = self.terms.get(token)
+            if term_id is None:
+                continue
+            span = slice(self.indptr[term_id], self.indptr[term_id + 1])
+            docs = self.doc_ids[span]
+            freqs = self.term_freqs[span]
+            scores[docs] += (
+                self.idf[term_id]
+                * freqs
+                * (self.k1 + 1)
+                / (freqs + self.length_norms[docs])
+            )
+            touched.append(docs)
+
+        if not touched or k <= 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+
+        candidates = np.unique(np.concatenate(touched))
+        if len(candidates) > k:
+            top = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[top]
+        order = np.argsort(-scores[candidates], kind="stable")
+        ranked = candidates[order]
+        return ranked, scores[ranked]
+
+    def to_bytes(self) -> bytes:
+        """Serialize the index as an uncompressed .npz archive."""
+        vocabulary = np.empty(len(self.terms), dtype=object)
+        for term, term_id in self.terms.items():
+            vocabulary[term_id] = term
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            vocabulary=vocabulary.astype(str),
+            indptr=self.indptr,
+            doc_ids=self.doc_ids,
+            term_freqs=self.term_freqs,
+            doc_lengths=self.doc_lengths,
+            params=np.array([self.k1, self.b, self.epsilon]),
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "BM25Index":
+        """Restore an index produced by to_bytes."""
+        with np.load(io.BytesIO(raw), allow_pickle=False) as data:
+            k1, b, epsilon = data["params"].tolist()
+            return cls(
+                terms={term: i for i, term in enumerate(data["vocabulary"].tolist())},
+                indptr=data["indptr"],
+                doc_ids=data["doc_ids"],
+                term_freqs=data["term_freqs"],
+                doc_lengths=data["doc_lengths"],
+                k1=k1,
+                b=b,
+                epsilon=epsilon,
+            )
@@ -0,0 +1,55 @@
+"""Application-scoped service graph for the FastAPI backend.
+Builds every client and service once at startup and shares it.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from src.services.llm_service.llm_provider import LLMProvider
+from src.services.llm_service.prompt_builder import Prompts
+from src.services.post_processing_service.post_processing import PostProcessing
+from src.services.post_processing_service.relevance import LocalRelevanceScorer
+from src.services.core_service.main import CoreRetrieval
+from src.services.core_service.rag import HybridRAGService, LLMRag
+from src.utility.provider import SummaryCacheProvider
+from src.utility.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+
+class ServiceContainer:
+    """Holds the shared service instances for the whole process.
+    One LLMProvider backs every LLM consumer, so HTTP clients, connection
+    pools and the rate limiter are shared across requests.
+    """
+
+    def __init__(self):
+        """Construct the service graph exactly once.
+        Intended to be called from the FastAPI lifespan handler.
+        """
+        self.llm_provider = LLMProvider()
+        self.prompts = Prompts()
+        self.rag = HybridRAGService()
+        self.llm_rag = LLMRag(
+            llm_provider=self.llm_provider,
+            prompts=self.prompts,
+            summary_cache=SummaryCacheProvider.get_cache(),
+        )
+        self.post_processing = PostProcessing(
+            llm_provider=self.llm_provider,
+            prompts=self.prompts,
+            relevance=LocalRelevanceScorer(provider=self.rag.embedding_provider),
+        )
+        # Owned here so shutdown leaves other users of the module pool alone
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag-step")
+        self.core = CoreRetrieval(
+            llm_client=self.llm_provider,
+            post_processing=self.post_processing,
+            rag=self.rag,
+            llm_rag=self.llm_rag,
+            executor=self.executor,
+        )
+        logger.info("Service container initialized")
+
+    def close(self) -> None:
+        """Release shared resources at application shutdown."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Service container closed")
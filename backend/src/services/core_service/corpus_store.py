@@ -0,0 +1,200 @@
+"""Compact columnar storage for per-user history corpora in Redis.
+Each field is a zstd-compressed column, so loaders read only what they need.
+A digest column of each item's content lets change checks skip the content.
+Streamed uploads are staged as numbered column segments, one per batch.
+"""
+
+import struct
+import asyncio
+import numpy as np
+import zstandard
+from typing import Dict, List, Optional, Sequence
+from src.utility.cache import content_key
+from src.utility.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+# Fields of a HistoryItem, stored as one column each
+COLUMNS = ("url", "content", "date")
+
+# Derived column, written on save; corpora stored without it load as empty
+DIGEST = "digest"
+
+# Enough to tell new or changed items apart without reading content
+SUMMARY_FIELDS = ("url", "date", DIGEST)
+
+# Count of "<field>:<n>" segments; corpora saved in one piece have none
+SEGMENTS = "segments"
+
+# Length marker for a missing (None) value in a column
+_NULL = 0xFFFFFFFF
+
+_compressor = zstandard.ZstdCompressor(level=3)
+_decompressor = zstandard.ZstdDecompressor()
+
+
+def encode_column(values: Sequence[Optional[str]]) -> bytes:
+    """Pack strings as a row count, uint32 lengths and one UTF-8 blob.
+    The whole column is zstd-compressed; None is stored as a null length.
+    """
+    encoded = [None if v is None else v.encode("utf-8") for v in values]
+    lengths = np.array([_NULL if v is None else len(v) for v in encoded], dtype="<u4")
+    body = b"".join(v for v in encoded if v is not None)
+    raw = struct.pack("<I", len(encoded)) + lengths.tobytes() + body
+    return _compressor.compress(raw)
+
+
+def decode_column(blob: bytes) -> List[Optional[str]]:
+    """Unpack a column produced by encode_column."""
+    raw = _decompressor.decompress(blob)
+    (count,) = struct.unpack_from("<I", raw)
+    lengths = np.frombuffer(raw, dtype="<u4", count=count, offset=4)
+    position = 4 + 4 * count
+    values: List[Optional[str]] = []
+    for length in lengths.tolist():
+        if length == _NULL:
+            values.append(None)
+            continue
+        values.append(raw[position : position + length].decode("utf-8"))
+        position += length
+    return values
+
+
+def content_digest(content: Optional[str]) -> str:
+    """Return the digest stored for an item's content."""
+    return content_key(content or "")
+
+
+class CorpusStore:
+    """Save and load user corpora as a Redis hash of compressed columns.
+    Expects Redis clients created with decode_responses=False.
+    """
+
+    def __init__(self, client, async_client=None, ttl: int = 3600):
+        """Bind the store to binary-safe sync/async Redis clients and a TTL."""
+        self.client = client
+        self.async_client = async_client
+        self.ttl = ttl
+
+    @staticmethod
+    def key(user_id: str, flag: str) -> str:
+        """Build the Redis key for a user's corpus."""
+        return f"user:{user_id}:{flag}:corpus"
+
+    @classmethod
+    def staging_key(cls, user_id: str, flag: str, token: str) -> str:
+        """Build the Redis key of a corpus staged by one streamed upload."""
+        return f"{cls.key(user_id, flag)}:staging:{token}"
+
+    @staticmethod
+    def _columns(items: List[dict], suffix: str = "") -> Dict[str, bytes]:
+        """Encode every stored field of items, naming each field + suffix."""
+        mapping: Dict[str, bytes] = {
+            column + suffix: encode_column([item.get(column) for item in items])
+            for column in COLUMNS
+        }
+        mapping[DIGEST + suffix] = encode_column(
+            [content_digest(item.get("content")) for item in items]
+        )
+        return mapping
+
+    def save(self, user_id: str, flag: str, items: List[dict]) -> None:
+        """Replace the stored corpus with items in a single transaction."""
+        key = self.key(user_id, flag)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(key)
+        pipe.hset(key, mapping=self._columns(items))
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def stage(self, user_id: str, flag: str, token: str, items: List[dict]) -> None:
+        """Append items to a staged corpus as one more segment.
+        Only the new items are encoded and written, whatever was staged.
+        """
+        key = self.staging_key(user_id, flag, token)
+        segment = self.client.hincrby(key, SEGMENTS, 1) - 1
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(key, mapping=self._columns(items, f":{segment}"))
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def load_staged(self, user_id: str, flag: str, token: str) -> List[dict]:
+        """Return every item staged under token, in the order staged."""
+        return self._load(self.staging_key(user_id, flag, token), list(COLUMNS))
+
+    def publish(self, user_id: str, flag: str, token: str) -> None:
+        """Atomically make a staged corpus the stored one."""
+        key = self.key(user_id, flag)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.rename(self.staging_key(user_id, flag, token), key)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def discard(self, user_id: str, flag: str, token: str) -> None:
+        """Drop a staged corpus that will not be published."""
+        self.client.delete(self.staging_key(user_id, flag, token))
+
+    @staticmethod
+    def _rows(fields: Sequence[str], blobs: Sequence[Optional[bytes]]) -> List[dict]:
+        """Turn fetched column blobs back into row dictionaries.
+        Blobs hold the fields of each segment in turn.
+        """
+        rows: List[dict] = []
+        for start in range(0, len(blobs), len(fields)):
+            segment = blobs[start : start + len(fields)]
+            if any(blob is None for blob in segment):
+                return []
+            columns = [decode_column(blob) for blob in segment]
+            rows.extend(dict(zip(fields, row)) for row in zip(*columns))
+        return rows
+
+    @staticmethod
+    def _segment_fields(fields: Sequence[str], segments: bytes) -> List[str]:
+        """Name the fields of every segment of a staged corpus."""
+        return [f"{field}:{n}" for n in range(int(segments)) for field in fields]
+
+    def _load(self, key: str, fields: List[str]) -> List[dict]:
+        """Fetch and decode the requested fields of the corpus at key."""
+        *blobs, segments = self.client.hmget(key, fields + [SEGMENTS])
+        if segments is not None:
+            blobs = self.client.hmget(key, self._segment_fields(fields, segments))
+        return self._rows(fields, blobs)
+
+    def load(
+        self, user_id: str, flag: str, fields: Optional[Sequence[str]] = None
+    ) -> List[dict]:
+        """Return the corpus rows, materializing only the requested fields.
+        Returns an empty list when nothing is stored.
+        """
+        return self._load(self.key(user_id, flag), list(fields or COLUMNS))
+
+    async def aload(
+        self, user_id: str, flag: str, fields: Optional[Sequence[str]] = None
+    ) -> List[dict]:
+        """Async variant of load using the asyncio Redis client.
+        Columns are decompressed in a worker thread.
+        """
+        key = self.key(user_id, flag)
+        fields = list(fields or COLUMNS)
+        *blobs, segments = await self.async_client.hmget(key, fields + [SEGMENTS])
+        if segments is not None:
+            blobs = await self.async_client.hmget(
+                key, self._segment_fields(fields, segments)
+            )
+        return await asyncio.to_thread(self._rows, fields, blobs)
+
+    def lock(self, user_id: str, flag: str, timeout: float = 300):
+        """Return a Redis lock serializing saves of a user's corpus.
+        Held across load, merge and save so concurrent upserts cannot lose
+        each other's changes; it expires after timeout seconds in case the
+        holder dies, and waiting for it gives up after as long.
+        """
+        return self.client.lock(
+            f"{self.key(user_id, flag)}:lock",
+            timeout=timeout,
+            blocking_timeout=timeout,
+        )
+
+    def touch(self, user_id: str, flag: str) -> None:
+        """Refresh the TTL of a corpus that did not change."""
+        self.client.expire(self.key(user_id, flag), self.ttl)
@@ -0,0 +1,225 @@
+"""Ingestion-time collapsing of duplicate history pages.
+URLs are canonicalized so tracking and AMP variants share a key, and page
+text is SimHashed so near-identical content folds into one parent.
+"""
+
+import re
+import zlib
+import numpy as np
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from src.utility.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+# Click and campaign ids that only track the visit and never change the page.
+# Params such as ref, si or amp select content on some sites, so they stay.
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "yclid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "_hsenc",
+    "_hsmi",
+}
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "hsa_")
+HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_BITS = np.arange(64, dtype=np.uint64)
+
+
+def canonicalize_url(url: Optional[str]) -> str:
+    """Reduce a URL to the key shared by its tracking and AMP variants.
+    Lowercases scheme and host, drops www/m/amp host prefixes, default
+    ports, fragments, click and campaign ids and AMP path suffixes, and
+    sorts the remaining query. Any other parameter is kept, since it may
+    select the page.
+    """
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        # Malformed URLs, e.g. broken IPv6 hosts, are their own key
+        return url.strip()
+    if not parts.netloc:
+        return url.strip()
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix) :]
+            break
+    try:
+        port = parts.port
+    except ValueError:
+        # Keep a malformed or out-of-range port as written
+        port = parts.netloc.rpartition(":")[2]
+    if port and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+
+    path = re.sub(r"/+", "/", parts.path)
+    path = re.sub(r"(/amp|\.amp|/index\.html?)$", "", path.rstrip("/"))
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    # http and https versions of a page are the same page
+    return urlunsplit(("https", host, path or "/", urlencode(query), ""))
+
+
+def _mix64(values: np.ndarray) -> np.ndarray:
+    """Scramble 64-bit integers with the splitmix64 finalizer."""
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class WordHashes(dict):
+    """Memo of crc32 word hashes, shared across the texts of one batch."""
+
+    def __missing__(self, word: str) -> int:
+        value = self[word] = zlib.crc32(word.encode("utf-8"))
+        return value
+
+
+def _shingle_hashes(text: str, size: int, words: WordHashes) -> np.ndarray:
+    """Hash every distinct run of size consecutive words to 64 bits.
+    Words are hashed once through the memo and combined in numpy.
+    """
+    tokens = re.findall(r"\w+", text.lower())
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    ids = np.fromiter(
+        map(words.__getitem__, tokens), dtype=np.uint64, count=len(tokens)
+    )
+    span = min(size, len(ids))
+    shingles = np.zeros(len(ids) - span + 1, dtype=np.uint64)
+    for offset in range(span):
+        shingles = _mix64(shingles ^ ids[offset : offset + len(shingles)])
+    return np.unique(shingles)
+
+
+def simhash(
+    text: str, shingle_size: int = 3, words: Optional[WordHashes] = None
+) -> int:
+    """Return the 64-bit SimHash of a text over word shingles.
+    Texts that share most shingles differ in only a few bits.
+    """
+    hashes = _shingle_hashes(
+        text, shingle_size, WordHashes() if words is None else words
+    )
+    if not len(hashes):
+        return 0
+    bits = (hashes[:, None] >> _BITS) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(hashes)
+    return int(sum(1 << int(i) for i in np.flatnonzero(votes > 0)))
+
+
+class HistoryDeduplicator:
+    """Collapse history items that are the same page into one item.
+    Items match when their canonical URLs are equal, or when the SimHashes
+    of their content are within max_distance bits of each other.
+    """
+
+    def __init__(
+        self, max_distance: int = 6, shingle_size: int = 3, min_words: int = 20
+    ):
+        """Configure the match threshold and shingling.
+        Texts shorter than min_words only match by URL, since a few shared
+        words say little about two pages being the same.
+        """
+        self.max_distance = max_distance
+        self.shingle_size = shingle_size
+        self.min_words = min_words
+        # Split the hash so any pair within max_distance shares a whole band
+        self.bands = max_distance + 1
+
+    def _band_keys(self, value: int) -> List[int]:
+        """Split a 64-bit hash into bands used as candidate buckets."""
+        width = 64 // self.bands
+        mask = (1 << width) - 1
+        return [(value >> (band * width)) & mask for band in range(self.bands)]
+
+    def _groups(self, items: List[dict]) -> List[List[int]]:
+        """Return item positions grouped by duplicate, in first-seen order."""
+        parent = list(range(len(items)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def union(i: int, j: int) -> None:
+            a, b = find(i), find(j)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+
+        by_url: Dict[str, int] = {}
+        buckets: Dict[tuple, List[int]] = defaultdict(list)
+        hashes: Dict[int, int] = {}
+        words = WordHashes()
+        for pos, item in enumerate(items):
+            key = canonicalize_url(item.get("url"))
+            if key in by_url:
+                union(by_url[key], pos)
+            elif key:
+                by_url[key] = pos
+
+            content = item.get("content") or ""
+            if len(content.split()) < self.min_words:
+                continue
+            value = simhash(content, self.shingle_size, words)
+            hashes[pos] = value
+            for band, band_key in enumerate(self._band_keys(value)):
+                bucket = buckets[(band, band_key)]
+                for other in bucket:
+                    if (value ^ hashes[other]).bit_count() <= self.max_distance:
+                        union(other, pos)
+                bucket.append(pos)
+
+        groups: Dict[int, List[int]] = defaultdict(list)
+        for pos in range(len(items)):
+            groups[find(pos)].append(pos)
+        return sorted(groups.values(), key=lambda group: group[0])
+
+    def collapse(self, items: List[dict]) -> List[dict]:
+        """Merge duplicate items, keeping the latest visit's content.
+        Items are assumed to be in visit order. The kept URL is the shortest
+        variant; every visit date and URL is listed on the merged item.
+        """
+        merged: List[dict] = []
+        for group in self._groups(items):
+            members = [items[pos] for pos in group]
+            latest = members[-1]
+            dates: List[str] = []
+            for member in members:
+                date = member.get("date")
+                if date and date not in dates:
+                    dates.append(date)
+            urls = list(dict.fromkeys(m.get("url") for m in members if m.get("url")))
+            merged.append(
+                {
+                    **latest,
+                    "url": min(urls, key=len) if urls else latest.get("url"),
+                    "date": dates[-1] if dates else latest.get("date"),
+                    "visit_dates": dates,
+                    "aliases": urls,
+                }
+            )
+
+        if len(merged) < len(items):
+            logger.info(f"Collapsed {len(items)} history items into {len(merged)}")
+        return merged
@@ -0,0 +1,84 @@
+"""Deterministic extraction of the structured answer fields.
+Fills Ans_history / Ans_bookmark from retrieval metadata or the summary
+text, so the LLM parser only runs when neither yields valid values.
+"""
+
+import re
+from typing import Optional
+from urllib.parse import urlsplit
+from pydantic import ValidationError
+from src.models.core import Ans_bookmark, Ans_history
+
+_URL = re.compile(r"https?://[^\s<>()\[\]{}\"'`*]+")
+_MONTH = r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?"
+_DATES = [
+    # Browser history format, e.g. "Sun, Oct 18, 2026"
+    re.compile(
+        rf"\b(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)[a-z]*,?\s+{_MONTH}\s+\d{{1,2}},?\s+\d{{4}}"
+    ),
+    re.compile(rf"\b{_MONTH}\s+\d{{1,2}},?\s+\d{{4}}\b"),
+    re.compile(rf"\b\d{{1,2}}\s+{_MONTH}\s+\d{{4}}\b"),
+    re.compile(r"\b\d{4}-\d{2}-\d{2}\b"),
+]
+_MODELS = {"history": Ans_history, "bookmark": Ans_bookmark}
+
+
+def valid_url(url: Optional[str]) -> Optional[str]:
+    """Return the URL stripped of whitespace if it is absolute http(s)."""
+    url = (url or "").strip()
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if parts.scheme in ("http", "https") and parts.netloc:
+        return url
+    return None
+
+
+def find_url(text: str) -> Optional[str]:
+    """Return the first absolute URL in text, minus trailing punctuation."""
+    for match in _URL.finditer(text or ""):
+        url = valid_url(match.group(0).rstrip(".,;:!?"))
+        if url:
+            return url
+    return None
+
+
+def clean_date(date: Optional[str]) -> Optional[str]:
+    """Return a stored date unless it is empty or the Unknown placeholder."""
+    date = (date or "").strip()
+    return date if date and date.lower() != "unknown" else None
+
+
+def find_date(text: str) -> Optional[str]:
+    """Return the first recognizable calendar date in text."""
+    for pattern in _DATES:
+        match = pattern.search(text or "")
+        if match:
+            return match.group(0)
+    return None
+
+
+def extract_structure(
+    content: str,
+    flag: str,
+    url: Optional[str] = None,
+    date: Optional[str] = None,
+) -> Optional[dict]:
+    """Build the parse result without an LLM.
+    Metadata of the summarized page wins; the summary text is searched for
+    any missing value. Returns None when the result does not validate.
+    """
+    model = _MODELS.get(flag)
+    if model is None:
+        raise ValueError(f"Unknown flag '{flag}'")
+
+    candidate = {"url": valid_url(url) or find_url(content)}
+    if flag == "history":
+        candidate["date"] = clean_date(date) or find_date(content)
+    if not all(candidate.values()):
+        return None
+    try:
+        return model(**candidate).model_dump()
+    except ValidationError:
+        return None
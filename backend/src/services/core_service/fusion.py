@@ -0,0 +1,206 @@
+"""Fusion of BM25 and FAISS hits into one parent ranking.
+Every method turns per-signal child hits into a calibrated parent score in
+[0, 1], so later stages can compare candidates and skip work on confident
+results whichever method is configured.
+"""
+
+import os
+import math
+from typing import Dict, List, Literal, Optional, Tuple, get_args
+from src.utility.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+FusionMethod = Literal["rank", "rrf", "zscore", "convex"]
+ChunkAggregation = Literal["max", "sum"]
+
+# Child hits of one signal as (parent_id, score), best first
+SignalHits = List[Tuple[int, float]]
+
+
+class FusedParent:
+    """A parent with its fused score and what each signal said about it.
+    Signals that returned no hits are left out; None marks a miss.
+    """
+
+    def __init__(self, parent_id: int, score: float):
+        """Start with only the fused score; signals are filled in by fuse."""
+        self.parent_id = parent_id
+        self.score = score
+        self.signal_scores: Dict[str, Optional[float]] = {}
+        self.signal_ranks: Dict[str, Optional[int]] = {}
+
+
+class RankFusion:
+    """Combine ranked signals with a pluggable method.
+    Child hits are first aggregated per parent within each signal, by the
+    best child score ("max") or the sum of the top_n child scores ("sum"),
+    so a long parent with many matching chunks counts once.
+    rank: weight / (parent rank + 1), the original SurfMind weighting,
+        scaled by its best possible value.
+    rrf: reciprocal rank fusion, weight / (rrf_k + parent rank), scaled by
+        the score of a parent ranked first everywhere.
+    zscore: weighted mean of per-signal z-scores, squashed by a logistic.
+    convex: weighted mean of per-signal min-max normalized scores.
+    Parents a signal missed get its lowest z-score or a normalized zero.
+    """
+
+    def __init__(
+        self,
+        method: Optional[FusionMethod] = None,
+        rrf_k: int = 60,
+        dominance_margin: Optional[float] = None,
+        aggregation: Optional[ChunkAggregation] = None,
+        top_n: int = 2,
+    ):
+        """Pick the method, dominance margin and chunk aggregation, read
+        from RETRIEVAL_FUSION, RETRIEVAL_DOMINANCE_MARGIN and
+        RETRIEVAL_AGGREGATION when not given.
+        """
+        method = method or os.getenv("RETRIEVAL_FUSION") or "rank"
+        if method not in get_args(FusionMethod):
+            raise ValueError(f"Unknown fusion method '{method}'")
+        if dominance_margin is None:
+            # Tuned with benchmarks.fusion_eval, where 0.25 marked no wrong
+            # page dominant; models with a narrow cosine range rarely reach it
+            dominance_margin = float(os.getenv("RETRIEVAL_DOMINANCE_MARGIN") or 0.25)
+        aggregation = aggregation or os.getenv("RETRIEVAL_AGGREGATION") or "max"
+        if aggregation not in get_args(ChunkAggregation):
+            raise ValueError(f"Unknown chunk aggregation '{aggregation}'")
+        self.method = method
+        self.rrf_k = rrf_k
+        self.dominance_margin = dominance_margin
+        self.aggregation = aggregation
+        self.top_n = top_n
+
+    def _parent_scores(self, hits: SignalHits) -> Dict[int, float]:
+        """Aggregate child scores per parent, in parent rank order.
+        Hits arrive best first, so a parent's first hit is its best chunk.
+        """
+        chunks: Dict[int, List[float]] = {}
+        for pid, score in hits:
+            chunks.setdefault(pid, []).append(score)
+        if self.aggregation == "max":
+            return {pid: scores[0] for pid, scores in chunks.items()}
+        summed = {pid: sum(scores[: self.top_n]) for pid, scores in chunks.items()}
+        return dict(sorted(summed.items(), key=lambda item: item[1], reverse=True))
+
+    @staticmethod
+    def _rank(
+        parents: Dict[str, Dict[int, float]], weights: Dict[str, float]
+    ) -> Dict[int, float]:
+        """Original rank weighting, scaled by its best possible value."""
+        fused: Dict[int, float] = {}
+        best = 0.0
+        for name, scores in parents.items():
+            for rank, pid in enumerate(scores):
+                fused[pid] = fused.get(pid, 0.0) + weights[name] / (rank + 1)
+            if scores:
+                best += weights[name]
+        return {pid: value / best for pid, value in fused.items()}
+
+    def _rrf(
+        self, parents: Dict[str, Dict[int, float]], weights: Dict[str, float]
+    ) -> Dict[int, float]:
+        """Reciprocal rank fusion over parent ranks."""
+        fused: Dict[int, float] = {}
+        best = 0.0
+        for name, scores in parents.items():
+            for rank, pid in enumerate(scores):
+                fused[pid] = fused.get(pid, 0.0) + weights[name] / (
+                    self.rrf_k + rank + 1
+                )
+            if scores:
+                best += weights[name] / (self.rrf_k + 1)
+        return {pid: value / best for pid, value in fused.items()}
+
+    @staticmethod
+    def _normalized(
+        parents: Dict[str, Dict[int, float]],
+        weights: Dict[str, float],
+        normalize,
+        missing,
+    ) -> Dict[int, float]:
+        """Weighted mean of per-signal normalized scores over all parents."""
+        pids = {pid for scores in parents.values() for pid in scores}
+        fused = dict.fromkeys(pids, 0.0)
+        total = 0.0
+        for name, scores in parents.items():
+            if not scores:
+                continue
+            normal = normalize(list(scores.values()))
+            fallback = missing(normal)
+            by_pid = dict(zip(scores, normal))
+            for pid in pids:
+                fused[pid] += weights[name] * by_pid.get(pid, fallback)
+            total += weights[name]
+        return {pid: value / total for pid, value in fused.items()}
+
+    @staticmethod
+    def _zscores(values: List[float]) -> List[float]:
+        """Standardize values; a constant signal scores zero everywhere."""
+        mean = sum(values) / len(values)
+        std = math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+        return [(v - mean) / std if std > 0 else 0.0 for v in values]
+
+    @staticmethod
+    def _minmax(values: List[float]) -> List[float]:
+        """Scale values to [0, 1]; a constant signal scores one everywhere."""
+        low, high = min(values), max(values)
+        return [(v - low) / (high - low) if high > low else 1.0 for v in values]
+
+    def fuse(
+        self, signals: Dict[str, SignalHits], weights: Dict[str, float]
+    ) -> List[FusedParent]:
+        """Fuse per-signal child hits into parents, best first.
+        Scores must grow with relevance in every signal.
+        """
+        parents = {name: self._parent_scores(hits) for name, hits in signals.items()}
+        if self.method == "rank":
+            fused = self._rank(parents, weights)
+        elif self.method == "rrf":
+            fused = self._rrf(parents, weights)
+        elif self.method == "zscore":
+            fused = {
+                pid: 1 / (1 + math.exp(-value))
+                for pid, value in self._normalized(
+                    parents, weights, self._zscores, min
+                ).items()
+            }
+        else:
+            fused = self._normalized(parents, weights, self._minmax, lambda _: 0.0)
+
+        ranks = {
+            name: {pid: rank for rank, pid in enumerate(scores, start=1)}
+            for name, scores in parents.items()
+            if scores
+        }
+        ranked = []
+        for pid in sorted(fused, key=lambda pid: fused[pid], reverse=True):
+            # Plain floats, since scores end up in JSON responses
+            result = FusedParent(pid, float(fused[pid]))
+            for name in ranks:
+                result.signal_scores[name] = parents[name].get(pid)
+                result.signal_ranks[name] = ranks[name].get(pid)
+            ranked.append(result)
+        return ranked
+
+    def dominates(
+        self, ranked: List[FusedParent], similarity: List[Optional[float]]
+    ) -> bool:
+        """Whether the top parent clearly beats every other candidate.
+        Every signal that returned hits must rank it first, and its cosine
+        similarity to the query, similarity[0], must exceed that of every
+        other candidate by at least dominance_margin. Cosines share one
+        scale across queries, unlike raw BM25 scores or rank-based fused
+        scores; a candidate without a similarity rules dominance out.
+        """
+        if not ranked or not ranked[0].signal_ranks:
+            return False
+        if any(rank != 1 for rank in ranked[0].signal_ranks.values()):
+            return False
+        if not similarity or any(value is None for value in similarity):
+            return False
+        return all(
+            similarity[0] - other >= self.dominance_margin for other in similarity[1:]
+        )
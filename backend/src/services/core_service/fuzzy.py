@@ -0,0 +1,172 @@
+"""Indexed fuzzy matching over a retrieval vocabulary.
+Finds the same closest match as difflib.get_close_matches(n=1) without
+scanning the whole vocabulary for every query token.
+"""
+
+import numpy as np
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from math import ceil
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# A character occurrence, e.g. ("e", 2) is the second "e" in a word
+Element = Tuple[str, int]
+
+
+class FuzzyIndex:
+    """Prefix-filter index for difflib-compatible closest-match lookups.
+
+    difflib only accepts x when quick_ratio(word, x) >= cutoff, i.e. the
+    character multisets of the two strings overlap by at least
+    t = cutoff * (len(word) + len(x)) / 2. Words are stored as multisets of
+    character occurrences sorted rarest first; two multisets overlapping by
+    t must share an element within their first len - t + 1 entries. Each
+    word is posted under its prefix elements together with its length and
+    the element's prefix position, so a lookup only visits postings that
+    can satisfy the bound for that exact pair of lengths. Survivors go
+    through the exact difflib checks, which keeps results identical to
+    get_close_matches. Before that, quick_ratio itself is evaluated for
+    all candidates at once from a per-word character count matrix, so
+    SequenceMatcher only runs on words that already pass it.
+    """
+
+    def __init__(self, vocabulary: Iterable[str], cutoff: float = 0.8):
+        """Build postings for every word at the given minimum cutoff.
+        Lookups with a higher cutoff reuse the same index.
+        """
+        self.cutoff = cutoff
+        self.words: List[str] = sorted(set(vocabulary))
+        self._word_set: Set[str] = set(self.words)
+
+        element_sets = [self._elements(word) for word in self.words]
+        frequency: Counter = Counter()
+        for elements in element_sets:
+            frequency.update(elements)
+        # Rarest first; unseen elements get rank -1 when querying
+        self._rank: Dict[Element, int] = {
+            element: rank
+            for rank, element in enumerate(
+                sorted(frequency, key=lambda e: (frequency[e], e))
+            )
+        }
+
+        postings: Dict[Tuple[Element, int, int], List[int]] = defaultdict(list)
+        for word_id, elements in enumerate(element_sets):
+            length = len(self.words[word_id])
+            ordered = self._ordered(elements)
+            size = length - self._min_overlap(length, cutoff) + 1
+            for position, element in enumerate(ordered[: max(size, 1)]):
+                postings[(element, length, position)].append(word_id)
+        self._postings: Dict[Tuple[Element, int, int], np.ndarray] = {
+            key: np.asarray(ids, dtype=np.int32) for key, ids in postings.items()
+        }
+
+        # Character counts per word, used to evaluate quick_ratio in bulk
+        self._alphabet: Dict[str, int] = {
+            char: i for i, char in enumerate(sorted({c for w in self.words for c in w}))
+        }
+        self._counts = np.zeros((len(self.words), len(self._alphabet)), np.uint16)
+        for word_id, word in enumerate(self.words):
+            for char in word:
+                self._counts[word_id, self._alphabet[char]] += 1
+        self._lengths = np.fromiter(
+            (len(word) for word in self.words), dtype=np.int64, count=len(self.words)
+        )
+
+    def __len__(self) -> int:
+        """Return the number of indexed words."""
+        return len(self.words)
+
+    def __contains__(self, word: str) -> bool:
+        """Return True when word is in the indexed vocabulary."""
+        return word in self._word_set
+
+    @staticmethod
+    def _elements(word: str) -> List[Element]:
+        """Encode a word as the set of its numbered character occurrences."""
+        seen: Counter = Counter()
+        elements = []
+        for char in word:
+            seen[char] += 1
+            elements.append((char, seen[char]))
+        return elements
+
+    def _ordered(self, elements: List[Element]) -> List[Element]:
+        """Sort elements by the global rarest-first order."""
+        return sorted(elements, key=lambda e: (self._rank.get(e, -1), e))
+
+    @staticmethod
+    def _min_overlap(length: int, cutoff: float) -> int:
+        """Smallest multiset overlap any accepted partner can have.
+        The shortest partner allowed by real_quick_ratio gives the bound.
+        """
+        return max(1, ceil(cutoff * length / (2 - cutoff) - 1e-9))
+
+    def candidates(self, word: str, cutoff: Optional[float] = None) -> np.ndarray:
+        """Return ids of words that can pass quick_ratio for this word.
+        Only lengths allowed by real_quick_ratio are visited, and for each
+        the prefix sizes use the overlap bound of that length pair.
+        """
+        cutoff = self.cutoff if cutoff is None else cutoff
+        length = len(word)
+        ordered = self._ordered(self._elements(word))
+        shortest = ceil(length * cutoff / (2 - cutoff) - 1e-9)
+        longest = int(length * (2 - cutoff) / cutoff + 1e-9)
+
+        found: List[np.ndarray] = []
+        for other in range(max(shortest, 1), longest + 1):
+            # Overlap needed for this pair; both prefixes follow from it
+            overlap = max(1, ceil(cutoff * (length + other) / 2 - 1e-9))
+            word_prefix = length - overlap + 1
+            index_prefix = other - overlap + 1
+            for element in ordered[: max(word_prefix, 0)]:
+                for position in range(max(index_prefix, 0)):
+                    posting = self._postings.get((element, other, position))
+                    if posting is not None:
+                        found.append(posting)
+        if not found:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(found))
+
+    def _passing_quick_ratio(
+        self, word: str, ids: np.ndarray, cutoff: float
+    ) -> np.ndarray:
+        """Keep the ids whose quick_ratio with word is at least cutoff.
+        Uses the same 2 * matches / total formula as difflib.
+        """
+        query = np.zeros(len(self._alphabet), dtype=np.uint16)
+        for char in word:
+            position = self._alphabet.get(char)
+            if position is not None:
+                query[position] += 1
+        matches = np.minimum(self._counts[ids], query).sum(axis=1)
+        ratios = 2.0 * matches / (len(word) + self._lengths[ids])
+        return ids[ratios >= cutoff]
+
+    def closest(self, word: str, cutoff: Optional[float] = None) -> Optional[str]:
+        """Return the best match scoring at least cutoff, or None.
+        Mirrors get_close_matches(word, vocabulary, n=1, cutoff) including
+        its tie-break on the larger string.
+        """
+        cutoff = self.cutoff if cutoff is None else cutoff
+        if cutoff < self.cutoff:
+            raise ValueError(f"cutoff {cutoff} is below the index cutoff {self.cutoff}")
+        if not word:
+            return None
+        if word in self._word_set:
+            return word
+
+        ids = self.candidates(word, cutoff)
+        if len(ids):
+            ids = self._passing_quick_ratio(word, ids, cutoff)
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        best: Optional[Tuple[float, str]] = None
+        for word_id in ids.tolist():
+            candidate = self.words[word_id]
+            matcher.set_seq1(candidate)
+            ratio = matcher.ratio()
+            if ratio >= cutoff and (best is None or (ratio, candidate) > best):
+                best = (ratio, candidate)
+        return best[1] if best else None
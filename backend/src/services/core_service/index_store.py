@@ -0,0 +1,362 @@
+"""Persistence for prebuilt per-user hybrid indexes.
+Indexes live either in Redis next to the raw user data, or on local disk
+as memory-mapped files. Both keep a process-wide LRU of open indexes.
+"""
+
+import os
+import time
+import uuid
+import fcntl
+import shutil
+import asyncio
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+from src.services.core_service.rag import HybridIndex
+from src.utility.cache import content_key
+from src.utility.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+
+class ResidentIndexes:
+    """Process-wide LRU of opened indexes, bounded by their stored size.
+    Entries carry the version they were loaded at, so an index that was
+    saved again since is never served.
+    """
+
+    def __init__(self, max_bytes: int):
+        """Create an empty LRU holding at most max_bytes of indexes."""
+        self.max_bytes = max_bytes
+        self.resident_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[str, HybridIndex, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, name: str, version: str) -> Optional[HybridIndex]:
+        """Return the index opened at version, or None."""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(name)
+            return entry[1]
+
+    def _evict(self, name: str) -> None:
+        """Drop an entry; callers hold the lock."""
+        entry = self._entries.pop(name, None)
+        if entry is not None:
+            self.resident_bytes -= entry[2]
+
+    def put(self, name: str, version: str, index: HybridIndex, size: int) -> None:
+        """Add an opened index and enforce the byte budget."""
+        with self._lock:
+            self._evict(name)
+            if size <= self.max_bytes:
+                self._entries[name] = (version, index, size)
+                self.resident_bytes += size
+            while self.resident_bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+
+    def discard(self, name: str) -> None:
+        """Forget an index that was replaced or deleted."""
+        with self._lock:
+            self._evict(name)
+
+
+class IndexStore:
+    """Save and load serialized hybrid indexes keyed by user and flag.
+    Expects Redis clients created with decode_responses=False.
+    Every save also writes a version token; read-only loads compare it
+    with the in-process LRU and only fetch and decode an index that
+    changed since it was last opened.
+    """
+
+    def __init__(
+        self,
+        client,
+        async_client=None,
+        ttl: int = 3600,
+        max_resident_bytes: int = 512 * 1024 * 1024,
+    ):
+        """Bind the store to binary-safe sync/async Redis clients and a TTL.
+        The TTL should match the one used for the raw user data.
+        """
+        self.client = client
+        self.async_client = async_client
+        self.ttl = ttl
+        self.resident = ResidentIndexes(max_resident_bytes)
+
+    @staticmethod
+    def key(user_id: str, flag: str) -> str:
+        """Build the Redis key for a user's index.
+        Mirrors the user:{user_id}:{flag} layout of the raw data.
+        """
+        return f"user:{user_id}:{flag}:index"
+
+    @classmethod
+    def version_key(cls, user_id: str, flag: str) -> str:
+        """Build the Redis key holding the index's version token."""
+        return f"{cls.key(user_id, flag)}:version"
+
+    def save(self, user_id: str, flag: str, index: HybridIndex) -> None:
+        """Persist a serialized index and a fresh version with the TTL."""
+        pipe = self.client.pipeline()
+        pipe.set(self.key(user_id, flag), index.to_bytes(), ex=self.ttl)
+        pipe.set(self.version_key(user_id, flag), uuid.uuid4().hex, ex=self.ttl)
+        pipe.execute()
+        self.resident.discard(self.key(user_id, flag))
+
+    def _remember(self, name: str, version, raw: bytes, index: HybridIndex):
+        """Keep a freshly decoded read-only index for later loads."""
+        if version is not None:
+            self.resident.put(name, version, index, len(raw))
+        return index
+
+    def load(
+        self, user_id: str, flag: str, embeddings, writable: bool = False
+    ) -> Optional[HybridIndex]:
+        """Return the stored index, or None when it is missing.
+        Read-only loads may share an index from the LRU; writable loads
+        always decode a private copy for upserts.
+        """
+        name = self.key(user_id, flag)
+        version_key = self.version_key(user_id, flag)
+        if not writable:
+            cached = self.resident.get(name, self.client.get(version_key))
+            if cached is not None:
+                return cached
+        version, raw = self.client.mget(version_key, name)
+        if raw is None:
+            return None
+        index = HybridIndex.from_bytes(raw, embeddings)
+        return index if writable else self._remember(name, version, raw, index)
+
+    async def aload(
+        self, user_id: str, flag: str, embeddings, writable: bool = False
+    ) -> Optional[HybridIndex]:
+        """Async variant of load using the asyncio Redis client.
+        Decoding runs in a worker thread to keep the event loop free.
+        """
+        name = self.key(user_id, flag)
+        version_key = self.version_key(user_id, flag)
+        if not writable:
+            version = await self.async_client.get(version_key)
+            cached = self.resident.get(name, version)
+            if cached is not None:
+                return cached
+        version, raw = await self.async_client.mget(version_key, name)
+        if raw is None:
+            return None
+        index = await asyncio.to_thread(HybridIndex.from_bytes, raw, embeddings)
+        return index if writable else self._remember(name, version, raw, index)
+
+    def touch(self, user_id: str, flag: str) -> None:
+        """Refresh the TTL of an index whose corpus did not change."""
+        self.client.expire(self.key(user_id, flag), self.ttl)
+        self.client.expire(self.version_key(user_id, flag), self.ttl)
+
+    def delete(self, user_id: str, flag: str) -> None:
+        """Drop a stale index so searches fall back to the raw data."""
+        self.client.delete(self.key(user_id, flag), self.version_key(user_id, flag))
+        self.resident.discard(self.key(user_id, flag))
+
+
+class DiskIndexStore:
+    """Node-local index store with memory-mapped vectors.
+    Each save writes a fresh version directory and then atomically swaps a
+    CURRENT pointer file, so readers never see a half-written index and
+    workers on the same node pick up new versions on their next load.
+    Saves of one user's index are serialized across processes by a LOCK
+    file in its folder, which is never removed so every process locks the
+    same file. Replaced versions stay on disk for a grace period, so a
+    reader in another process that is still opening one can finish.
+    Opened indexes are kept in an LRU bounded by their on-disk size; a miss
+    reopens the files, which only maps the vectors instead of reading them.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        ttl: int = 3600,
+        max_resident_bytes: int = 512 * 1024 * 1024,
+        grace: int = 60,
+    ):
+        """Create the store under root with a TTL and residency budget.
+        Indexes whose pointer is older than ttl seconds count as missing,
+        and are swept from disk now and then at most once per ttl on save.
+        Versions are deleted once they were replaced grace seconds ago.
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.grace = grace
+        self.resident = ResidentIndexes(max_resident_bytes)
+        self.sweep()
+
+    def directory(self, user_id: str, flag: str) -> Path:
+        """Return the folder holding every version of a user's index.
+        Names are hashed so arbitrary user ids are safe as paths.
+        """
+        return self.root / content_key(user_id, flag)[:32]
+
+    def _current(self, folder: Path) -> Optional[str]:
+        """Return the live version name, or None if missing or expired."""
+        if self._age(folder / "CURRENT") > self.ttl:
+            return None
+        return self._pointer(folder)
+
+    @staticmethod
+    def _pointer(folder: Path) -> Optional[str]:
+        """Return the version CURRENT names, expired or not."""
+        try:
+            return (folder / "CURRENT").read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    @contextmanager
+    def _lock(folder: Path, blocking: bool = True) -> Iterator[bool]:
+        """Hold the folder's LOCK file; yields False if non-blocking and busy."""
+        folder.mkdir(parents=True, exist_ok=True)
+        with open(folder / "LOCK", "a") as handle:
+            try:
+                fcntl.flock(
+                    handle, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+                )
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _age(path: Path) -> float:
+        """Return seconds since path was last modified, or inf if missing."""
+        try:
+            return time.time() - path.stat().st_mtime
+        except FileNotFoundError:
+            return float("inf")
+
+    @staticmethod
+    def _retire(folder: Path, version: Optional[str]) -> None:
+        """Start the grace period of a version that is no longer current."""
+        if version:
+            try:
+                os.utime(folder / version)
+            except FileNotFoundError:
+                pass
+
+    def _prune(self, folder: Path, current: Optional[str]) -> None:
+        """Delete versions other than current that outlived the grace period.
+        Callers hold the folder's lock, so no save is writing any of them;
+        processes that still map one keep working because unlinked files
+        stay readable until unmapped.
+        """
+        for version in folder.iterdir():
+            if (
+                version.is_dir()
+                and version.name != current
+                and self._age(version) > self.grace
+            ):
+                shutil.rmtree(version, ignore_errors=True)
+
+    def save(self, user_id: str, flag: str, index: HybridIndex) -> None:
+        """Write a new version and make it current.
+        The replaced version is kept until its grace period ends and is
+        deleted by a later save or sweep.
+        """
+        folder = self.directory(user_id, flag)
+        version = uuid.uuid4().hex
+        with self._lock(folder):
+            previous = self._pointer(folder)
+            size = index.save(folder / version)
+            tmp_pointer = folder / f"CURRENT.{version}.tmp"
+            tmp_pointer.write_text(version)
+            os.replace(tmp_pointer, folder / "CURRENT")
+            if previous != version:
+                self._retire(folder, previous)
+            self._prune(folder, version)
+        if time.time() - self._swept_at > self.ttl:
+            self.sweep()
+
+        # The saved object may be mutated later, so residency starts on reopen
+        self.resident.discard(folder.name)
+        logger.info(f"Saved index version {version} ({size} bytes) to {folder}")
+
+    def sweep(self) -> int:
+        """Delete expired indexes and leftovers of interrupted saves.
+        An index expires once its CURRENT is older than ttl; its pointer
+        and version files go, while the folder and its LOCK stay. Folders
+        being saved are skipped. Returns how many indexes expired.
+        """
+        self._swept_at = time.time()
+        removed = 0
+        for folder in list(self.root.iterdir()):
+            if not folder.is_dir():
+                continue
+            with self._lock(folder, blocking=False) as locked:
+                if not locked:
+                    continue
+                current = self._pointer(folder)
+                if current and self._age(folder / "CURRENT") > self.ttl:
+                    (folder / "CURRENT").unlink(missing_ok=True)
+                    self.resident.discard(folder.name)
+                    current = None
+                    removed += 1
+                self._prune(folder, current)
+        if removed:
+            logger.info(f"Swept {removed} expired indexes from {self.root}")
+        return removed
+
+    def load(
+        self, user_id: str, flag: str, embeddings, writable: bool = False
+    ) -> Optional[HybridIndex]:
+        """Return the live index, or None when it is missing or expired.
+        Read-only loads are memory-mapped and shared through the LRU;
+        writable loads read a private in-memory copy for upserts.
+        """
+        folder = self.directory(user_id, flag)
+        version = self._current(folder)
+        if version is None:
+            return None
+
+        if writable:
+            return HybridIndex.open(folder / version, embeddings, mmap=False)
+
+        cached = self.resident.get(folder.name, version)
+        if cached is not None:
+            return cached
+
+        index = HybridIndex.open(folder / version, embeddings, mmap=True)
+        size = sum(path.stat().st_size for path in (folder / version).iterdir())
+        self.resident.put(folder.name, version, index, size)
+        return index
+
+    async def aload(
+        self, user_id: str, flag: str, embeddings, writable: bool = False
+    ) -> Optional[HybridIndex]:
+        """Async variant of load; file access runs in a worker thread."""
+        return await asyncio.to_thread(self.load, user_id, flag, embeddings, writable)
+
+    def touch(self, user_id: str, flag: str) -> None:
+        """Refresh the TTL of an index whose corpus did not change."""
+        pointer = self.directory(user_id, flag) / "CURRENT"
+        if pointer.exists():
+            os.utime(pointer)
+
+    def delete(self, user_id: str, flag: str) -> None:
+        """Drop a stale index so searches fall back to the raw data.
+        Only CURRENT goes right away; the version it named is retired and
+        the LOCK file stays, so waiting savers keep excluding each other.
+        """
+        folder = self.directory(user_id, flag)
+        self.resident.discard(folder.name)
+        if folder.exists():
+            with self._lock(folder):
+                self._retire(folder, self._pointer(folder))
+                (folder / "CURRENT").unlink(missing_ok=True)
+                self._prune(folder, None)
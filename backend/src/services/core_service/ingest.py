@@ -0,0 +1,153 @@
+"""Incremental ingestion of NDJSON history uploads.
+Lines are validated as they arrive and handed on in fixed-size batches
+through a bounded queue, so parsing buffers stay bounded and a slow
+consumer stops the body from being read any further.
+"""
+
+import os
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+from pydantic import ValidationError
+from src.models.core import HistoryItem
+from src.utility.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+_DONE = object()
+
+
+class IngestError(ValueError):
+    """Raised when an upload line is malformed or too long."""
+
+    def __init__(self, message: str, too_large: bool = False):
+        """Keep whether the failure was a size limit, for the status code."""
+        super().__init__(message)
+        self.too_large = too_large
+
+
+class NdjsonIngestor:
+    """Validate NDJSON HistoryItem lines from a byte stream in batches.
+    At most max_line_bytes of an unfinished line and max_pending_batches
+    validated batches are buffered; beyond that reading pauses until the
+    consumer catches up, which backs up into the client's upload.
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        max_line_bytes: Optional[int] = None,
+        max_pending_batches: int = 2,
+    ):
+        """Configure batching and buffers, read from INGEST_BATCH_SIZE and
+        INGEST_MAX_LINE_BYTES when not given.
+        """
+        self.batch_size = batch_size or int(os.getenv("INGEST_BATCH_SIZE") or 500)
+        self.max_line_bytes = max_line_bytes or int(
+            os.getenv("INGEST_MAX_LINE_BYTES") or 1024 * 1024
+        )
+        self.max_pending_batches = max_pending_batches
+
+    def _parse(self, line: bytes, number: int) -> Optional[dict]:
+        """Validate one line; blank lines are skipped."""
+        if not line.strip():
+            return None
+        if len(line) > self.max_line_bytes:
+            raise IngestError(
+                f"Line {number} exceeds {self.max_line_bytes} bytes", too_large=True
+            )
+        try:
+            return HistoryItem.model_validate_json(line).model_dump()
+        except ValidationError as exc:
+            errors = "; ".join(
+                f"{'.'.join(map(str, error['loc'])) or 'line'}: {error['msg']}"
+                for error in exc.errors()
+            )
+            raise IngestError(f"Line {number}: {errors}") from exc
+
+    async def batches(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[List[dict]]:
+        """Yield validated items in batches of batch_size as bytes arrive.
+        Nothing more is read from chunks while a batch is being handled.
+        """
+        buffer = bytearray()
+        batch: List[dict] = []
+        number = 0
+        async for chunk in chunks:
+            buffer += chunk
+            start = 0
+            while True:
+                end = buffer.find(b"\n", start)
+                if end < 0:
+                    break
+                number += 1
+                item = self._parse(bytes(buffer[start:end]), number)
+                start = end + 1
+                if item is None:
+                    continue
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+            del buffer[:start]
+            if len(buffer) > self.max_line_bytes:
+                raise IngestError(
+                    f"Line {number + 1} exceeds {self.max_line_bytes} bytes",
+                    too_large=True,
+                )
+
+        item = self._parse(bytes(buffer), number + 1)
+        if item is not None:
+            batch.append(item)
+        if batch:
+            yield batch
+
+    async def ingest(
+        self,
+        chunks: AsyncIterator[bytes],
+        handle: Callable[[List[dict]], Awaitable[None]],
+    ) -> int:
+        """Validate the stream and await handle on every batch.
+        Parsing runs ahead of handle by at most max_pending_batches, so the
+        upload and the batch work overlap. On a malformed line the batch
+        being handled finishes, queued ones are dropped unhandled, and the
+        IngestError is raised. Returns the number of items.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending_batches)
+        failed = asyncio.Event()
+
+        async def consume() -> int:
+            count = 0
+            while True:
+                batch = await queue.get()
+                if batch is _DONE or failed.is_set():
+                    return count
+                await handle(batch)
+                count += len(batch)
+
+        consumer = asyncio.create_task(consume())
+
+        async def put(item) -> None:
+            # Waiting here while the queue is full is the backpressure
+            task = asyncio.create_task(queue.put(item))
+            await asyncio.wait({task, consumer}, return_when=asyncio.FIRST_COMPLETED)
+            if not task.done():
+                task.cancel()
+                # The consumer stopped early, so its error ends the upload
+                await consumer
+                raise RuntimeError("Batch consumer exited before the stream ended")
+
+        try:
+            try:
+                async for batch in self.batches(chunks):
+                    await put(batch)
+            except IngestError:
+                # The upload fails anyway, so no further batch is worth handling
+                failed.set()
+                if not queue.full():
+                    queue.put_nowait(_DONE)
+                await consumer
+                raise
+            await put(_DONE)
+            return await consumer
+        finally:
+            if not consumer.done():
+                consumer.cancel()
@@ -1,40 +1,66 @@
 """Core retrieval orchestration for SurfMind RAG flows.
-Provides synchronous and streaming pipelines for search.
+Provides synchronous, async and streaming pipelines for search.
 Includes a mock streamer to test UI progress handling.
 """
 
 import time
-from typing import List, Dict, Any, Generator
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, AsyncGenerator, Generator, Optional, Set, Tuple
 from src.services.llm_service.llm_provider import LLMProvider
 from src.models.core import Document, SearchRequest, SearchResponse
 from src.services.post_processing_service.post_processing import PostProcessing
-from src.services.core_service.rag import HybridRAGService, LLMRag
+from src.services.post_processing_service.relevance import LocalRelevanceScorer
+from src.services.core_service.corpus_store import content_digest
+from src.services.core_service.dedup import HistoryDeduplicator, canonicalize_url
+from src.services.core_service.rag import HybridRAGService, HybridIndex, LLMRag
 from src.utility.logger import AppLogger
 
 logger = AppLogger.get_logger(__name__)
 
+# Bounded pool shared by all requests for independent pipeline steps
+step_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag-step")
+
 
 class CoreRetrieval:
     """Coordinate retrieval, LLM calls, parsing, and post-processing.
     Builds documents from user data and delegates retrieval to RAG services.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        llm_client: Optional[LLMProvider] = None,
+        post_processing: Optional[PostProcessing] = None,
+        rag: Optional[HybridRAGService] = None,
+        llm_rag: Optional[LLMRag] = None,
+        deduplicator: Optional[HistoryDeduplicator] = None,
+        executor: Optional[ThreadPoolExecutor] = None,
+    ):
         """Initialize shared service dependencies for the RAG pipeline.
         Wires up LLM provider, post-processing, and retriever components.
+        Missing components are built around a single LLMProvider, and
+        pipeline steps run on the module's step_executor unless given one.
         """
-        self.llm_client = LLMProvider()
-        self.post_processing = PostProcessing()
-        self.rag = HybridRAGService()
-        self.llm_rag = LLMRag()
+        self.llm_client = llm_client or LLMProvider()
+        self.rag = rag or HybridRAGService()
+        self.post_processing = post_processing or PostProcessing(
+            llm_provider=self.llm_client,
+            relevance=LocalRelevanceScorer(provider=self.rag.embedding_provider),
+        )
+        self.llm_rag = llm_rag or LLMRag(llm_provider=self.llm_client)
+        self.deduplicator = deduplicator or HistoryDeduplicator()
+        self.executor = executor or step_executor
 
     def _build_parent_documents(self, history: List[dict], flag: str) -> List[Document]:
         """Convert raw history items into parent Document objects.
         Maps fields to metadata used by retrieval and post-processing.
+        Duplicate pages are collapsed first, so each is chunked only once.
         Returns a list of parent-level documents for chunking.
         """
         docs: List[Document] = []
-        for item in history:
+        for item in self.deduplicator.collapse(history):
             docs.append(
                 Document(
                     page_content=item.get("content", ""),
@@ -43,12 +69,98 @@ class CoreRetrieval:
                         "date": item.get("date", "Unknown"),
                         "title": item.get("title", ""),
                         "type": flag,
+                        "visit_dates": item.get("visit_dates", []),
+                        "aliases": item.get("aliases", []),
                     },
                 )
             )
 
         return docs
 
+    def build_index(self, history: List[dict], flag: str) -> HybridIndex:
+        """Build the hybrid index for a user's raw history items.
+        Called at save time so searches can skip chunking and embedding.
+        """
+        parent_docs = self._build_parent_documents(history=history, flag=flag)
+        if not parent_docs:
+            raise ValueError("No history data to index")
+        return self.rag.build_index(parent_docs)
+
+    def warm_index(self, history: List[dict], flag: str) -> int:
+        """Embed a slice of an upload before its index is built.
+        Lets streamed uploads spend their embedding time while the rest of
+        the body is still arriving. Returns the number of chunks embedded.
+        """
+        parent_docs = self._build_parent_documents(history=history, flag=flag)
+        return self.rag.warm_embeddings(parent_docs)
+
+    def merge_history(
+        self, stored: List[dict], incoming: List[dict]
+    ) -> Tuple[List[dict], List[dict]]:
+        """Merge incoming items into the stored corpus by URL.
+        Returns the merged corpus and the items that were new or changed.
+        Unchanged items are skipped so they cost no index work. Stored rows
+        may carry a content digest instead of their content.
+        """
+        merged: Dict[str, dict] = {item.get("url"): item for item in stored}
+        changed = self.changed_items(merged, incoming)
+        merged.update((item.get("url"), item) for item in changed)
+        return list(merged.values()), changed
+
+    @staticmethod
+    def changed_items(stored: Dict[str, dict], incoming: List[dict]) -> List[dict]:
+        """Return the incoming items that are new or differ from stored.
+        stored maps URLs to rows, which may carry a content digest instead
+        of their content; of several items with one URL the last wins.
+        """
+        changed: Dict[str, dict] = {}
+        for item in incoming:
+            url = item.get("url")
+            current = stored.get(url)
+            if (
+                current is not None
+                and current.get("date") == item.get("date")
+                and (current.get("digest") or content_digest(current.get("content")))
+                == content_digest(item.get("content"))
+            ):
+                changed.pop(url, None)
+                continue
+            changed[url] = item
+        return list(changed.values())
+
+    def upsert_index(
+        self,
+        index: HybridIndex,
+        changed: List[dict],
+        flag: str,
+        corpus: Optional[List[dict]] = None,
+    ) -> HybridIndex:
+        """Apply new or changed history items to a prebuilt index.
+        Only the affected parents are re-chunked and re-embedded. With the
+        merged corpus, it is collapsed as a full build would, and every
+        parent linked to a changed item through a shared URL, before or
+        after collapsing, is rebuilt, so near-duplicates merge and split
+        the same way as in a full build.
+        """
+        if corpus is None:
+            parent_docs = self._build_parent_documents(history=changed, flag=flag)
+            return self.rag.upsert_index(index, parent_docs)
+
+        collapsed = self._build_parent_documents(history=corpus, flag=flag)
+        old_keys = [self.rag.parent_keys(parent) for parent in index.parents]
+        new_keys = [self.rag.parent_keys(doc) for doc in collapsed]
+        affected = {canonicalize_url(item.get("url")) for item in changed}
+        selected: Set[int] = set()
+        size = -1
+        while size != len(affected):
+            size = len(affected)
+            for keys in old_keys + new_keys:
+                if keys & affected:
+                    affected |= keys
+            selected.update(n for n, keys in enumerate(new_keys) if keys & affected)
+        parent_docs = [collapsed[n] for n in sorted(selected)]
+        return self.rag.upsert_index(index, parent_docs)
+
     def _empty_response(self, message: str) -> SearchResponse:
         """Create a standardized empty SearchResponse with a message.
         Used when no history or no relevant data is found.
@@ -68,109 +180,402 @@ class CoreRetrieval:
         """
         return {"step": step, "data": data}
 
-    def invoke_rag(self, data: SearchRequest, history: List[dict]) -> SearchResponse:
+    def _doc_preview(self, content: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Reduce a document to the fields the extension lists as a result."""
+        return {
+            "url": metadata.get("source"),
+            "title": metadata.get("title", ""),
+            "date": metadata.get("date"),
+            "snippet": " ".join(content[:200].split()),
+        }
+
+    def _retrieved_event(self, retrieved_parents: List[Document]) -> Dict[str, Any]:
+        """Build the event sent right after retrieval, before any LLM call.
+        Carries the ranked candidates so results can render immediately.
+        """
+        return self._stream_event(
+            "retrieved_parents",
+            {
+                "count": len(retrieved_parents),
+                "docs": [
+                    self._doc_preview(doc.page_content, doc.metadata)
+                    for doc in retrieved_parents
+                ],
+            },
+        )
+
+    def _step_event(self, step: str, output: Any) -> Dict[str, Any]:
+        """Convert a finished pipeline step into its SSE event payload."""
+        if step == "llm_token":
+            return self._stream_event(step, {"text": output})
+        if step == "llm_response":
+            result, model = output
+            return self._stream_event(step, {"text": result, "model": model})
+        if step == "output_parser":
+            return self._stream_event(step, {"format": output})
+        return self._stream_event(
+            step,
+            {
+                "validated_docs": len(output),
+                "docs": [
+                    self._doc_preview(doc["content"], doc["metadata"]) for doc in output
+                ],
+            },
+        )
+
+    def _answer_steps(
+        self,
+        ques: str,
+        flag: str,
+        retrieved_parents: List[Document],
+        stream_tokens: bool = False,
+    ) -> Generator[Tuple[str, Any], None, None]:
+        """Run the LLM steps with independent work in parallel.
+        The relevance judge only needs the retrieved parents, so it runs
+        alongside the summary and its structured parse; when retrieval
+        marked the top parent as dominant, only local relevance scores
+        filter the candidates. Yields (step, result) pairs in completion
+        order; with stream_tokens, non-empty summary text chunks are yielded
+        as ("llm_token", text) before the llm_response step.
+        Steps not yet started are cancelled if the caller stops early, and
+        a streaming summary stops at its next token.
+        """
+        top_doc = retrieved_parents[0]
+        source = top_doc.metadata.get("source")
+        # Step completions and tokens share one queue to keep their order
+        events: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+        steps: Dict[Future, str] = {}
+
+        def submit(step: str, fn, **kwargs) -> None:
+            future = self.executor.submit(fn, **kwargs)
+            steps[future] = step
+            future.add_done_callback(lambda f: events.put(("done", f)))
+
+        dominant = top_doc.metadata.get("dominant", False)
+        if not dominant:
+            submit(
+                "post_processing",
+                self.post_processing.post_process,
+                ques=ques,
+                url=source,
+                docs=retrieved_parents,
+            )
+        summary_kwargs = dict(
+            context=top_doc.page_content,
+            date=top_doc.metadata.get("date"),
+            url=source,
+            flag=flag,
+        )
+        closed = threading.Event()
+
+        def on_token(text: str) -> None:
+            if closed.is_set():
+                raise RuntimeError("Answer stream closed by the caller")
+            events.put(("token", text))
+
+        if stream_tokens:
+            submit(
+                "llm_response",
+                self.llm_rag.stream_llm_response,
+                on_token=on_token,
+                **summary_kwargs,
+            )
+        else:
+            submit(
+                "llm_response", self.llm_rag.safe_invoke_llm_response, **summary_kwargs
+            )
+        remaining = len(steps)
+        try:
+            if dominant:
+                # A clear retrieval winner leaves the judge little to decide
+                yield "post_processing", self.post_processing.post_process_locally(
+                    source, retrieved_parents
+                )
+            while remaining:
+                kind, item = events.get()
+                if kind == "token":
+                    # Models close their stream with an empty chunk
+                    if item:
+                        yield "llm_token", item
+                    continue
+                remaining -= 1
+                step = steps[item]
+                result = item.result()
+                if step == "llm_response":
+                    submit(
+                        "output_parser",
+                        self.llm_rag.parse_response,
+                        content=result[0],
+                        flag=flag,
+                        url=source,
+                        date=top_doc.metadata.get("date"),
+                    )
+                    remaining += 1
+                yield step, result
+        finally:
+            # Queued steps never start; running ones cannot be interrupted
+            closed.set()
+            for future in steps:
+                future.cancel()
+
+    async def _aanswer_steps(
+        self,
+        ques: str,
+        flag: str,
+        retrieved_parents: List[Document],
+        stream_tokens: bool = False,
+    ) -> AsyncGenerator[Tuple[str, Any], None]:
+        """Async variant of _answer_steps built on asyncio tasks.
+        Cancels outstanding steps if one of them fails.
+        """
+        top_doc = retrieved_parents[0]
+        source = top_doc.metadata.get("source")
+        events: "asyncio.Queue[Tuple[str, Any]]" = asyncio.Queue()
+        steps: Dict[asyncio.Task, str] = {}
+
+        def start(step: str, coro) -> None:
+            task = asyncio.create_task(coro)
+            steps[task] = step
+            task.add_done_callback(lambda t: events.put_nowait(("done", t)))
+
+        dominant = top_doc.metadata.get("dominant", False)
+        if not dominant:
+            start(
+                "post_processing",
+                self.post_processing.apost_process(
+                    ques=ques, url=source, docs=retrieved_parents
+                ),
+            )
+        summary_kwargs = dict(
+            context=top_doc.page_content,
+            date=top_doc.metadata.get("date"),
+            url=source,
+            flag=flag,
+        )
+        if stream_tokens:
+            start(
+                "llm_response",
+                self.llm_rag.astream_llm_response(
+                    on_token=lambda text: events.put_nowait(("token", text)),
+                    **summary_kwargs,
+                ),
+            )
+        else:
+            start(
+                "llm_response", self.llm_rag.asafe_invoke_llm_response(**summary_kwargs)
+            )
+        remaining = len(steps)
+        try:
+            if dominant:
+                # The summary task is already running if the caller stops here
+                yield "post_processing", self.post_processing.post_process_locally(
+                    source, retrieved_parents
+                )
+            while remaining:
+                kind, item = await events.get()
+                if kind == "token":
+                    # Models close their stream with an empty chunk
+                    if item:
+                        yield "llm_token", item
+                    continue
+                remaining -= 1
+                step = steps[item]
+                result = item.result()
+                if step == "llm_response":
+                    start(
+                        "output_parser",
+                        self.llm_rag.aparse_response(
+                            content=result[0],
+                            flag=flag,
+                            url=source,
+                            date=top_doc.metadata.get("date"),
+                        ),
+                    )
+                    remaining += 1
+                yield step, result
+        finally:
+            for task in steps:
+                if not task.done():
+                    task.cancel()
+
+    def invoke_rag(
+        self,
+        data: SearchRequest,
+        history: Optional[List[dict]] = None,
+        index: Optional[HybridIndex] = None,
+    ) -> SearchResponse:
         """Run the full RAG pipeline and return a final response.
+        Uses the prebuilt index when given, otherwise indexes history.
         Returns a SearchResponse ready for API consumption.
         """
         ques = data.query
         flag = data.flag
-        parent_docs = self._build_parent_documents(history=history, flag=flag)
-        if not parent_docs:
-            logger.warning("No history data found")
-            return self._empty_response("No history data found")
+        parent_docs = None
+        if index is None:
+            parent_docs = self._build_parent_documents(history=history or [], flag=flag)
+            if not parent_docs:
+                logger.warning("No history data found")
+                return self._empty_response("No history data found")
 
         # List of combined docs from bm25 and faiss
         retrieved_parents = self.rag.retrieve_parents(
             query=ques,
             parent_docs=parent_docs,
+            index=index,
         )
         if not retrieved_parents:
             logger.warning("No relevant data found")
             return self._empty_response("No relevant data found")
 
-        top_doc = retrieved_parents[0]
-        context = top_doc.page_content
-        source = top_doc.metadata.get("source")
-        date = top_doc.metadata.get("date")
-
-        result, model = self.llm_rag.safe_invoke_llm_response(
-            context=context, date=date, url=source, flag=flag
-        )
-        pchain = self.llm_rag.structure(flag=flag)
-        finalOutput = pchain.invoke({"content": result})
-        final_docs = self.post_processing.post_process(
-            ques=ques, url=source, docs=retrieved_parents
-        )
+        outputs = dict(self._answer_steps(ques, flag, retrieved_parents))
+        result, model = outputs["llm_response"]
         res = SearchResponse(
             success=True,
             result=result,
-            format=finalOutput,
+            format=outputs["output_parser"],
             model=model,
-            docs=final_docs,
+            docs=outputs["post_processing"],
         )
         return res
 
     def stream_rag(
-        self, data: SearchRequest, history: List[dict]
+        self,
+        data: SearchRequest,
+        history: Optional[List[dict]] = None,
+        index: Optional[HybridIndex] = None,
     ) -> Generator[Dict[str, Any], None, None]:
         """Stream progress events for each major RAG pipeline step.
         Enables SSE clients to show intermediate status updates.
+        Summary text is forwarded as llm_token events while it is generated.
         """
         ques = data.query
         flag = data.flag
-        parent_docs = self._build_parent_documents(history=history, flag=flag)
-        if not parent_docs:
-            res = self._empty_response("No history data found")
-            yield self._stream_event("final", res.dict())
-            return
+        parent_docs = None
+        if index is None:
+            parent_docs = self._build_parent_documents(history=history or [], flag=flag)
+            if not parent_docs:
+                res = self._empty_response("No history data found")
+                yield self._stream_event("final", res.dict())
+                return
 
         retrieved_parents = self.rag.retrieve_parents(
             query=ques,
             parent_docs=parent_docs,
+            index=index,
         )
-        yield self._stream_event(
-            "retrieved_parents",
-            {"count": len(retrieved_parents)},
-        )
+        yield self._retrieved_event(retrieved_parents)
         if not retrieved_parents:
             res = self._empty_response("No relevant data found")
             yield self._stream_event("final", res.dict())
             return
 
-        top_doc = retrieved_parents[0]
-        context = top_doc.page_content
-        source = top_doc.metadata.get("source")
-        date = top_doc.metadata.get("date")
+        # Steps finish in any order; each event is sent as soon as it is ready
+        outputs: Dict[str, Any] = {}
+        for step, output in self._answer_steps(
+            ques, flag, retrieved_parents, stream_tokens=True
+        ):
+            outputs[step] = output
+            yield self._step_event(step, output)
 
-        result, model = self.llm_rag.safe_invoke_llm_response(
-            context=context, date=date, url=source, flag=flag
-        )
-        yield self._stream_event(
-            "llm_response",
-            {"text": result, "model": model},
+        result, model = outputs["llm_response"]
+        res = SearchResponse(
+            success=True,
+            result=result,
+            format=outputs["output_parser"],
+            model=model,
+            docs=outputs["post_processing"],
         )
+        yield self._stream_event("final", res.model_dump())
 
-        pchain = self.llm_rag.structure(flag=flag)
-        final_output = pchain.invoke({"content": result})
-        yield self._stream_event(
-            "output_parser",
-            {"format": final_output},
+    async def ainvoke_rag(
+        self,
+        data: SearchRequest,
+        history: Optional[List[dict]] = None,
+        index: Optional[HybridIndex] = None,
+    ) -> SearchResponse:
+        """Async variant of invoke_rag for non-blocking request handling.
+        Awaits embedding and LLM calls instead of parking a worker thread.
+        """
+        ques = data.query
+        flag = data.flag
+        parent_docs = None
+        if index is None:
+            # Near-duplicate detection is CPU-bound, so keep it off the loop
+            parent_docs = await asyncio.to_thread(
+                self._build_parent_documents, history=history or [], flag=flag
+            )
+            if not parent_docs:
+                logger.warning("No history data found")
+                return self._empty_response("No history data found")
+
+        retrieved_parents = await self.rag.aretrieve_parents(
+            query=ques,
+            parent_docs=parent_docs,
+            index=index,
         )
+        if not retrieved_parents:
+            logger.warning("No relevant data found")
+            return self._empty_response("No relevant data found")
 
-        final_docs = self.post_processing.post_process(
-            ques=ques, url=source, docs=retrieved_parents
+        outputs = {
+            step: output
+            async for step, output in self._aanswer_steps(ques, flag, retrieved_parents)
+        }
+        result, model = outputs["llm_response"]
+        return SearchResponse(
+            success=True,
+            result=result,
+            format=outputs["output_parser"],
+            model=model,
+            docs=outputs["post_processing"],
         )
-        yield self._stream_event(
-            "post_processing",
-            {"validated_docs": len(final_docs)},
+
+    async def astream_rag(
+        self,
+        data: SearchRequest,
+        history: Optional[List[dict]] = None,
+        index: Optional[HybridIndex] = None,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Async variant of stream_rag emitting the same step events.
+        Suitable for async SSE endpoints.
+        """
+        ques = data.query
+        flag = data.flag
+        parent_docs = None
+        if index is None:
+            parent_docs = await asyncio.to_thread(
+                self._build_parent_documents, history=history or [], flag=flag
+            )
+            if not parent_docs:
+                res = self._empty_response("No history data found")
+                yield self._stream_event("final", res.model_dump())
+                return
+
+        retrieved_parents = await self.rag.aretrieve_parents(
+            query=ques,
+            parent_docs=parent_docs,
+            index=index,
         )
+        yield self._retrieved_event(retrieved_parents)
+        if not retrieved_parents:
+            res = self._empty_response("No relevant data found")
+            yield self._stream_event("final", res.model_dump())
+            return
 
+        outputs: Dict[str, Any] = {}
+        async for step, output in self._aanswer_steps(
+            ques, flag, retrieved_parents, stream_tokens=True
+        ):
+            outputs[step] = output
+            yield self._step_event(step, output)
+
+        result, model = outputs["llm_response"]
         res = SearchResponse(
             success=True,
             result=result,
-            format=final_output,
+            format=outputs["output_parser"],
             model=model,
-            docs=final_docs,
+            docs=outputs["post_processing"],
         )
         yield self._stream_event("final", res.model_dump())
 
@@ -269,15 +674,3 @@ class CoreRetrieval:
             "final",
             res.model_dump(),
         )
-
-
-class Retrieval:
-    """Factory for providing a CoreRetrieval instance to FastAPI."""
-
-    @staticmethod
-    def get_retrieval_service() -> CoreRetrieval:
-        """Create a new CoreRetrieval instance for request handling.
-        Keeps dependency injection explicit and testable.
-        Separates construction from API controller code.
-        """
-        return CoreRetrieval()
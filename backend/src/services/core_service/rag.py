@@ -7,28 +7,243 @@ Hybrid RAG implementation for SurfMind (FREE version)
 - Explicit parent mapping
 """
 
+import io
+import os
+import asyncio
 import re
+import copy
+import json
+import faiss
 import difflib
+import numpy as np
+from pathlib import Path
 from termcolor import cprint
-from collections import defaultdict
-from typing import List, Tuple, Optional, Any, Dict, Set
+from typing import Callable, List, Literal, Tuple, Optional, Any, Dict, Set
 
 from langchain_core.documents import Document
 from langchain_core.runnables import Runnable
-from src.models.core import Ans_bookmark, Ans_history
+from src.models.core import Ans_bookmark, Ans_history, Document as ParentDocument
 from langchain_core.runnables import RunnablePassthrough
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
-from langchain_community.retrievers import BM25Retriever
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
 
+from src.services.core_service.bm25 import BM25Index
+from src.services.core_service.dedup import canonicalize_url
+from src.services.core_service.extraction import extract_structure
+from src.services.core_service.fusion import RankFusion
+from src.services.core_service.fuzzy import FuzzyIndex
 from src.services.llm_service.llm_provider import LLMProvider
 from src.services.llm_service.prompt_builder import Prompts
-from src.utility.provider import EmbeddingsProvider as ef
+from src.utility.provider import EmbeddingProvider, EmbeddingsProvider as ef
+from src.utility.summary_cache import SummaryCache
 from src.utility.logger import AppLogger
 
 logger = AppLogger.get_logger(__name__)
 
+VectorQuantization = Literal["none", "sq8", "pq"]
+
+# Trained indexes are retrained once the corpus outgrows their sample this much
+RETRAIN_GROWTH = 2
+
+
+def training_size(index: faiss.Index) -> int:
+    """Vectors a freshly built FAISS index was trained on; zero for flat ones."""
+    return 0 if isinstance(index, faiss.IndexFlat) else index.ntotal
+
+
+class HybridIndex:
+    """Prebuilt retrieval artifacts for a single user corpus.
+    Holds parents, child chunks, vocabulary, BM25 and FAISS stores, plus
+    float16 chunk vectors for re-ranking when the FAISS store is quantized.
+    """
+
+    def __init__(
+        self,
+        parents: List[Any],
+        child_docs: List[Document],
+        vocabulary: FuzzyIndex,
+        bm25: BM25Index,
+        vectorstore: FAISS,
+        exact: Optional[np.ndarray] = None,
+        trained_on: Optional[int] = None,
+    ):
+        """Bundle the artifacts produced by HybridRAGService.build_index.
+        Keeps everything needed to answer a query without re-embedding.
+        exact rows follow FAISS ids and are used for re-ranking;
+        trained_on counts the vectors the FAISS codes were trained on.
+        """
+        self.parents = parents
+        self.child_docs = child_docs
+        self.vocabulary = vocabulary
+        self.bm25 = bm25
+        self.vectorstore = vectorstore
+        self.exact = exact
+        if trained_on is None:
+            trained_on = training_size(vectorstore.index)
+        self.trained_on = trained_on
+        self._positions: Optional[Dict[str, int]] = None
+
+    def refresh(self) -> None:
+        """Forget lookups derived from the vector store after it changed."""
+        self._positions = None
+
+    def id_space(self) -> int:
+        """Return one past the highest FAISS id in use.
+        Exact rows are indexed by FAISS id, so they span the same range.
+        """
+        ids = self.vectorstore.index_to_docstore_id
+        used = max(ids) + 1 if ids else 0
+        return max(used, 0 if self.exact is None else len(self.exact))
+
+    def chunk_vectors(self, parent_id: int) -> Optional[np.ndarray]:
+        """Return the stored vectors of a parent's chunks.
+        Exact rows are used when kept, otherwise FAISS decodes its codes;
+        None when the index cannot reconstruct vectors.
+        """
+        if self._positions is None:
+            self._positions = {
+                doc_id: position
+                for position, doc_id in self.vectorstore.index_to_docstore_id.items()
+            }
+        positions = []
+        # Chunk ids are "<parent_id>:<n>" with n counting up from zero
+        while f"{parent_id}:{len(positions)}" in self._positions:
+            positions.append(self._positions[f"{parent_id}:{len(positions)}"])
+        if not positions:
+            return None
+        if self.exact is not None:
+            return np.asarray(self.exact[positions], dtype=np.float32)
+        try:
+            return self.vectorstore.index.reconstruct_batch(
+                np.asarray(positions, dtype=np.int64)
+            )
+        except RuntimeError:
+            # IVF indexes built without a direct map cannot reconstruct
+            return None
+
+    @staticmethod
+    def _document(doc: Any) -> dict:
+        """Return a JSON-safe form of a parent or child document."""
+        form = {"page_content": doc.page_content, "metadata": doc.metadata}
+        if getattr(doc, "id", None) is not None:
+            form["id"] = doc.id
+        return form
+
+    def _meta(self) -> bytes:
+        """Encode documents, vocabulary and the FAISS id map as JSON.
+        The docstore holds the child chunks, so only their ids are kept.
+        """
+        ids = self.vectorstore.index_to_docstore_id
+        meta = {
+            "parents": [self._document(doc) for doc in self.parents],
+            "child_docs": [self._document(doc) for doc in self.child_docs],
+            "vocabulary": self.vocabulary.words,
+            # IVF upserts leave unused FAISS ids, which are stored as null
+            "index_to_docstore_id": [ids.get(i) for i in range(self.id_space())],
+            "trained_on": self.trained_on,
+        }
+        return json.dumps(meta).encode()
+
+    @classmethod
+    def _restore(
+        cls,
+        meta: bytes,
+        index: faiss.Index,
+        bm25: bytes,
+        exact: Optional[np.ndarray],
+        embeddings,
+    ) -> "HybridIndex":
+        """Rebuild an index from its JSON metadata and binary parts."""
+        payload = json.loads(meta)
+        child_docs = [Document(**doc) for doc in payload["child_docs"]]
+        vectorstore = FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=InMemoryDocstore({doc.id: doc for doc in child_docs}),
+            index_to_docstore_id={
+                position: doc_id
+                for position, doc_id in enumerate(payload["index_to_docstore_id"])
+                if doc_id is not None
+            },
+        )
+        return cls(
+            parents=[
+                ParentDocument(doc["page_content"], doc["metadata"])
+                for doc in payload["parents"]
+            ],
+            child_docs=child_docs,
+            vocabulary=FuzzyIndex(payload["vocabulary"]),
+            bm25=BM25Index.from_bytes(bm25),
+            vectorstore=vectorstore,
+            exact=exact,
+            trained_on=payload["trained_on"],
+        )
+
+    def to_bytes(self) -> bytes:
+        """Serialize the index into a single .npz payload.
+        Nothing in it is pickled, so loading never runs stored code.
+        """
+        arrays = {
+            "meta": np.frombuffer(self._meta(), dtype=np.uint8),
+            "faiss": faiss.serialize_index(self.vectorstore.index),
+            "bm25": np.frombuffer(self.bm25.to_bytes(), dtype=np.uint8),
+        }
+        if self.exact is not None:
+            arrays["exact"] = self.exact
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    def save(self, directory: Path) -> int:
+        """Write the index as files for memory-mapped reopening.
+        Vectors go to a raw FAISS file and exact vectors to a .npy file,
+        with BM25 and the JSON metadata beside them.
+        Returns the number of bytes written.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(self.vectorstore.index, str(directory / "vectors.faiss"))
+        if self.exact is not None:
+            np.save(directory / "exact.npy", self.exact)
+        (directory / "bm25.npz").write_bytes(self.bm25.to_bytes())
+        (directory / "meta.json").write_bytes(self._meta())
+        return sum(path.stat().st_size for path in directory.iterdir())
+
+    @classmethod
+    def open(cls, directory: Path, embeddings, mmap: bool = True) -> "HybridIndex":
+        """Reopen an index written by save.
+        With mmap the vectors stay on disk and are paged in on demand; such
+        an index is read-only, so open with mmap=False before upserting.
+        """
+        flags = faiss.IO_FLAG_MMAP_IFC if mmap else 0
+        index = faiss.read_index(str(directory / "vectors.faiss"), flags)
+        exact = None
+        if (directory / "exact.npy").exists():
+            # Re-ranking reads a few rows per query, so only those are paged in
+            exact = np.load(directory / "exact.npy", mmap_mode="r" if mmap else None)
+        return cls._restore(
+            (directory / "meta.json").read_bytes(),
+            index,
+            (directory / "bm25.npz").read_bytes(),
+            exact,
+            embeddings,
+        )
+
+    @classmethod
+    def from_bytes(cls, raw: bytes, embeddings) -> "HybridIndex":
+        """Restore an index produced by to_bytes.
+        Embeddings are re-attached for query-time vectorization only.
+        """
+        with np.load(io.BytesIO(raw), allow_pickle=False) as data:
+            return cls._restore(
+                data["meta"].tobytes(),
+                faiss.deserialize_index(data["faiss"]),
+                data["bm25"].tobytes(),
+                data["exact"] if "exact" in data else None,
+                embeddings,
+            )
+
 
 class HybridRAGService:
     """Hybrid retrieval using BM25 and FAISS for parent selection.
@@ -39,28 +254,89 @@ class HybridRAGService:
         self,
         chunk_size: int = 300,
         chunk_overlap: int = 50,
-        bm25_k: int = 3,
-        faiss_k: int = 3,
+        bm25_k: Optional[int] = None,
+        faiss_k: Optional[int] = None,
+        parent_k: Optional[int] = None,
+        ann_min_chunks: Optional[int] = None,
+        ivf_nlist: Optional[int] = None,
+        ivf_nprobe: int = 32,
+        embedding_provider: Optional[EmbeddingProvider] = None,
+        quantization: Optional[VectorQuantization] = None,
+        rerank_factor: Optional[int] = None,
+        fusion: Optional[RankFusion] = None,
     ):
         """Initialize chunking, retriever settings, and embeddings.
-        Prefers Gemini embeddings with an OpenAI fallback.
+        bm25_k and faiss_k chunk hits (or RETRIEVAL_CANDIDATES each) are
+        pulled from the prebuilt indexes and aggregated into at most
+        parent_k (or RETRIEVAL_PARENTS) distinct parents.
+        Uses embedding_provider (or EMBEDDING_PROVIDER) when set, otherwise
+        prefers Gemini embeddings with an OpenAI fallback.
+        Corpora of at least ann_min_chunks (or ANN_MIN_CHUNKS, 0 disables)
+        chunks get an IVF index with ivf_nlist lists, ivf_nprobe of which
+        are scanned per query; smaller corpora keep the exact flat scan.
+        quantization (or VECTOR_QUANTIZATION) compresses stored vectors to
+        int8 ("sq8") or product codes ("pq"); with rerank_factor > 0 the top
+        faiss_k * rerank_factor candidates are re-scored with float16 copies
+        of the vectors kept beside the codes. Those copies take half the
+        space of a flat index, so re-ranking trades most of the savings of
+        quantization for recall.
+        BM25 and FAISS hits are merged by fusion (RankFusion by default).
         """
-        self.llm_provider = LLMProvider()
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.bm25_k = bm25_k
-        self.faiss_k = faiss_k
-        try:
-            self.embeddings = ef.get_embeddings("gemini")
-        except Exception:
-            logger.warning("Gemini embeddings unavailable, falling back to OpenAI")
-            self.embeddings = ef.get_embeddings("openai")
+        candidates = int(os.getenv("RETRIEVAL_CANDIDATES") or 30)
+        self.bm25_k = bm25_k or candidates
+        self.faiss_k = faiss_k or candidates
+        self.parent_k = parent_k or int(os.getenv("RETRIEVAL_PARENTS") or 5)
+        self.faiss_score_threshold = 0.5
+        if ann_min_chunks is None:
+            ann_min_chunks = int(os.getenv("ANN_MIN_CHUNKS") or 20000)
+        self.ann_min_chunks = ann_min_chunks
+        self.ivf_nlist = ivf_nlist
+        self.ivf_nprobe = ivf_nprobe
+        self.quantization = quantization or os.getenv("VECTOR_QUANTIZATION") or "none"
+        if self.quantization not in ("none", "sq8", "pq"):
+            raise ValueError(f"Unknown vector quantization: {self.quantization}")
+        if rerank_factor is None:
+            rerank_factor = int(os.getenv("VECTOR_RERANK_FACTOR") or 0)
+        self.rerank_factor = rerank_factor
+        self.fusion = fusion or RankFusion()
+        provider = embedding_provider or os.getenv("EMBEDDING_PROVIDER")
+        if provider:
+            self.embeddings = ef.get_embeddings(provider)
+        else:
+            try:
+                self.embeddings = ef.get_embeddings("gemini")
+                provider = "gemini"
+            except Exception:
+                logger.warning("Gemini embeddings unavailable, falling back to OpenAI")
+                self.embeddings = ef.get_embeddings("openai")
+                provider = "openai"
+        # Relevance thresholds are calibrated per provider
+        self.embedding_provider: EmbeddingProvider = provider
 
         self.splitter = RecursiveCharacterTextSplitter(
             chunk_size=self.chunk_size,
             chunk_overlap=self.chunk_overlap,
         )
 
+    def _split_parent(self, parent_id: int, doc: Document) -> List[Document]:
+        """Split one parent into child chunks with stable ids.
+        Ids are derived from parent_id so a parent's chunks can be replaced.
+        """
+        chunks = self.splitter.split_text(doc.page_content)
+        return [
+            Document(
+                id=f"{parent_id}:{n}",
+                page_content=chunk,
+                metadata={
+                    **doc.metadata,
+                    "parent_id": parent_id,
+                },
+            )
+            for n, chunk in enumerate(chunks)
+        ]
+
     def _build_child_documents(
         self, parent_docs: List[Document]
     ) -> Tuple[List[Document], List[Document]]:
@@ -70,18 +346,7 @@ class HybridRAGService:
         """
         child_docs: List[Document] = []
         for parent_id, doc in enumerate(parent_docs):
-            chunks = self.splitter.split_text(doc.page_content)
-
-            for chunk in chunks:
-                child_docs.append(
-                    Document(
-                        page_content=chunk,
-                        metadata={
-                            **doc.metadata,
-                            "parent_id": parent_id,
-                        },
-                    )
-                )
+            child_docs.extend(self._split_parent(parent_id, doc))
 
         if not child_docs:
             logger.error("No child documents created")
@@ -99,7 +364,8 @@ class HybridRAGService:
             vocab.update(tokens)
         return vocab
 
-    def simple_tokenizer(self, text: str) -> List[str]:
+    @staticmethod
+    def simple_tokenizer(text: str) -> List[str]:
         """
         Lightweight tokenizer for BM25.
         - lowercase
@@ -113,11 +379,13 @@ class HybridRAGService:
     def expand_query_typo_tolerant(
         self,
         query: str,
-        vocabulary: set[str],
+        vocabulary: set[str] | FuzzyIndex,
         cutoff: float = 0.8,
     ) -> str:
         """
         Expands query with closest vocabulary matches.
+        Uses the prebuilt FuzzyIndex when available and falls back to a
+        full difflib scan for plain vocabulary sets.
         """
         expanded_terms = []
         tokens = query.lower().split()
@@ -125,12 +393,16 @@ class HybridRAGService:
         for token in tokens:
             expanded_terms.append(token)
 
-            matches = difflib.get_close_matches(
-                token,
-                vocabulary,
-                n=1,
-                cutoff=cutoff,
-            )
+            if isinstance(vocabulary, FuzzyIndex):
+                match = vocabulary.closest(token, cutoff=cutoff)
+                matches = [match] if match else []
+            else:
+                matches = difflib.get_close_matches(
+                    token,
+                    vocabulary,
+                    n=1,
+                    cutoff=cutoff,
+                )
             if matches and matches[0] != token:
                 expanded_terms.append(matches[0])
 
@@ -148,97 +420,570 @@ class HybridRAGService:
                 return False
         return True
 
-    def _build_bm25_retriever(self, child_docs: List[Document]) -> BM25Retriever:
-        """Create a BM25 retriever with a custom tokenizer.
-        Applies the configured k to control result count.
+    def _build_bm25_index(self, child_docs: List[Document]) -> BM25Index:
+        """Build the BM25 inverted index over child chunks.
+        Tokens come from simple_tokenizer, in child_docs order.
+        """
+        return BM25Index.build(
+            [self.simple_tokenizer(doc.page_content) for doc in child_docs]
+        )
+
+    def _bm25_search(
+        self, index: HybridIndex, query: str
+    ) -> List[Tuple[Document, float]]:
+        """Return the top bm25_k child chunks for a query with their scores.
+        Chunks that share no term with the query are never returned.
+        """
+        doc_ids, scores = index.bm25.search(self.simple_tokenizer(query), k=self.bm25_k)
+        return [
+            (index.child_docs[i], score)
+            for i, score in zip(doc_ids.tolist(), scores.tolist())
+        ]
+
+    @staticmethod
+    def _pq_subquantizers(dim: int) -> int:
+        """Pick the PQ sub-quantizer count, about one per 8 dimensions.
+        FAISS needs it to divide the dimension evenly.
+        """
+        m = max(1, dim // 8)
+        while dim % m:
+            m -= 1
+        return m
+
+    def _uses_ann(self, count: int) -> bool:
+        """Whether a corpus of count chunks gets an approximate index."""
+        return self.ann_min_chunks > 0 and count >= self.ann_min_chunks
+
+    def _ivf_lists(self, count: int) -> int:
+        """Pick the IVF list count, about 2 * sqrt(count) by default.
+        Capped so every centroid has enough training points.
+        """
+        nlist = self.ivf_nlist or int(2 * np.sqrt(count))
+        return max(1, min(nlist, count // 39))
+
+    def _new_faiss_index(self, vectors: np.ndarray) -> faiss.Index:
+        """Create an empty FAISS index for the corpus size and quantization.
+        Large corpora get an IVF index over the same codes. Trained indexes
+        learn from the vectors they will hold; PQ needs a few hundred
+        training points, so small corpora use SQ8 instead.
+        """
+        count, dim = vectors.shape
+        ann = self._uses_ann(count)
+        if self.quantization == "none" and not ann:
+            return faiss.IndexFlatL2(dim)
+
+        # 39 points per centroid is the FAISS training minimum without warnings
+        nbits = min(8, int(np.log2(max(count, 1) / 39)))
+        if self.quantization == "pq" and nbits >= 4:
+            codec = f"PQ{self._pq_subquantizers(dim)}x{nbits}"
+        elif self.quantization == "none":
+            codec = "Flat"
+        else:
+            if self.quantization == "pq":
+                logger.info(f"Only {count} vectors, using SQ8 instead of PQ")
+            codec = "SQ8"
+        if ann:
+            codec = f"IVF{self._ivf_lists(count)},{codec}"
+        index = faiss.index_factory(dim, codec)
+        if ann:
+            ivf = faiss.extract_index_ivf(index)
+            # Ten k-means rounds match the default 25 on recall at 40% the cost
+            ivf.cp.niter = 10
+            # Lets chunk vectors be reconstructed for relevance scoring
+            ivf.set_direct_map_type(faiss.DirectMap.Array)
+        index.train(vectors)
+        return index
+
+    @staticmethod
+    def _is_ivf(vectorstore: FAISS) -> bool:
+        """Whether the store holds an IVF index."""
+        return faiss.try_extract_index_ivf(vectorstore.index) is not None
+
+    def _tune_search(self, vectorstore: FAISS) -> None:
+        """Apply the configured nprobe to IVF indexes before searching.
+        Persisted indexes pick up the current setting, not the saved one.
+        """
+        ivf = faiss.try_extract_index_ivf(vectorstore.index)
+        if ivf is not None:
+            ivf.nprobe = self.ivf_nprobe
+
+    def _vectorstore_from_vectors(
+        self,
+        child_docs: List[Document],
+        vectors: List[List[float]],
+    ) -> FAISS:
+        """Wrap precomputed chunk vectors in a FAISS vector store.
+        Chunk ids are kept as docstore ids so upserts can delete them.
         """
-        bm25 = BM25Retriever.from_documents(
-            child_docs, preprocess_func=self.simple_tokenizer
+        index = self._new_faiss_index(np.asarray(vectors, dtype=np.float32))
+        vectorstore = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
         )
-        bm25.k = self.bm25_k
-        return bm25
+        vectorstore.add_embeddings(
+            zip([doc.page_content for doc in child_docs], vectors),
+            metadatas=[doc.metadata for doc in child_docs],
+            ids=[doc.id for doc in child_docs],
+        )
+        return vectorstore
 
-    def _build_faiss_retriever(self, child_docs: List[Document]):
-        """Create a FAISS retriever for semantic similarity search.
-        Applies a score threshold and configured k value.
+    def _embed_children(self, child_docs: List[Document]) -> List[List[float]]:
+        """Embed child chunks for a FAISS store.
+        This is the only step of index building that calls the network.
         """
-        vectorstore = FAISS.from_documents(child_docs, self.embeddings)
-        return vectorstore.as_retriever(
-            search_type="similarity_score_threshold",
-            search_kwargs={"score_threshold": 0.5, "k": self.faiss_k},
+        return self.embeddings.embed_documents([doc.page_content for doc in child_docs])
+
+    async def _aembed_children(self, child_docs: List[Document]) -> List[List[float]]:
+        """Async variant of _embed_children using aembed_documents."""
+        return await self.embeddings.aembed_documents(
+            [doc.page_content for doc in child_docs]
         )
 
+    def warm_embeddings(self, parent_docs: List[Document]) -> int:
+        """Embed the chunks of parent_docs ahead of an index build.
+        Vectors land in the embedding cache, so a later build over the same
+        pages re-embeds nothing. Returns the number of chunks embedded.
+        """
+        texts = [
+            child.page_content
+            for parent_id, doc in enumerate(parent_docs)
+            for child in self._split_parent(parent_id, doc)
+        ]
+        if texts:
+            self.embeddings.embed_documents(texts)
+        return len(texts)
+
+    def _reranks(self) -> bool:
+        """Whether quantized hits are re-scored with exact vectors."""
+        return self.quantization != "none" and self.rerank_factor > 0
+
+    def _exact_vectors(self, vectors: List[List[float]]) -> Optional[np.ndarray]:
+        """Keep float16 vectors beside a quantized store for re-ranking.
+        They cost half a flat index, so re-ranking gives back most of what
+        quantization saves; float32 would cost more than the flat index.
+        """
+        if not self._reranks():
+            return None
+        return np.asarray(vectors, dtype=np.float16)
+
+    def _rerank_candidates(
+        self, vectorstore: FAISS, query_vector: List[float]
+    ) -> Tuple[List[Document], List[int]]:
+        """Return the top faiss_k * rerank_factor quantized hits.
+        Their FAISS positions come along to look up the exact vectors.
+        """
+        query = np.asarray([query_vector], dtype=np.float32)
+        _, ids = vectorstore.index.search(query, self.faiss_k * self.rerank_factor)
+        positions = [int(i) for i in ids[0] if i >= 0]
+        candidates = [
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[i])
+            for i in positions
+        ]
+        return candidates, positions
+
+    def _rerank(
+        self,
+        vectorstore: FAISS,
+        query_vector: List[float],
+        candidates: List[Document],
+        exact_vectors: np.ndarray,
+    ) -> List[Tuple[Document, float]]:
+        """Re-score candidates by exact L2 distance and keep the top faiss_k.
+        Uses the store's relevance function so the score threshold still
+        means the same thing as for flat indexes.
+        """
+        if not candidates:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        distances = ((np.asarray(exact_vectors, dtype=np.float32) - query) ** 2).sum(1)
+        relevance = vectorstore._select_relevance_score_fn()
+        order = np.argsort(distances, kind="stable")[: self.faiss_k]
+        scored = [(candidates[i], relevance(float(distances[i]))) for i in order]
+        return [hit for hit in scored if hit[1] >= self.faiss_score_threshold]
+
+    def _semantic_search(
+        self,
+        vectorstore: FAISS,
+        query_vector: List[float],
+        exact: Optional[np.ndarray] = None,
+    ) -> List[Tuple[Document, float]]:
+        """Return the semantic hits for a query vector with relevance scores.
+        Re-ranking reads the exact vectors stored with the index; indexes
+        saved without them are searched on their quantized codes alone.
+        """
+        self._tune_search(vectorstore)
+        if not self._reranks() or exact is None:
+            relevance = vectorstore._select_relevance_score_fn()
+            hits = [
+                (doc, relevance(distance))
+                for doc, distance in vectorstore.similarity_search_with_score_by_vector(
+                    query_vector, k=self.faiss_k
+                )
+            ]
+            return [hit for hit in hits if hit[1] >= self.faiss_score_threshold]
+
+        candidates, positions = self._rerank_candidates(vectorstore, query_vector)
+        return self._rerank(vectorstore, query_vector, candidates, exact[positions])
+
+    def _assemble_index(
+        self,
+        parents: List[Document],
+        child_docs: List[Document],
+        vectors: List[List[float]],
+    ) -> HybridIndex:
+        """Combine the embedded store with the locally built lexical parts."""
+        return HybridIndex(
+            parents=parents,
+            child_docs=child_docs,
+            vocabulary=FuzzyIndex(self._build_vocabulary(child_docs)),
+            bm25=self._build_bm25_index(child_docs),
+            vectorstore=self._vectorstore_from_vectors(child_docs, vectors),
+            exact=self._exact_vectors(vectors),
+        )
+
+    def build_index(self, parent_docs: List[Document]) -> HybridIndex:
+        """Build every retrieval artifact for a corpus in one pass.
+        Meant to run at ingestion time so searches can reuse the result.
+        """
+        child_docs, parents = self._build_child_documents(parent_docs)
+        vectors = self._embed_children(child_docs)
+        return self._assemble_index(parents, child_docs, vectors)
+
+    async def abuild_index(self, parent_docs: List[Document]) -> HybridIndex:
+        """Async variant of build_index using aembed_documents.
+        Chunking and the FAISS/BM25 builds run in a worker thread.
+        """
+        child_docs, parents = await asyncio.to_thread(
+            self._build_child_documents, parent_docs
+        )
+        vectors = await self._aembed_children(child_docs)
+        return await asyncio.to_thread(
+            self._assemble_index, parents, child_docs, vectors
+        )
+
+    @staticmethod
+    def _parent_urls(parent: Document) -> List[str]:
+        """Return every URL a parent stands for, its source first."""
+        return [parent.metadata.get("source")] + parent.metadata.get("aliases", [])
+
+    @classmethod
+    def parent_keys(cls, parent: Document) -> Set[str]:
+        """Return the canonical keys of every URL a parent stands for."""
+        keys = {canonicalize_url(url) for url in cls._parent_urls(parent)}
+        keys.discard("")
+        return keys
+
+    def upsert_index(
+        self, index: HybridIndex, parent_docs: List[Document]
+    ) -> HybridIndex:
+        """Apply new or changed parents to an existing index in place.
+        Parents are matched by canonical URL, including the variants merged
+        into them; only their chunks are re-embedded. A parent matching
+        several existing ones replaces the first, and the others are
+        emptied so pages merged by deduplication are indexed once.
+        BM25 and the vocabulary are rebuilt locally from the child set.
+        Stale chunks are removed from the FAISS index and new ones added,
+        keeping its training. Quantized and IVF indexes are retrained once
+        their ids span RETRAIN_GROWTH times their training sample, and a
+        flat index becomes IVF past the ANN threshold; both reuse the
+        stored vectors where the index can give them back.
+        """
+        positions: Dict[str, int] = {}
+        for pid, parent in enumerate(index.parents):
+            for key in self.parent_keys(parent):
+                positions[key] = pid
+        replaced: Set[int] = set()
+        matched: Set[int] = set()
+        new_children: List[Document] = []
+        for doc in parent_docs:
+            pids = sorted(
+                {positions[k] for k in self.parent_keys(doc) if k in positions}
+            )
+            matched.update(pids)
+            # A page split off a merged parent gets a slot of its own
+            pid = next((pid for pid in pids if pid not in replaced), None)
+            if pid is None:
+                pid = len(index.parents)
+                index.parents.append(doc)
+            else:
+                index.parents[pid] = doc
+            replaced.add(pid)
+            new_children.extend(self._split_parent(pid, doc))
+        for pid in matched - replaced:
+            # Merged into another parent; ids stay stable, so leave it empty
+            index.parents[pid] = ParentDocument("", {})
+            replaced.add(pid)
+
+        stale_ids = {
+            child.id
+            for child in index.child_docs
+            if child.metadata.get("parent_id") in replaced
+        }
+        index.child_docs = [
+            child for child in index.child_docs if child.id not in stale_ids
+        ] + new_children
+        vectors = self._embed_children(new_children) if new_children else []
+        if self._is_ivf(index.vectorstore):
+            self._replace_ivf_vectors(index, stale_ids, new_children, vectors)
+        else:
+            self._replace_flat_vectors(index, stale_ids, new_children, vectors)
+        index.refresh()
+
+        outgrown = index.trained_on and index.id_space() > (
+            RETRAIN_GROWTH * index.trained_on
+        )
+        if outgrown or (
+            not self._is_ivf(index.vectorstore)
+            and self._uses_ann(len(index.child_docs))
+        ):
+            # Codes trained on a much smaller corpus lose accuracy as it
+            # grows, and past the ANN threshold an IVF index is trained
+            vectors = self._stored_vectors(index, index.child_docs)
+            index.vectorstore = self._vectorstore_from_vectors(
+                index.child_docs, vectors
+            )
+            index.exact = self._exact_vectors(vectors)
+            index.trained_on = training_size(index.vectorstore.index)
+            index.refresh()
+
+        index.vocabulary = FuzzyIndex(self._build_vocabulary(index.child_docs))
+        index.bm25 = self._build_bm25_index(index.child_docs)
+        return index
+
+    @staticmethod
+    def _replace_flat_vectors(
+        index: HybridIndex,
+        stale_ids: Set[str],
+        new_children: List[Document],
+        vectors: List[List[float]],
+    ) -> None:
+        """Swap chunk vectors in a non-IVF store, which renumbers on delete."""
+        store = index.vectorstore
+        # Exact rows follow FAISS ids, which delete compacts
+        kept = [
+            position
+            for position, doc_id in sorted(store.index_to_docstore_id.items())
+            if doc_id not in stale_ids
+        ]
+        if stale_ids:
+            store.delete(list(stale_ids))
+        if vectors:
+            store.add_embeddings(
+                zip([doc.page_content for doc in new_children], vectors),
+                metadatas=[doc.metadata for doc in new_children],
+                ids=[doc.id for doc in new_children],
+            )
+        if index.exact is not None:
+            added = np.asarray(vectors, dtype=index.exact.dtype).reshape(
+                -1, index.exact.shape[1]
+            )
+            index.exact = np.vstack([np.asarray(index.exact)[kept], added])
+
+    @staticmethod
+    def _replace_ivf_vectors(
+        index: HybridIndex,
+        stale_ids: Set[str],
+        new_children: List[Document],
+        vectors: List[List[float]],
+    ) -> None:
+        """Swap chunk vectors in an IVF store without touching the rest.
+        IVF ids are not renumbered on removal, so new chunks get fresh ids
+        past every id used so far; exact rows of removed ones stay unused
+        until the index is retrained.
+        """
+        store = index.vectorstore
+        ivf = faiss.extract_index_ivf(store.index)
+        if ivf.direct_map.type != faiss.DirectMap.Hashtable:
+            # An array map cannot remove ids; a hashtable is only filled for
+            # vectors added before the switch or with explicit ids
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+        stale = np.asarray(
+            [
+                position
+                for position, doc_id in store.index_to_docstore_id.items()
+                if doc_id in stale_ids
+            ],
+            dtype=np.int64,
+        )
+        if len(stale):
+            # Hashtable maps only accept removals as an IDSelectorArray
+            store.index.remove_ids(
+                faiss.IDSelectorArray(len(stale), faiss.swig_ptr(stale))
+            )
+            store.docstore.delete(
+                [store.index_to_docstore_id.pop(p) for p in stale.tolist()]
+            )
+        if not vectors:
+            return
+
+        start = index.id_space()
+        added = np.asarray(vectors, dtype=np.float32)
+        ids = np.arange(start, start + len(added), dtype=np.int64)
+        store.index.add_with_ids(added, ids)
+        store.docstore.add({doc.id: doc for doc in new_children})
+        store.index_to_docstore_id.update(
+            zip(ids.tolist(), [doc.id for doc in new_children])
+        )
+        if index.exact is not None:
+            index.exact = np.vstack(
+                [np.asarray(index.exact), added.astype(index.exact.dtype)]
+            )
+
+    def _stored_vectors(
+        self, index: HybridIndex, child_docs: List[Document]
+    ) -> np.ndarray:
+        """Return the vectors of indexed chunks for retraining.
+        They are read from the exact rows or an uncompressed FAISS index;
+        only compressed codes without exact rows are embedded again.
+        """
+        positions = {
+            doc_id: position
+            for position, doc_id in index.vectorstore.index_to_docstore_id.items()
+        }
+        ids = np.asarray([positions[doc.id] for doc in child_docs], dtype=np.int64)
+        if index.exact is not None:
+            return np.asarray(index.exact[ids], dtype=np.float32)
+        faiss_index = index.vectorstore.index
+        ivf = faiss.try_extract_index_ivf(faiss_index)
+        if isinstance(faiss_index, faiss.IndexFlat) or isinstance(
+            ivf, faiss.IndexIVFFlat
+        ):
+            return faiss_index.reconstruct_batch(ids)
+        return np.asarray(self._embed_children(child_docs), dtype=np.float32)
+
     def retrieve_parents(
         self,
         query: str,
-        parent_docs: List[Document],
+        parent_docs: Optional[List[Document]] = None,
+        index: Optional[HybridIndex] = None,
     ) -> List[Document]:
         """
         Main hybrid retrieval entrypoint.
+        Uses a prebuilt index when given, otherwise builds one from parent_docs.
         Returns parent-level documents.
         """
-        # Step 1: build child docs
-        child_docs, parents = self._build_child_documents(parent_docs)
+        # Step 1: build the index only when no prebuilt one was supplied
+        if index is None:
+            index = self.build_index(parent_docs or [])
 
-        # Step 1.1: Build vocab once per request and expand query
-        vocabulary = self._build_vocabulary(child_docs)
-        expanded_query = self.expand_query_typo_tolerant(query, vocabulary)
+        # Step 2: semantic hits from the prebuilt vector store
+        query_vector = self.embeddings.embed_query(query)
+        return self._search_index(query, index, query_vector)
 
-        # Step 2: build retrievers
-        bm25 = self._build_bm25_retriever(child_docs)
-        faiss = self._build_faiss_retriever(child_docs)
+    async def aretrieve_parents(
+        self,
+        query: str,
+        parent_docs: Optional[List[Document]] = None,
+        index: Optional[HybridIndex] = None,
+    ) -> List[Document]:
+        """Async variant of retrieve_parents.
+        The query is embedded on the event loop; searching and ranking run
+        in a worker thread so other requests are not stalled.
+        """
+        if index is None:
+            index = await self.abuild_index(parent_docs or [])
+
+        query_vector = await self.embeddings.aembed_query(query)
+        return await asyncio.to_thread(self._search_index, query, index, query_vector)
+
+    def _search_index(
+        self, query: str, index: HybridIndex, query_vector: List[float]
+    ) -> List[Document]:
+        """Search the index for an embedded query and rank its parents."""
+        faiss_hits = self._semantic_search(index.vectorstore, query_vector, index.exact)
+        return self._rank_parents(
+            query=query, index=index, faiss_hits=faiss_hits, query_vector=query_vector
+        )
 
-        # Step 3: retrieve child docs
-        bm25_hits = bm25.invoke(expanded_query)
-        faiss_hits = faiss.invoke(query)
+    def _rank_parents(
+        self,
+        query: str,
+        index: HybridIndex,
+        faiss_hits: List[Tuple[Document, float]],
+        query_vector: List[float],
+    ) -> List[Document]:
+        """Run the lexical side of retrieval and fuse it with FAISS hits.
+        Returns parent-level documents ranked by the merged signals, each
+        with its best chunk similarity to the query for relevance checks.
+        """
+        # Step 3: expand query against the indexed vocabulary for BM25
+        expanded_query = self.expand_query_typo_tolerant(query, index.vocabulary)
+        bm25_hits = self._bm25_search(index, expanded_query)
 
         # Step 4: merge + map back to parents
+        vector = np.asarray(query_vector, dtype=np.float32)
         return self._map_to_parents(
             query=query,
             bm25_hits=bm25_hits,
             faiss_hits=faiss_hits,
-            parents=parents,
+            parents=index.parents,
+            similarity=lambda pid: self._similarity(index.chunk_vectors(pid), vector),
         )
 
+    @staticmethod
+    def _similarity(
+        vectors: Optional[np.ndarray], query: np.ndarray
+    ) -> Optional[float]:
+        """Best cosine similarity between the query and a parent's chunks."""
+        if vectors is None:
+            return None
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+        return float((vectors @ query / np.maximum(norms, 1e-12)).max())
+
     def _map_to_parents(
         self,
         query: str,
-        bm25_hits: List[Document],
-        faiss_hits: List[Document],
+        bm25_hits: List[Tuple[Document, float]],
+        faiss_hits: List[Tuple[Document, float]],
         parents: List[Document],
+        similarity: Optional[Callable[[int], Optional[float]]] = None,
     ) -> List[Document]:
         """
         Map retrieved child docs back to parents with proper ranking.
-        Only parents that appear in bm25_hits or faiss_hits are returned.
+        Only the best parent_k parents that appear in bm25_hits or faiss_hits
+        are returned, as copies carrying the fused retrieval_score, per-signal scores and
+        ranks, and a dominant flag on a top parent that clearly wins.
+        similarity, when given, maps a parent id to its query similarity.
         """
+        signals = {
+            "faiss": [
+                (doc.metadata["parent_id"], float(score))
+                for doc, score in faiss_hits
+                if doc.metadata.get("parent_id") is not None
+            ],
+            "bm25": [
+                (doc.metadata["parent_id"], float(score))
+                for doc, score in bm25_hits
+                if doc.metadata.get("parent_id") is not None
+            ],
+        }
+        # Semantic signal counts more when BM25 matched no query token
+        bm25_weak = self._bm25_is_weak([doc for doc, _ in bm25_hits], query)
+        weights = {"faiss": 3.0, "bm25": 1.0 if bm25_weak else 2.5}
 
-        scores: Dict[int, float] = defaultdict(float)
-
-        bm25_weak = self._bm25_is_weak(bm25_hits, query)
-
-        # FAISS hits (semantic signal – stronger when BM25 is weak)
-        for rank, doc in enumerate(faiss_hits):
-            pid = doc.metadata.get("parent_id")
-            if pid is not None:
-                scores[pid] += 3.0 / (rank + 1)
-
-        # BM25 hits (keyword signal)
-        for rank, doc in enumerate(bm25_hits):
-            pid = doc.metadata.get("parent_id")
-            if pid is not None:
-                scores[pid] += (1.0 if bm25_weak else 2.5) / (rank + 1)
-
-        if not scores:
-            return []
-
-        # Sort parents by score DESC
-        ranked_parent_ids = sorted(
-            scores.keys(),
-            key=lambda pid: scores[pid],
-            reverse=True,
-        )
+        fused = self.fusion.fuse(signals, weights)[: self.parent_k]
+        similarities = [
+            similarity(result.parent_id) if similarity else None for result in fused
+        ]
+        dominant = self.fusion.dominates(fused, similarities)
 
-        return [parents[pid] for pid in ranked_parent_ids]
+        ranked: List[Document] = []
+        for position, result in enumerate(fused):
+            # Indexes are shared between requests, so never mutate a parent
+            parent = copy.copy(parents[result.parent_id])
+            parent.metadata = {
+                **parent.metadata,
+                "retrieval_score": result.score,
+                "signal_scores": result.signal_scores,
+                "signal_ranks": result.signal_ranks,
+                "similarity": similarities[position],
+                "fusion": self.fusion.method,
+                "dominant": dominant and position == 0,
+            }
+            ranked.append(parent)
+        return ranked
 
 
 class LLMRag:
@@ -246,21 +991,25 @@ class LLMRag:
     Handles history and bookmark response variants.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        llm_provider: Optional[LLMProvider] = None,
+        prompts: Optional[Prompts] = None,
+        summary_cache: Optional[SummaryCache] = None,
+    ):
         """Initialize prompts, providers, and the base LLM.
-        Keeps shared dependencies ready for chained calls.
+        Shared instances can be injected so clients are built once.
+        Summaries and parses are reused through summary_cache.
         """
-        self.rag = HybridRAGService()
-        self.prompts = Prompts()
-        self.llm_provider = LLMProvider()
+        self.prompts = prompts or Prompts()
+        self.llm_provider = llm_provider or LLMProvider()
         self.base_llm = self.llm_provider.get("gemini")
+        self.summary_cache = summary_cache or SummaryCache()
 
     def _llm_response(self, llm, flag: str = "history") -> Runnable:
         """Build the response chain for the specified flag.
         Returns a runnable that produces plain text output.
         """
-        prompt_history = self.prompts.history_prompt()
-        prompt_bookmark = self.prompts.bookmark_prompt()
         if flag == "history":
             chain = (
                 {
@@ -268,14 +1017,14 @@ class LLMRag:
                     "url": RunnablePassthrough(),
                     "date": RunnablePassthrough(),
                 }
-                | prompt_history
+                | self.prompts.history_prompt()
                 | llm
                 | StrOutputParser()
             )
         elif flag == "bookmark":
             chain = (
                 {"context": RunnablePassthrough(), "url": RunnablePassthrough()}
-                | prompt_bookmark
+                | self.prompts.bookmark_prompt()
                 | llm
                 | StrOutputParser()
             )
@@ -302,22 +1051,121 @@ class LLMRag:
         pchain = promptParser | model_with_retry | parser
         return pchain
 
+    def parse_response(
+        self,
+        content: str,
+        flag: str = "history",
+        url: Optional[str] = None,
+        date: Optional[str] = None,
+    ) -> dict:
+        """Run the structured parse of a summary, reusing cached parses.
+        url and date of the summarized page fill the result directly; the
+        LLM parser only runs when they and the summary text do not validate.
+        """
+        parsed = extract_structure(content, flag, url=url, date=date)
+        if parsed is not None:
+            return parsed
+        logger.info("Metadata extraction failed, using the LLM parser")
+        parsed = self.summary_cache.get_structure(content, flag)
+        if parsed is None:
+            parsed = self.structure(flag=flag).invoke({"content": content})
+            self.summary_cache.set_structure(content, flag, parsed)
+        return parsed
+
+    async def aparse_response(
+        self,
+        content: str,
+        flag: str = "history",
+        url: Optional[str] = None,
+        date: Optional[str] = None,
+    ) -> dict:
+        """Async variant of parse_response."""
+        parsed = extract_structure(content, flag, url=url, date=date)
+        if parsed is not None:
+            return parsed
+        logger.info("Metadata extraction failed, using the LLM parser")
+        parsed = await self.summary_cache.aget_structure(content, flag)
+        if parsed is None:
+            parsed = await self.structure(flag=flag).ainvoke({"content": content})
+            await self.summary_cache.aset_structure(content, flag, parsed)
+        return parsed
+
+    def _chain_inputs(
+        self, context: str, date: Optional[str], url: str, flag: str
+    ) -> Dict[str, Any]:
+        """Build the response chain input mapping.
+        Includes date for history and omits it for bookmarks.
+        """
+        if flag == "history":
+            return {"context": context, "date": date, "url": url}
+        return {"context": context, "url": url}
+
     def _invoke_chain(
         self, context: str, date: Optional[str], url: str, flag: str, chain: Runnable
     ) -> str:
-        """Invoke a chain with the correct input mapping.
-        Includes date for history and omits it for bookmarks.
+        """Invoke a chain with the correct input mapping."""
+        return chain.invoke(self._chain_inputs(context, date, url, flag))
+
+    async def _ainvoke_chain(
+        self, context: str, date: Optional[str], url: str, flag: str, chain: Runnable
+    ) -> str:
+        """Async variant of _invoke_chain."""
+        return await chain.ainvoke(self._chain_inputs(context, date, url, flag))
+
+    def _stream_chain(
+        self,
+        llm,
+        context: str,
+        date: Optional[str],
+        url: str,
+        flag: str,
+        on_token: Callable[[str], None],
+    ) -> str:
+        """Stream the response chain, passing each text chunk to on_token.
+        Returns the full text once the model finishes.
         """
-        if flag == "history":
-            return chain.invoke({"context": context, "date": date, "url": url})
-        return chain.invoke({"context": context, "url": url})
+        chain = self._llm_response(llm=llm, flag=flag)
+        parts: List[str] = []
+        for chunk in chain.stream(self._chain_inputs(context, date, url, flag)):
+            parts.append(chunk)
+            on_token(chunk)
+        return "".join(parts)
+
+    async def _astream_chain(
+        self,
+        llm,
+        context: str,
+        date: Optional[str],
+        url: str,
+        flag: str,
+        on_token: Callable[[str], None],
+    ) -> str:
+        """Async variant of _stream_chain."""
+        chain = self._llm_response(llm=llm, flag=flag)
+        parts: List[str] = []
+        async for chunk in chain.astream(self._chain_inputs(context, date, url, flag)):
+            parts.append(chunk)
+            on_token(chunk)
+        return "".join(parts)
 
     def safe_invoke_llm_response(
         self, context: str, date: Optional[str], url: str, flag: str = "history"
     ) -> Tuple[Any, str]:
         """Invoke the LLM response chain with fallback.
         Returns the response text and model identifier used.
+        Pages summarized before are served from the summary cache.
         """
+        cached = self.summary_cache.get_summary(context, date, url, flag)
+        if cached is not None:
+            return cached
+        response = self._invoke_llm_response(context, date, url, flag)
+        self.summary_cache.set_summary(context, date, url, flag, response)
+        return response
+
+    def _invoke_llm_response(
+        self, context: str, date: Optional[str], url: str, flag: str
+    ) -> Tuple[Any, str]:
+        """Generate a summary with Gemini, falling back to GPT."""
         try:
             chain = self._llm_response(llm=self.base_llm, flag=flag)
             result = self._invoke_chain(
@@ -336,3 +1184,129 @@ class LLMRag:
             except Exception as e:
                 logger.error("Both LLM failed")
                 raise RuntimeError("All LLM providers failed") from e
+
+    async def asafe_invoke_llm_response(
+        self, context: str, date: Optional[str], url: str, flag: str = "history"
+    ) -> Tuple[Any, str]:
+        """Async variant of safe_invoke_llm_response with the same fallback."""
+        cached = await self.summary_cache.aget_summary(context, date, url, flag)
+        if cached is not None:
+            return cached
+        response = await self._ainvoke_llm_response(context, date, url, flag)
+        await self.summary_cache.aset_summary(context, date, url, flag, response)
+        return response
+
+    async def _ainvoke_llm_response(
+        self, context: str, date: Optional[str], url: str, flag: str
+    ) -> Tuple[Any, str]:
+        """Async variant of _invoke_llm_response."""
+        try:
+            chain = self._llm_response(llm=self.base_llm, flag=flag)
+            result = await self._ainvoke_chain(
+                context=context, date=date, url=url, flag=flag, chain=chain
+            )
+            return result, "gemini"
+        except Exception as exc:
+            logger.warning("Primary LLM failed, falling back to GPT: %s", exc)
+            try:
+                llm_gpt = self.llm_provider.get(name="gpt")
+                chain = self._llm_response(llm=llm_gpt, flag=flag)
+                result = await self._ainvoke_chain(
+                    context=context, date=date, url=url, flag=flag, chain=chain
+                )
+                return result, "gpt"
+            except Exception as e:
+                logger.error("Both LLM failed")
+                raise RuntimeError("All LLM providers failed") from e
+
+    def stream_llm_response(
+        self,
+        context: str,
+        date: Optional[str],
+        url: str,
+        flag: str = "history",
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[Any, str]:
+        """Streaming variant of safe_invoke_llm_response.
+        Text chunks go to on_token as they are generated; a cached summary
+        arrives as a single chunk. GPT is only tried when Gemini fails
+        before emitting anything, so clients never see a mixed answer.
+        """
+        on_token = on_token or (lambda text: None)
+        cached = self.summary_cache.get_summary(context, date, url, flag)
+        if cached is not None:
+            on_token(cached[0])
+            return cached
+
+        emitted = False
+
+        def forward(text: str) -> None:
+            nonlocal emitted
+            emitted = True
+            on_token(text)
+
+        try:
+            result = self._stream_chain(
+                self.base_llm, context, date, url, flag, on_token=forward
+            )
+            response = (result, "gemini")
+        except Exception as exc:
+            if emitted:
+                raise
+            logger.warning("Primary LLM failed, falling back to GPT: %s", exc)
+            try:
+                llm_gpt = self.llm_provider.get(name="gpt")
+                result = self._stream_chain(
+                    llm_gpt, context, date, url, flag, on_token=forward
+                )
+                response = (result, "gpt")
+            except Exception as e:
+                logger.error("Both LLM failed")
+                raise RuntimeError("All LLM providers failed") from e
+
+        self.summary_cache.set_summary(context, date, url, flag, response)
+        return response
+
+    async def astream_llm_response(
+        self,
+        context: str,
+        date: Optional[str],
+        url: str,
+        flag: str = "history",
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[Any, str]:
+        """Async variant of stream_llm_response with the same fallback."""
+        on_token = on_token or (lambda text: None)
+        cached = await self.summary_cache.aget_summary(context, date, url, flag)
+        if cached is not None:
+            on_token(cached[0])
+            return cached
+
+        emitted = False
+
+        def forward(text: str) -> None:
+            nonlocal emitted
+            emitted = True
+            on_token(text)
+
+        try:
+            result = await self._astream_chain(
+                self.base_llm, context, date, url, flag, on_token=forward
+            )
+            response = (result, "gemini")
+        except Exception as exc:
+            if emitted:
+                raise
+            logger.warning("Primary LLM failed, falling back to GPT: %s", exc)
+            try:
+                llm_gpt = self.llm_provider.get(name="gpt")
+                result = await self._astream_chain(
+                    llm_gpt, context, date, url, flag, on_token=forward
+                )
+                response = (result, "gpt")
+            except Exception as e:
+                logger.error("Both LLM failed")
+                raise RuntimeError("All LLM providers failed") from e
+
+        await self.summary_cache.aset_summary(context, date, url, flag, response)
+        return response
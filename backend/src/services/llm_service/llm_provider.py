@@ -13,6 +13,11 @@ from src.utility.logger import AppLogger
 
 logger = AppLogger.get_logger(__name__)
 
+# One limiter for the whole process so every client shares the same budget
+rate_limiter = InMemoryRateLimiter(
+    requests_per_second=1, check_every_n_seconds=0.1, max_bucket_size=5
+)
+
 
 class LLMProvider:
     """
@@ -23,9 +28,6 @@ class LLMProvider:
         """Initialize and register supported LLM clients.
         Configures rate limiting and API keys for each provider.
         """
-        rate_limiter = InMemoryRateLimiter(
-            requests_per_second=1, check_every_n_seconds=0.1, max_bucket_size=5
-        )
         self._models: Dict[str, BaseChatModel] = {
             "gpt": ChatOpenAI(
                 model="gpt-4.1-nano",
@@ -2,6 +2,8 @@
 Generates chat prompts and parser prompts for the LLM pipeline.
 """
 
+import threading
+from typing import Any, Dict
 from langchain_core.prompts import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
@@ -10,51 +12,93 @@ from langchain_core.prompts import (
 from src.utility.utils import Utility
 
 
+class PromptRegistry:
+    """Compile every configured prompt template once and share it.
+    Recompiles only when the prompts file is reloaded after an edit.
+    """
+
+    def __init__(self):
+        """Start with an empty registry; templates compile on first use."""
+        self.utility = Utility()
+        self._lock = threading.Lock()
+        self._source: Any = None
+        self._templates: Dict[str, Any] = {}
+
+    def _chat_prompt(self, prompts: dict, flag: str) -> ChatPromptTemplate:
+        """Build the system + user chat prompt for a flag."""
+        template_S = prompts["prompt"][flag]["system"]
+        system_message_prompt = SystemMessagePromptTemplate.from_template(template_S)
+
+        template = prompts["prompt"][flag]["user"]
+        return ChatPromptTemplate.from_messages([system_message_prompt, template])
+
+    def _compile(self, prompts: dict) -> Dict[str, Any]:
+        """Compile all templates from the parsed prompts file."""
+        return {
+            "history": self._chat_prompt(prompts, "history"),
+            "bookmark": self._chat_prompt(prompts, "bookmark"),
+            "relevance": PromptTemplate(
+                input_variables=["query", "content_blocks"],
+                template=prompts["prompt"]["relevance"],
+            ),
+        }
+
+    def get(self, name: str):
+        """Return a compiled template by name.
+        The prompts loader is mtime-aware, so an edited file is picked up
+        on the next call without a restart.
+        """
+        prompts = self.utility.load_prompts()
+        if prompts is not self._source:
+            with self._lock:
+                if prompts is not self._source:
+                    self._templates = self._compile(prompts)
+                    self._source = prompts
+        return self._templates[name]
+
+
+registry = PromptRegistry()
+
+
 class Prompts:
     """Build prompt templates for response generation and parsing.
-    Loads configured templates and assembles chat prompts.
+    Serves precompiled templates from the shared PromptRegistry.
     """
 
     def __init__(self):
         """Initialize prompt helper with shared utilities.
-        Uses the Utility loader for configuration access.
+        Uses the process-wide registry for compiled templates.
         """
-        self.utility = Utility()
+        self.registry = registry
+        self._parser_prompts: Dict[str, PromptTemplate] = {}
 
     def history_prompt(
         self,
     ):
-        """Build the history response prompt template.
+        """Return the history response prompt template.
         Returns a chat prompt ready for invocation.
         """
-        prompts = self.utility.load_prompts()
-        template_S = prompts["prompt"]["history"]["system"]
-        system_message_prompt = SystemMessagePromptTemplate.from_template(template_S)
-
-        template = prompts["prompt"]["history"]["user"]
-        prompt = ChatPromptTemplate.from_messages([system_message_prompt, template])
-
-        return prompt
+        return self.registry.get("history")
 
     def bookmark_prompt(
         self,
     ):
-        """Build the bookmark response prompt template.
+        """Return the bookmark response prompt template.
         Returns a chat prompt ready for invocation.
         """
-        prompts = self.utility.load_prompts()
-        template_S = prompts["prompt"]["bookmark"]["system"]
-        system_message_prompt = SystemMessagePromptTemplate.from_template(template_S)
-
-        template = prompts["prompt"]["bookmark"]["user"]
-        prompt = ChatPromptTemplate.from_messages([system_message_prompt, template])
+        return self.registry.get("bookmark")
 
-        return prompt
+    def relevance_prompt(self) -> PromptTemplate:
+        """Return the relevance judge prompt template."""
+        return self.registry.get("relevance")
 
     def parser_prompt(self, parser, flag):
         """Create a parser prompt for structured output extraction.
         Returns a PromptTemplate configured with format instructions.
+        Format instructions are fixed per flag, so prompts are reused.
         """
+        if flag in self._parser_prompts:
+            return self._parser_prompts[flag]
         if flag == "history":
             promptParser = PromptTemplate(
                 template="Extract date and url from the given content.\n{format_instructions}\n{content}\n.",
@@ -71,4 +115,5 @@ class Prompts:
                     "format_instructions": parser.get_format_instructions()
                 },
             )
+        self._parser_prompts[flag] = promptParser
         return promptParser
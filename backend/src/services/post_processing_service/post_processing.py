@@ -3,9 +3,9 @@ Work as LLM as a Judge to remove unrequired outputs from final response
 """
 
 import ast
-from langchain_core.prompts import PromptTemplate
 from src.services.llm_service.llm_provider import LLMProvider
-from src.utility.utils import Utility
+from src.services.llm_service.prompt_builder import Prompts
+from src.services.post_processing_service.relevance import LocalRelevanceScorer
 from src.utility.logger import AppLogger
 
 logger = AppLogger.get_logger(__name__)
@@ -14,12 +14,21 @@ logger = AppLogger.get_logger(__name__)
 class PostProcessing:
     """
     Post-process retrieved documents using LLM relevance checks.
+    A local scorer, when given, decides confident cases without the LLM.
     """
 
-    def __init__(self):
-        """Initialize providers and utility helpers for post-processing."""
-        self.llm_provider = LLMProvider()
-        self.utility = Utility()
+    def __init__(
+        self,
+        llm_provider: LLMProvider | None = None,
+        prompts: Prompts | None = None,
+        relevance: LocalRelevanceScorer | None = None,
+    ):
+        """Initialize providers and prompt templates for post-processing.
+        Accepts a shared LLMProvider to avoid building new clients.
+        """
+        self.llm_provider = llm_provider or LLMProvider()
+        self.prompts = prompts or Prompts()
+        self.relevance = relevance
 
     def clean_docs(self, url, docs):
         """Deduplicate documents while keeping the primary source.
@@ -63,29 +72,31 @@ class PostProcessing:
         joined_docs = "\n\n".join(doc_strings)
         return joined_docs, document_list, index_map
 
-    def post_process(self, ques, url, docs):
-        """Filter documents by LLM-assessed relevance.
-        Returns a filtered list of relevant documents.
+    def _candidates(self, url, docs):
+        """Deduplicate and number the documents the judge would see.
+        Returns joined strings, candidate documents, and index map.
+        """
+        return self.join_docs(self.clean_docs(url, docs))
+
+    def post_process_locally(self, url, docs):
+        """Filter documents without the LLM judge.
+        Used when retrieval found a clear winner: the ranked candidates are
+        kept unless confident local scores drop some of them.
+        """
+        whole_doc = self._candidates(url, docs)[1]
+        if self.relevance is None:
+            return whole_doc
+        return self.relevance.settle(whole_doc)
+
+    def _relevance_prompt(self, ques, joined_docs):
+        """Build the judge prompt for numbered content blocks."""
+        relevance_prompt = self.prompts.relevance_prompt()
+        return relevance_prompt.invoke({"query": ques, "content_blocks": joined_docs})
+
+    def _filter_docs(self, ans, whole_doc, index_map):
+        """Drop the documents the judge listed as irrelevant.
+        Falls back to keeping everything when the reply cannot be parsed.
         """
-        llms = self.llm_provider.all()
-        llm_gemini = llms.get("gemini")
-        llm_gpt = llms.get("gpt")
-        cleaned_docs = self.clean_docs(url, docs)
-        joined_docs, whole_doc, index_map = self.join_docs(cleaned_docs)
-        prompts = self.utility.load_prompts()
-        relevant_prompt = prompts["prompt"]["relevance"]
-        relevance_prompt = PromptTemplate(
-            input_variables=["query", "content_blocks"], template=relevant_prompt
-        )
-        try:
-            ans = llm_gemini.invoke(
-                relevance_prompt.invoke({"query": ques, "content_blocks": joined_docs})
-            )
-        except Exception as e:
-            logger.warning(f"Gemini Failed in Post Processing, reason: {e}")
-            ans = llm_gpt.invoke(
-                relevance_prompt.invoke({"query": ques, "content_blocks": joined_docs})
-            )
         try:
             irrelevant_indices = ast.literal_eval(ans.content.strip())
             if not isinstance(irrelevant_indices, list):
@@ -104,3 +115,44 @@ class PostProcessing:
                 if idx not in irrelevant_indices
             ]
         return filtered_docs
+
+    def post_process(self, ques, url, docs):
+        """Filter documents by LLM-assessed relevance.
+        Confident local scores settle the filter without calling the LLM.
+        Returns a filtered list of relevant documents.
+        """
+        joined_docs, whole_doc, index_map = self._candidates(url, docs)
+        if self.relevance is not None:
+            kept = self.relevance.filter(whole_doc)
+            if kept is not None:
+                return kept
+
+        llms = self.llm_provider.all()
+        llm_gemini = llms.get("gemini")
+        llm_gpt = llms.get("gpt")
+        prompt_value = self._relevance_prompt(ques, joined_docs)
+        try:
+            ans = llm_gemini.invoke(prompt_value)
+        except Exception as e:
+            logger.warning(f"Gemini Failed in Post Processing, reason: {e}")
+            ans = llm_gpt.invoke(prompt_value)
+        return self._filter_docs(ans, whole_doc, index_map)
+
+    async def apost_process(self, ques, url, docs):
+        """Async variant of post_process using ainvoke on the judge model."""
+        joined_docs, whole_doc, index_map = self._candidates(url, docs)
+        if self.relevance is not None:
+            kept = await self.relevance.afilter(whole_doc)
+            if kept is not None:
+                return kept
+
+        llms = self.llm_provider.all()
+        llm_gemini = llms.get("gemini")
+        llm_gpt = llms.get("gpt")
+        prompt_value = self._relevance_prompt(ques, joined_docs)
+        try:
+            ans = await llm_gemini.ainvoke(prompt_value)
+        except Exception as e:
+            logger.warning(f"Gemini Failed in Post Processing, reason: {e}")
+            ans = await llm_gpt.ainvoke(prompt_value)
+        return self._filter_docs(ans, whole_doc, index_map)
@@ -0,0 +1,164 @@
+"""Local relevance scoring that lets most searches skip the LLM judge.
+Combines the hybrid retrieval score of each candidate with its embedding
+similarity to the query, both computed during retrieval.
+"""
+
+import os
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from src.utility.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+# (threshold, margin) per embedding provider, tuned with benchmarks.relevance_eval.
+# Cosine baselines differ a lot between models, so uncalibrated providers
+# always defer to the LLM judge. The gemini and openai models need API keys
+# to calibrate, so deployments using them must set RELEVANCE_THRESHOLD and
+# RELEVANCE_MARGIN from a relevance_eval run with their provider.
+CALIBRATIONS: Dict[str, Tuple[float, float]] = {
+    "local": (0.35, 0.05),
+}
+
+
+class RelevanceStats:
+    """Counts searches decided locally versus sent to the LLM judge."""
+
+    def __init__(self):
+        """Start both counters at zero."""
+        self._lock = threading.Lock()
+        self.local = 0
+        self.judged = 0
+
+    def record(self, local: bool) -> None:
+        """Count one search by how it was decided."""
+        with self._lock:
+            if local:
+                self.local += 1
+            else:
+                self.judged += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return the counters and the share of searches that skipped the judge."""
+        with self._lock:
+            total = self.local + self.judged
+            return {
+                "local": self.local,
+                "judged": self.judged,
+                "skip_rate": round(self.local / total, 4) if total else 0.0,
+            }
+
+
+class LocalRelevanceScorer:
+    """Filter post-processing candidates without an LLM when confident.
+    Each candidate scores similarity_weight * the cosine between the query
+    and its best chunk plus the rest times its retrieval score relative to
+    the best candidate. Both are read from retrieval metadata, so scoring
+    makes no embedding call; a candidate without a similarity defers to
+    the judge. Scores within margin of threshold are ambiguous and defer
+    the whole set to the LLM judge; otherwise candidates below threshold
+    are dropped. The first candidate is the summarized page and is always
+    kept. Without a threshold every set of candidates goes to the judge.
+    """
+
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        threshold: Optional[float] = None,
+        margin: Optional[float] = None,
+        similarity_weight: float = 0.6,
+    ):
+        """Configure the decision boundary for the embeddings of provider.
+        threshold and margin fall back to RELEVANCE_THRESHOLD and
+        RELEVANCE_MARGIN, then to the provider's CALIBRATIONS entry. A large
+        margin sends every search to the judge; zero never does.
+        """
+        calibrated = CALIBRATIONS.get(provider, (None, 0.05))
+        if threshold is None:
+            env = os.getenv("RELEVANCE_THRESHOLD")
+            threshold = float(env) if env else calibrated[0]
+        if margin is None:
+            margin = float(os.getenv("RELEVANCE_MARGIN") or calibrated[1])
+        if threshold is None:
+            logger.warning(
+                f"No relevance calibration for {provider} embeddings, so every "
+                "search goes to the LLM judge; set RELEVANCE_THRESHOLD and "
+                "RELEVANCE_MARGIN from python -m benchmarks.relevance_eval "
+                f"--provider {provider}"
+            )
+        self.threshold = threshold
+        self.margin = margin
+        self.similarity_weight = similarity_weight
+        self.stats = RelevanceStats()
+
+    def score(self, candidates: List[dict]) -> Optional[np.ndarray]:
+        """Return the combined local score of every candidate, or None
+        when one of them has no similarity.
+        """
+        similarity = [c["metadata"].get("similarity") for c in candidates]
+        if any(value is None for value in similarity):
+            return None
+        similarity = np.asarray(similarity, dtype=np.float32)
+
+        retrieval = np.array(
+            [c["metadata"].get("retrieval_score", 0.0) for c in candidates],
+            dtype=np.float32,
+        )
+        if retrieval.max() > 0:
+            retrieval = retrieval / retrieval.max()
+        weight = self.similarity_weight
+        return weight * similarity + (1 - weight) * retrieval
+
+    def _keep(
+        self, scores: Optional[np.ndarray], candidates: List[dict]
+    ) -> Optional[List[dict]]:
+        """Return the candidates scoring clearly above threshold, or None
+        when the scores cannot settle it.
+        """
+        if self.threshold is None:
+            return None
+        if scores is None:
+            logger.info("Relevance similarity missing, deferring to the LLM judge")
+            return None
+        low, high = self.threshold - self.margin, self.threshold + self.margin
+        rest = scores[1:]
+        if ((rest >= low) & (rest < high)).any():
+            logger.info("Relevance scores ambiguous, deferring to the LLM judge")
+            return None
+        return [candidates[0]] + [
+            candidate
+            for candidate, value in zip(candidates[1:], rest.tolist())
+            if value >= high
+        ]
+
+    def decide(
+        self, scores: Optional[np.ndarray], candidates: List[dict]
+    ) -> Optional[List[dict]]:
+        """Return the kept candidates, or None when the judge must decide."""
+        kept = self._keep(scores, candidates)
+        self.stats.record(local=kept is not None)
+        return kept
+
+    def filter(self, candidates: List[dict]) -> Optional[List[dict]]:
+        """Filter prompt-ready candidates, or return None if ambiguous.
+        The query was already scored against every page during retrieval.
+        """
+        if len(candidates) <= 1:
+            self.stats.record(local=True)
+            return candidates
+        return self.decide(self.score(candidates), candidates)
+
+    def settle(self, candidates: List[dict]) -> List[dict]:
+        """Filter candidates that will not go to the judge at all.
+        Confident scores still drop weak candidates; otherwise every
+        candidate is kept rather than deferred.
+        """
+        kept = None
+        if len(candidates) > 1:
+            kept = self._keep(self.score(candidates), candidates)
+        self.stats.record(local=True)
+        return candidates if kept is None else kept
+
+    async def afilter(self, candidates: List[dict]) -> Optional[List[dict]]:
+        """Async variant of filter; scoring is local, so nothing is awaited."""
+        return self.filter(candidates)
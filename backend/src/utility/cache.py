@@ -0,0 +1,279 @@
+"""Pluggable byte stores and counters for backend caches.
+Provides an in-process LRU, Redis and disk tiers behind one interface.
+"""
+
+import os
+import time
+import uuid
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.utility.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters for a single cache.
+    Snapshots are plain dictionaries suitable for JSON responses.
+    """
+
+    def __init__(self):
+        """Start all counters at zero."""
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hits: int = 0, misses: int = 0) -> None:
+        """Add hit and miss counts in one locked update."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return current counters and the derived hit rate."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class ByteStore:
+    """Minimal batch key/value interface shared by all cache tiers.
+    Subclasses implement get_many and set_many over raw bytes.
+    """
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """Return values for keys, with None for each miss."""
+        raise NotImplementedError
+
+    def set_many(self, items: Sequence[Tuple[str, bytes]]) -> None:
+        """Store every (key, value) pair."""
+        raise NotImplementedError
+
+
+class LRUByteStore(ByteStore):
+    """In-process LRU store bounded by total value size in bytes.
+    Evicts least recently used entries once max_bytes is exceeded, and
+    treats entries older than the optional ttl (seconds) as misses.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: Optional[float] = None):
+        """Create an empty store with the given byte budget and TTL."""
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self._data: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """Return cached values and mark them as recently used."""
+        values: List[Optional[bytes]] = []
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is not None and entry[0] < now:
+                    del self._data[key]
+                    self.current_bytes -= len(entry[1])
+                    entry = None
+                if entry is not None:
+                    self._data.move_to_end(key)
+                values.append(entry[1] if entry is not None else None)
+        return values
+
+    def set_many(self, items: Sequence[Tuple[str, bytes]]) -> None:
+        """Insert values, then evict until the byte budget holds."""
+        expires = time.monotonic() + self.ttl if self.ttl else float("inf")
+        with self._lock:
+            for key, value in items:
+                if len(value) > self.max_bytes:
+                    continue
+                previous = self._data.pop(key, None)
+                if previous is not None:
+                    self.current_bytes -= len(previous[1])
+                self._data[key] = (expires, value)
+                self.current_bytes += len(value)
+            while self.current_bytes > self.max_bytes and self._data:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+
+class RedisByteStore(ByteStore):
+    """Redis-backed store shared across workers.
+    Expects a client created with decode_responses=False.
+    """
+
+    def __init__(self, client, prefix: str, ttl: Optional[int] = None):
+        """Bind the store to a client, key prefix and optional TTL."""
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """Fetch all keys with a single MGET."""
+        if not keys:
+            return []
+        return self.client.mget([f"{self.prefix}:{key}" for key in keys])
+
+    def set_many(self, items: Sequence[Tuple[str, bytes]]) -> None:
+        """Write all items in one pipeline round trip."""
+        if not items:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items:
+            pipe.set(f"{self.prefix}:{key}", value, ex=self.ttl)
+        pipe.execute()
+
+
+class DiskByteStore(ByteStore):
+    """File-per-key store under a local directory, bounded by total size.
+    Keys are sharded by their first two characters to keep folders small.
+    Reads refresh a file's mtime; once max_bytes is exceeded the oldest
+    files are deleted until the store is back under low_water of it.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int = 1024 * 1024 * 1024,
+        low_water: float = 0.9,
+    ):
+        """Create the store rooted at directory with a byte budget.
+        The size is counted once here and then tracked per process, so
+        writes from other processes are only seen at the next eviction.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self._lock = threading.Lock()
+        self.current_bytes = sum(size for _, size, _ in self._files())
+
+    def _path(self, key: str) -> Path:
+        """Map a key to its file path."""
+        return self.directory / key[:2] / key
+
+    def _files(self) -> List[Tuple[float, int, str]]:
+        """Return (mtime, size, path) for every file in the store."""
+        files = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _evict(self) -> None:
+        """Delete the oldest files until the store is under low_water."""
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * self.low_water
+        evicted = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        self.current_bytes = total
+        logger.info(f"Evicted {evicted} files from {self.directory}")
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """Read each key's file, treating missing files as misses."""
+        values: List[Optional[bytes]] = []
+        for key in keys:
+            path = self._path(key)
+            try:
+                values.append(path.read_bytes())
+                os.utime(path)
+            except FileNotFoundError:
+                values.append(None)
+        return values
+
+    def set_many(self, items: Sequence[Tuple[str, bytes]]) -> None:
+        """Write files atomically via a temporary file and rename.
+        Temporary names are unique, so concurrent writers of one key never
+        share a file; whichever rename lands last wins.
+        """
+        written = 0
+        for key, value in items:
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+            tmp_path.write_bytes(value)
+            os.replace(tmp_path, path)
+            written += len(value)
+        with self._lock:
+            self.current_bytes += written
+            if self.current_bytes > self.max_bytes:
+                self._evict()
+
+
+class TieredByteStore(ByteStore):
+    """Chain of stores checked from fastest to slowest.
+    Hits in a lower tier are promoted into every faster tier; a tier that
+    fails is logged and skipped, on reads, writes and promotions alike.
+    """
+
+    def __init__(self, tiers: Sequence[ByteStore]):
+        """Create the chain, fastest tier first."""
+        self.tiers = list(tiers)
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """Resolve keys tier by tier, promoting lower-tier hits."""
+        values: List[Optional[bytes]] = [None] * len(keys)
+        pending = list(range(len(keys)))
+        for depth, tier in enumerate(self.tiers):
+            if not pending:
+                break
+            try:
+                found = tier.get_many([keys[i] for i in pending])
+            except Exception as exc:
+                logger.warning(f"Cache tier {type(tier).__name__} failed: {exc}")
+                continue
+            promoted = []
+            still_pending = []
+            for i, value in zip(pending, found):
+                if value is None:
+                    still_pending.append(i)
+                else:
+                    values[i] = value
+                    promoted.append((keys[i], value))
+            for upper in self.tiers[:depth]:
+                # A failed promotion must not lose values already found
+                try:
+                    upper.set_many(promoted)
+                except Exception as exc:
+                    logger.warning(f"Cache tier {type(upper).__name__} failed: {exc}")
+            pending = still_pending
+        return values
+
+    def set_many(self, items: Sequence[Tuple[str, bytes]]) -> None:
+        """Write items to every tier, tolerating tier failures."""
+        for tier in self.tiers:
+            try:
+                tier.set_many(items)
+            except Exception as exc:
+                logger.warning(f"Cache tier {type(tier).__name__} failed: {exc}")
+
+
+def content_key(*parts: str) -> str:
+    """Return a stable SHA-256 hex key over the given string parts."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
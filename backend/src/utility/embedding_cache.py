@@ -0,0 +1,172 @@
+"""Content-addressed caching wrapper for embedding clients.
+Only texts never embedded before by the same model reach the provider.
+"""
+
+import time
+import asyncio
+from array import array
+from typing import Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from src.utility.cache import ByteStore, CacheStats, content_key
+from src.utility.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+
+class EmbeddingCacheStats(CacheStats):
+    """Cache counters extended with the provider time spent on misses.
+    Estimates the embedding latency saved by cache hits.
+    """
+
+    def __init__(self):
+        """Start counters and timing totals at zero."""
+        super().__init__()
+        self.embedded_texts = 0
+        self.embedding_seconds = 0.0
+
+    def record_embedding(self, texts: int, seconds: float) -> None:
+        """Account for one provider call covering texts items."""
+        with self._lock:
+            self.embedded_texts += texts
+            self.embedding_seconds += seconds
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return counters plus the estimated provider time saved."""
+        stats = super().snapshot()
+        with self._lock:
+            per_text = (
+                self.embedding_seconds / self.embedded_texts
+                if self.embedded_texts
+                else 0.0
+            )
+            stats["embedding_seconds"] = round(self.embedding_seconds, 3)
+            stats["estimated_seconds_saved"] = round(per_text * self.hits, 3)
+        return stats
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that caches vectors by (model, kind, text) hash.
+    Vectors are stored as float32 bytes in a pluggable ByteStore.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        store: ByteStore,
+    ):
+        """Wrap an embeddings client with a cache store.
+        The model name is part of every key so models never collide.
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.store = store
+        self.stats = EmbeddingCacheStats()
+
+    def _key(self, kind: str, text: str) -> str:
+        """Build the content address for a text.
+        Documents and queries are kept apart since providers may differ.
+        """
+        return content_key(self.model_name, kind, text)
+
+    @staticmethod
+    def _encode(vector: List[float]) -> bytes:
+        """Pack a vector as little-endian float32 bytes."""
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _decode(raw: bytes) -> List[float]:
+        """Unpack float32 bytes produced by _encode."""
+        values = array("f")
+        values.frombytes(raw)
+        return values.tolist()
+
+    def _lookup(
+        self, texts: List[str]
+    ) -> Tuple[List[str], List[Optional[List[float]]], Dict[str, str]]:
+        """Resolve texts against the store.
+        Returns keys, cached vectors (None on miss) and unique missing texts.
+        """
+        keys = [self._key("document", text) for text in texts]
+        cached = self.store.get_many(keys)
+        vectors = [self._decode(raw) if raw is not None else None for raw in cached]
+
+        missing: Dict[str, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        self.stats.record(hits=len(texts) - len(missing), misses=len(missing))
+        return keys, vectors, missing
+
+    def _fill(
+        self,
+        keys: List[str],
+        vectors: List[Optional[List[float]]],
+        missing: Dict[str, str],
+        fresh: List[List[float]],
+    ) -> List[List[float]]:
+        """Store freshly embedded vectors and merge them into the result."""
+        by_key = dict(zip(missing.keys(), fresh))
+        self.store.set_many(
+            [(key, self._encode(vector)) for key, vector in by_key.items()]
+        )
+        return [
+            vector if vector is not None else by_key[key]
+            for key, vector in zip(keys, vectors)
+        ]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, calling the provider only for cache misses.
+        Duplicate texts within one call are embedded once.
+        """
+        keys, vectors, missing = self._lookup(texts)
+        if not missing:
+            return vectors
+
+        start = time.perf_counter()
+        fresh = self.embeddings.embed_documents(list(missing.values()))
+        self.stats.record_embedding(len(missing), time.perf_counter() - start)
+        return self._fill(keys, vectors, missing, fresh)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async variant of embed_documents using the provider's async client.
+        Store access runs in a worker thread since tiers may block.
+        """
+        keys, vectors, missing = await asyncio.to_thread(self._lookup, texts)
+        if not missing:
+            return vectors
+
+        start = time.perf_counter()
+        fresh = await self.embeddings.aembed_documents(list(missing.values()))
+        self.stats.record_embedding(len(missing), time.perf_counter() - start)
+        return await asyncio.to_thread(self._fill, keys, vectors, missing, fresh)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query string through the same cache."""
+        key = self._key("query", text)
+        raw = self.store.get_many([key])[0]
+        if raw is not None:
+            self.stats.record(hits=1)
+            return self._decode(raw)
+
+        self.stats.record(misses=1)
+        start = time.perf_counter()
+        vector = self.embeddings.embed_query(text)
+        self.stats.record_embedding(1, time.perf_counter() - start)
+        self.store.set_many([(key, self._encode(vector))])
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async variant of embed_query."""
+        key = self._key("query", text)
+        raw = (await asyncio.to_thread(self.store.get_many, [key]))[0]
+        if raw is not None:
+            self.stats.record(hits=1)
+            return self._decode(raw)
+
+        self.stats.record(misses=1)
+        start = time.perf_counter()
+        vector = await self.embeddings.aembed_query(text)
+        self.stats.record_embedding(1, time.perf_counter() - start)
+        await asyncio.to_thread(self.store.set_many, [(key, self._encode(vector))])
+        return vector
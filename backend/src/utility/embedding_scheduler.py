@@ -0,0 +1,327 @@
+"""Process-wide batching and rate limiting for remote embedding calls.
+Texts from concurrent callers are coalesced into provider-sized batches
+and dispatched under request/token rate limits with bounded concurrency.
+"""
+
+import time
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from src.utility.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count used for batch and rate budgets (4 chars/token)."""
+    return len(text) // 4 + 1
+
+
+class RateLimiter:
+    """Token buckets for requests per minute and tokens per minute.
+    A limit of None disables that bucket.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+    ):
+        """Start both buckets full."""
+        self.limits = (requests_per_minute, tokens_per_minute)
+        self.levels = [float(limit or 0) for limit in self.limits]
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        """Top the buckets up for the time elapsed since the last call."""
+        elapsed = now - self.updated
+        self.updated = now
+        for i, limit in enumerate(self.limits):
+            if limit:
+                self.levels[i] = min(limit, self.levels[i] + elapsed * limit / 60)
+
+    def acquire(self, tokens: int) -> float:
+        """Block until one request of tokens fits; returns seconds waited.
+        Costs above a bucket's capacity are capped so they cannot stall.
+        """
+        costs = [1, tokens]
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                delay = 0.0
+                for i, limit in enumerate(self.limits):
+                    if limit:
+                        cost = min(costs[i], limit)
+                        delay = max(delay, (cost - self.levels[i]) * 60 / limit)
+                if delay <= 0:
+                    for i, limit in enumerate(self.limits):
+                        if limit:
+                            self.levels[i] -= min(costs[i], limit)
+                    return waited
+            time.sleep(delay)
+            waited += delay
+
+
+class _Request:
+    """One caller's texts and the future resolved when all are embedded."""
+
+    def __init__(self, size: int):
+        """Reserve a slot per text."""
+        self.future: Future = Future()
+        self.vectors: List[Optional[List[float]]] = [None] * size
+        self.remaining = size
+
+
+class _Job:
+    """A pending unique text and every (request, position) waiting on it."""
+
+    def __init__(self, kind: str, text: str, tokens: int, enqueued: float):
+        """Describe one text to embed; waiters are added as callers arrive."""
+        self.kind = kind
+        self.text = text
+        self.tokens = tokens
+        self.enqueued = enqueued
+        self.waiters: List[Tuple[_Request, int]] = []
+
+
+class SchedulerStats:
+    """Counters describing how well requests were coalesced."""
+
+    def __init__(self):
+        """Start all counters at zero."""
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.texts = 0
+        self.deduplicated = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.rate_limited_seconds = 0.0
+
+    def record(self, **counts: float) -> None:
+        """Add to any counters in one locked update."""
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Return counters plus the mean batch size."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "texts": self.texts,
+                "deduplicated": self.deduplicated,
+                "batches": self.batches,
+                "mean_batch_size": (
+                    round(self.batched_texts / self.batches, 2) if self.batches else 0.0
+                ),
+                "rate_limited_seconds": round(self.rate_limited_seconds, 3),
+            }
+
+
+class EmbeddingScheduler(Embeddings):
+    """Embeddings wrapper that funnels every call through one dispatcher.
+    Document texts wait up to max_wait_ms for company and are sent in
+    batches of at most max_batch_size texts and max_batch_tokens tokens;
+    identical pending texts are embedded once. Queries skip the wait since
+    providers embed them one at a time. At most max_concurrency provider
+    calls run at once, each admitted by the rate limiter. Callers give up
+    after timeout seconds, and if the dispatcher dies every queued text
+    fails at once; the next call starts a new dispatcher.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_batch_size: int = 100,
+        max_batch_tokens: int = 8000,
+        max_wait_ms: float = 20,
+        max_concurrency: int = 4,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        timeout: float = 120,
+    ):
+        """Wrap a provider client with batching limits and rate budgets.
+        Limits should match the provider's per-request and quota caps.
+        """
+        self.embeddings = embeddings
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.stats = SchedulerStats()
+
+        self._documents: Deque[_Job] = deque()
+        self._queries: Deque[_Job] = deque()
+        self._pending: Dict[Tuple[str, str], _Job] = {}
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="embed-batch"
+        )
+        self._dispatcher: Optional[threading.Thread] = None
+
+    def _submit(self, kind: str, texts: List[str]) -> Future:
+        """Queue texts for embedding and return a future of their vectors."""
+        request = _Request(len(texts))
+        if not texts:
+            request.future.set_result([])
+            return request.future
+
+        now = time.monotonic()
+        deduplicated = 0
+        with self._cond:
+            for position, text in enumerate(texts):
+                job = self._pending.get((kind, text))
+                if job is None:
+                    job = _Job(kind, text, estimate_tokens(text), now)
+                    self._pending[(kind, text)] = job
+                    queue = self._queries if kind == "query" else self._documents
+                    queue.append(job)
+                else:
+                    deduplicated += 1
+                job.waiters.append((request, position))
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(
+                    target=self._run, name="embed-dispatcher", daemon=True
+                )
+                self._dispatcher.start()
+            self._cond.notify()
+        self.stats.record(requests=1, texts=len(texts), deduplicated=deduplicated)
+        return request.future
+
+    def _batch_ready(self) -> bool:
+        """Whether the document queue already fills a whole batch."""
+        tokens = 0
+        for count, job in enumerate(self._documents, start=1):
+            tokens += job.tokens
+            if count >= self.max_batch_size or tokens >= self.max_batch_tokens:
+                return True
+        return False
+
+    def _take_batch(self) -> List[_Job]:
+        """Pop the next batch, a single query first if one is waiting."""
+        if self._queries:
+            jobs = [self._queries.popleft()]
+        else:
+            jobs, tokens = [], 0
+            while self._documents and len(jobs) < self.max_batch_size:
+                job = self._documents[0]
+                if jobs and tokens + job.tokens > self.max_batch_tokens:
+                    break
+                jobs.append(self._documents.popleft())
+                tokens += job.tokens
+        for job in jobs:
+            del self._pending[(job.kind, job.text)]
+        return jobs
+
+    def _next_batch(self) -> List[_Job]:
+        """Wait for queued texts and pop the next batch to send."""
+        with self._cond:
+            while not self._documents and not self._queries:
+                self._cond.wait()
+            if not self._queries:
+                deadline = self._documents[0].enqueued + self.max_wait
+                while not self._queries and not self._batch_ready():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            return self._take_batch()
+
+    def _run(self) -> None:
+        """Dispatcher loop: collect a batch, wait for capacity, send it.
+        While a batch waits for a slot or the rate limiter, new texts keep
+        queueing, so batches grow under load instead of calls multiplying.
+        If the loop fails, the batch in hand and every queued text fail
+        with it rather than leaving their callers waiting.
+        """
+        jobs: List[_Job] = []
+        try:
+            while True:
+                jobs = self._next_batch()
+                self._slots.acquire()
+                try:
+                    waited = self.limiter.acquire(sum(job.tokens for job in jobs))
+                    self.stats.record(
+                        batches=1, batched_texts=len(jobs), rate_limited_seconds=waited
+                    )
+                    self._executor.submit(self._dispatch, jobs)
+                except BaseException:
+                    self._slots.release()
+                    raise
+                jobs = []
+        except Exception as exc:
+            logger.error(f"Embedding dispatcher stopped: {exc}")
+            with self._cond:
+                jobs += [*self._queries, *self._documents]
+                self._queries.clear()
+                self._documents.clear()
+                self._pending.clear()
+                self._dispatcher = None
+            self._resolve(jobs, [], RuntimeError(f"Embedding dispatcher failed: {exc}"))
+
+    def _dispatch(self, jobs: List[_Job]) -> None:
+        """Call the provider for one batch and resolve every waiter."""
+        try:
+            if jobs[0].kind == "query":
+                vectors = [self.embeddings.embed_query(jobs[0].text)]
+            else:
+                vectors = self.embeddings.embed_documents([job.text for job in jobs])
+            if len(vectors) != len(jobs):
+                raise ValueError(f"Got {len(vectors)} vectors for {len(jobs)} texts")
+            error = None
+        except Exception as exc:
+            logger.warning(f"Embedding batch of {len(jobs)} texts failed: {exc}")
+            vectors, error = [], exc
+        finally:
+            self._slots.release()
+        self._resolve(jobs, vectors, error)
+
+    def _resolve(
+        self,
+        jobs: List[_Job],
+        vectors: List[List[float]],
+        error: Optional[BaseException],
+    ) -> None:
+        """Hand each job's vector, or error, to every request waiting on it."""
+        with self._cond:
+            for position, job in enumerate(jobs):
+                for request, slot in job.waiters:
+                    try:
+                        if request.future.done():
+                            continue
+                        if error is not None:
+                            request.future.set_exception(error)
+                            continue
+                        request.vectors[slot] = vectors[position]
+                        request.remaining -= 1
+                        if request.remaining == 0:
+                            request.future.set_result(request.vectors)
+                    except InvalidStateError:
+                        # Cancelled by a caller that timed out meanwhile
+                        continue
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents through the shared batches; blocks the caller."""
+        return self._submit("document", texts).result(timeout=self.timeout)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Async variant of embed_documents; awaits without blocking the loop."""
+        future = asyncio.wrap_future(self._submit("document", texts))
+        return await asyncio.wait_for(future, self.timeout)
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, sharing the call with identical pending queries."""
+        return self._submit("query", [text]).result(timeout=self.timeout)[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Async variant of embed_query."""
+        future = asyncio.wrap_future(self._submit("query", [text]))
+        return (await asyncio.wait_for(future, self.timeout))[0]
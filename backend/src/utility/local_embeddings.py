@@ -0,0 +1,78 @@
+"""Local CPU embeddings that need no model download or network access.
+Uses signed feature hashing over words and character n-grams.
+"""
+
+import re
+import zlib
+import numpy as np
+from typing import List, Tuple
+from langchain_core.embeddings import Embeddings
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbeddings(Embeddings):
+    """Stateless hashing embedder for offline indexing and tests.
+    Each word and each character n-gram of a word is hashed into a fixed
+    number of dimensions with a sign bit, weighted by log term frequency
+    and L2-normalised. No fitting is needed, so documents and queries
+    embedded in different processes stay comparable.
+    """
+
+    def __init__(
+        self,
+        dimensions: int = 384,
+        ngram_range: Tuple[int, int] = (3, 5),
+        batch_size: int = 256,
+    ):
+        """Configure the output size, n-gram range and batch size.
+        Batches bound the size of the dense matrix built at once.
+        """
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+        self.batch_size = batch_size
+
+    def _features(self, text: str) -> List[str]:
+        """Return the word and padded character n-gram features of a text."""
+        low, high = self.ngram_range
+        features = []
+        for word in _TOKEN.findall(text.lower()):
+            features.append(f"w:{word}")
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                features.extend(padded[i : i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Embed one batch of texts into a normalised float32 matrix."""
+        rows: List[int] = []
+        hashes: List[int] = []
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            rows.extend([row] * len(features))
+            hashes.extend(zlib.crc32(f.encode("utf-8")) for f in features)
+
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        if hashes:
+            hashed = np.asarray(hashes, dtype=np.uint32)
+            columns = (hashed >> 1) % self.dimensions
+            signs = np.where(hashed & 1, 1.0, -1.0).astype(np.float32)
+            np.add.at(matrix, (np.asarray(rows), columns), signs)
+
+        # Sublinear term frequency, then unit length for cosine similarity
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in batches of batch_size."""
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(
+                self._embed_batch(texts[start : start + self.batch_size]).tolist()
+            )
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a single query with the same features as documents."""
+        return self._embed_batch([text])[0].tolist()
@@ -24,6 +24,8 @@ class PathResolver:
         "src": BACKEND_ROOT / "src",
         "prompts": BACKEND_ROOT / "config" / "prompts.yml",
         "logs": BACKEND_ROOT / "data" / "logs",
+        "embedding_cache": BACKEND_ROOT / "data" / "embedding_cache",
+        "indexes": BACKEND_ROOT / "data" / "indexes",
     }
 
     @classmethod
@@ -3,11 +3,23 @@ Wraps cached access to API keys and embedding clients.
 """
 
 import os
+import redis
 from functools import lru_cache
-from typing import Literal
+from typing import Dict, Literal
 from dotenv import load_dotenv
 from langchain_openai import OpenAIEmbeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from src.utility.cache import (
+    ByteStore,
+    DiskByteStore,
+    LRUByteStore,
+    RedisByteStore,
+    TieredByteStore,
+)
+from src.utility.embedding_cache import CachedEmbeddings
+from src.utility.embedding_scheduler import EmbeddingScheduler
+from src.utility.local_embeddings import HashingEmbeddings
+from src.utility.summary_cache import SummaryCache
 from src.utility.path_finder import Finder
 from src.utility.logger import AppLogger
 
@@ -50,17 +62,105 @@ class SecretsProvider:
         return key
 
 
-EmbeddingProvider = Literal["openai", "gemini"]
+EmbeddingProvider = Literal["openai", "gemini", "local"]
+EmbeddingCacheBackend = Literal["memory", "redis", "disk"]
 
 DEFAULT_OPENAI_MODEL = "text-embedding-3-small"
 DEFAULT_GEMINI_MODEL = "models/embedding-001"
+DEFAULT_LOCAL_MODEL = "hashing-384"
+
+# Per-request caps and default quotas of the remote embedding APIs
+SCHEDULER_LIMITS = {
+    "openai": {
+        "max_batch_size": 512,
+        "max_batch_tokens": 250_000,
+        "requests_per_minute": 3000,
+        "tokens_per_minute": 1_000_000,
+    },
+    "gemini": {
+        "max_batch_size": 100,
+        "max_batch_tokens": 20_000,
+        "requests_per_minute": 1500,
+        "tokens_per_minute": None,
+    },
+}
 
 
 class EmbeddingsProvider:
     """
     Centralized, cached embeddings provider.
+    Every client is wrapped in a content-addressed vector cache; remote
+    clients additionally go through a shared batching scheduler.
     """
 
+    _cached: Dict[str, CachedEmbeddings] = {}
+    _schedulers: Dict[str, EmbeddingScheduler] = {}
+
+    @staticmethod
+    def get_scheduler(provider: str, embeddings) -> EmbeddingScheduler:
+        """
+        Wraps a remote client in a batching, rate-limited scheduler.
+        Defaults follow SCHEDULER_LIMITS; EMBEDDING_MAX_BATCH,
+        EMBEDDING_MAX_BATCH_TOKENS, EMBEDDING_RPM, EMBEDDING_TPM,
+        EMBEDDING_MAX_CONCURRENCY, EMBEDDING_BATCH_WAIT_MS and
+        EMBEDDING_TIMEOUT override them.
+        """
+        limits = dict(SCHEDULER_LIMITS[provider])
+        overrides = {
+            "max_batch_size": "EMBEDDING_MAX_BATCH",
+            "max_batch_tokens": "EMBEDDING_MAX_BATCH_TOKENS",
+            "requests_per_minute": "EMBEDDING_RPM",
+            "tokens_per_minute": "EMBEDDING_TPM",
+            "max_concurrency": "EMBEDDING_MAX_CONCURRENCY",
+            "max_wait_ms": "EMBEDDING_BATCH_WAIT_MS",
+            "timeout": "EMBEDDING_TIMEOUT",
+        }
+        for name, env in overrides.items():
+            if os.getenv(env):
+                limits[name] = int(os.getenv(env))
+        return EmbeddingScheduler(embeddings, **limits)
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def get_cache_store() -> ByteStore:
+        """
+        Returns the shared vector cache store.
+        An in-process LRU sits in front of an optional Redis or disk tier,
+        selected with EMBEDDING_CACHE_BACKEND.
+        """
+        max_bytes = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES") or 64 * 1024 * 1024)
+        backend: EmbeddingCacheBackend = os.getenv("EMBEDDING_CACHE_BACKEND") or "redis"
+        tiers: list[ByteStore] = [LRUByteStore(max_bytes=max_bytes)]
+
+        if backend == "redis" and os.getenv("REDIS_HOST"):
+            redis_port = os.getenv("REDIS_PORT")
+            client = redis.Redis(
+                host=os.getenv("REDIS_HOST"),
+                port=int(redis_port) if redis_port else 6379,
+                db=0,
+                decode_responses=False,
+            )
+            tiers.append(
+                RedisByteStore(
+                    client=client,
+                    prefix="emb",
+                    ttl=int(os.getenv("EMBEDDING_CACHE_TTL") or 7 * 24 * 3600),
+                )
+            )
+        elif backend == "disk":
+            tiers.append(
+                DiskByteStore(
+                    paths.get_directory(name="embedding_cache"),
+                    max_bytes=int(
+                        os.getenv("EMBEDDING_CACHE_DISK_MAX_BYTES")
+                        or 1024 * 1024 * 1024
+                    ),
+                )
+            )
+
+        logger.info("Embedding cache tiers: %s", [type(t).__name__ for t in tiers])
+        return TieredByteStore(tiers)
+
     @staticmethod
     @lru_cache(maxsize=4)
     def get_embeddings(
@@ -69,20 +169,96 @@ class EmbeddingsProvider:
     ):
         """
         Returns a cached embeddings instance.
+        The local provider runs on CPU; its model name is hashing-<dimensions>.
         """
 
         if provider == "openai":
             model = model_name or DEFAULT_OPENAI_MODEL
             logger.info("Loaded OpenAI embeddings: %s", model)
-            return OpenAIEmbeddings(
+            embeddings = OpenAIEmbeddings(
                 model=model,
                 api_key=SecretsProvider.get_openai_api_key(),
             )
 
-        if provider == "gemini":
+        elif provider == "gemini":
             model = model_name or DEFAULT_GEMINI_MODEL
             logger.info("Loaded Gemini embeddings: %s", model)
-            return GoogleGenerativeAIEmbeddings(
+            embeddings = GoogleGenerativeAIEmbeddings(
                 model=model,
                 google_api_key=SecretsProvider.get_gemini_api_key(),
             )
+
+        elif provider == "local":
+            model = model_name or DEFAULT_LOCAL_MODEL
+            kind, _, dimensions = model.partition("-")
+            if kind != "hashing" or not dimensions.isdigit():
+                raise ValueError(f"Unknown local embedding model '{model}'")
+            logger.info("Loaded local hashing embeddings: %s", model)
+            embeddings = HashingEmbeddings(dimensions=int(dimensions))
+
+        else:
+            raise ValueError(f"Unknown embedding provider '{provider}'")
+
+        if provider in SCHEDULER_LIMITS:
+            embeddings = EmbeddingsProvider.get_scheduler(provider, embeddings)
+
+        cached = CachedEmbeddings(
+            embeddings=embeddings,
+            model_name=f"{provider}:{model}",
+            store=EmbeddingsProvider.get_cache_store(),
+        )
+        EmbeddingsProvider._cached[cached.model_name] = cached
+        if isinstance(embeddings, EmbeddingScheduler):
+            EmbeddingsProvider._schedulers[cached.model_name] = embeddings
+        return cached
+
+    @staticmethod
+    def cache_stats() -> Dict[str, Dict[str, float]]:
+        """
+        Returns hit/miss counters for every embeddings client in use.
+        """
+        return {
+            name: cached.stats.snapshot()
+            for name, cached in EmbeddingsProvider._cached.items()
+        }
+
+    @staticmethod
+    def scheduler_stats() -> Dict[str, Dict[str, float]]:
+        """
+        Returns batching and rate-limit counters for every remote client.
+        """
+        return {
+            name: scheduler.stats.snapshot()
+            for name, scheduler in EmbeddingsProvider._schedulers.items()
+        }
+
+
+class SummaryCacheProvider:
+    """
+    Centralized provider for the shared LLM summary cache.
+    """
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def get_cache() -> SummaryCache:
+        """
+        Returns the shared LLM summary cache.
+        An in-process LRU with TTL sits in front of Redis when configured,
+        so every worker and user shares summaries of the same page.
+        """
+        max_bytes = int(os.getenv("SUMMARY_CACHE_MAX_BYTES") or 16 * 1024 * 1024)
+        ttl = int(os.getenv("SUMMARY_CACHE_TTL") or 24 * 3600)
+        tiers: list[ByteStore] = [LRUByteStore(max_bytes=max_bytes, ttl=ttl)]
+
+        if os.getenv("REDIS_HOST"):
+            redis_port = os.getenv("REDIS_PORT")
+            client = redis.Redis(
+                host=os.getenv("REDIS_HOST"),
+                port=int(redis_port) if redis_port else 6379,
+                db=0,
+                decode_responses=False,
+            )
+            tiers.append(RedisByteStore(client=client, prefix="summary", ttl=ttl))
+
+        logger.info("Summary cache tiers: %s", [type(t).__name__ for t in tiers])
+        return SummaryCache(TieredByteStore(tiers))
@@ -0,0 +1,108 @@
+"""Shared cache for LLM page summaries and their structured parses.
+A summary depends only on the page, so users landing on it share one.
+"""
+
+import json
+import asyncio
+from typing import Any, Optional, Tuple
+from src.utility.cache import ByteStore, CacheStats, LRUByteStore, content_key
+from src.utility.logger import AppLogger
+
+logger = AppLogger.get_logger(__name__)
+
+
+class SummaryCache:
+    """Cache summaries by (url, content hash, date, flag) and parses by text.
+    Values are JSON encoded in a pluggable ByteStore whose tiers provide
+    TTL and size-bounded eviction.
+    """
+
+    def __init__(self, store: Optional[ByteStore] = None):
+        """Wrap a store; defaults to a 16 MiB in-process LRU with a 1 day TTL."""
+        self.store = store or LRUByteStore(max_bytes=16 * 1024 * 1024, ttl=86400)
+        self.summary_stats = CacheStats()
+        self.structure_stats = CacheStats()
+
+    @staticmethod
+    def summary_key(context: str, date: Optional[str], url: str, flag: str) -> str:
+        """Address a summary by every input of the response prompt.
+        Bookmarks ignore the date, so it is left out of their key.
+        """
+        if flag != "history":
+            date = None
+        return content_key("summary", flag, url, date or "", content_key(context))
+
+    @staticmethod
+    def structure_key(content: str, flag: str) -> str:
+        """Address a structured parse by the summary text it was made from."""
+        return content_key("structure", flag, content)
+
+    def _get(self, key: str, stats: CacheStats) -> Optional[Any]:
+        """Read and decode one value, counting the hit or miss."""
+        raw = self.store.get_many([key])[0]
+        stats.record(hits=int(raw is not None), misses=int(raw is None))
+        return json.loads(raw) if raw is not None else None
+
+    def _set(self, key: str, value: Any) -> None:
+        """Encode and store one value."""
+        self.store.set_many([(key, json.dumps(value).encode("utf-8"))])
+
+    def get_summary(
+        self, context: str, date: Optional[str], url: str, flag: str
+    ) -> Optional[Tuple[str, str]]:
+        """Return a cached (summary, model) pair, or None."""
+        value = self._get(
+            self.summary_key(context, date, url, flag), self.summary_stats
+        )
+        return tuple(value) if value is not None else None
+
+    def set_summary(
+        self,
+        context: str,
+        date: Optional[str],
+        url: str,
+        flag: str,
+        summary: Tuple[str, str],
+    ) -> None:
+        """Store a (summary, model) pair for the page."""
+        self._set(self.summary_key(context, date, url, flag), list(summary))
+
+    def get_structure(self, content: str, flag: str) -> Optional[dict]:
+        """Return the cached structured parse of a summary, or None."""
+        return self._get(self.structure_key(content, flag), self.structure_stats)
+
+    def set_structure(self, content: str, flag: str, parsed: dict) -> None:
+        """Store the structured parse of a summary."""
+        self._set(self.structure_key(content, flag), parsed)
+
+    async def aget_summary(
+        self, context: str, date: Optional[str], url: str, flag: str
+    ) -> Optional[Tuple[str, str]]:
+        """Async variant of get_summary; store access runs in a thread."""
+        return await asyncio.to_thread(self.get_summary, context, date, url, flag)
+
+    async def aset_summary(
+        self,
+        context: str,
+        date: Optional[str],
+        url: str,
+        flag: str,
+        summary: Tuple[str, str],
+    ) -> None:
+        """Async variant of set_summary."""
+        await asyncio.to_thread(self.set_summary, context, date, url, flag, summary)
+
+    async def aget_structure(self, content: str, flag: str) -> Optional[dict]:
+        """Async variant of get_structure."""
+        return await asyncio.to_thread(self.get_structure, content, flag)
+
+    async def aset_structure(self, content: str, flag: str, parsed: dict) -> None:
+        """Async variant of set_structure."""
+        await asyncio.to_thread(self.set_structure, content, flag, parsed)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters for summaries and parses."""
+        return {
+            "summary": self.summary_stats.snapshot(),
+            "structure": self.structure_stats.snapshot(),
+        }
@@ -4,11 +4,17 @@ Keeps file access centralized for the backend services.
 
 import os
 import yaml
+import threading
+from typing import Any, Dict, Tuple
 from src.utility.path_finder import Finder
 from src.utility.logger import AppLogger
 
 logger = AppLogger.get_logger(__name__)
 
+# Parsed YAML per path, keyed by the file mtime it was read at
+_prompt_cache: Dict[str, Tuple[float, Any]] = {}
+_prompt_lock = threading.Lock()
+
 
 class Utility:
     """Lightweight helper for shared utility operations."""
@@ -23,11 +29,27 @@ class Utility:
         """
         Load prompt templates from the config directory.
         Resolves the prompts path and parses YAML safely.
+        The parsed result is cached until the file's mtime changes,
+        so repeated calls return the same object without touching YAML.
         """
         base_path = self.paths.get_directory(name="config")
         full_path = os.path.join(base_path, filepath)
         try:
-            with open(full_path, "r") as f:
-                return yaml.safe_load(f)
+            mtime = os.path.getmtime(full_path)
+            cached = _prompt_cache.get(full_path)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+
+            with _prompt_lock:
+                cached = _prompt_cache.get(full_path)
+                if cached is not None and cached[0] == mtime:
+                    return cached[1]
+                with open(full_path, "r") as f:
+                    prompts = yaml.safe_load(f)
+                _prompt_cache[full_path] = (mtime, prompts)
+                logger.info(f"Loaded prompts from {full_path}")
+                return prompts
         except Exception as e:
             logger.error(f"Unable to open file: {e}")
+            cached = _prompt_cache.get(full_path)
+            return cached[1] if cached is not None else None
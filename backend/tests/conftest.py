@@ -0,0 +1,59 @@
+"""Shared test setup: offline embeddings, in-process caches, fake LLMs."""
+
+import os
+
+os.environ.setdefault("EMBEDDING_CACHE_BACKEND", "memory")
+
+from typing import List
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers the judge with "[]" and anything else with
+    a fixed summary, recording every prompt it receives.
+    """
+
+    prompts: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _reply(self, messages) -> str:
+        text = "\n".join(str(message.content) for message in messages)
+        self.prompts.append(text)
+        if "content blocks" in text:
+            return "[]"
+        return "Summary of the page."
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        message = AIMessage(content=self._reply(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for token in self._reply(messages).split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+        # Real models close their stream with an empty chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content=""))
+
+
+class FakeLLMProvider:
+    """Stand-in for LLMProvider backed by one FakeChatModel."""
+
+    def __init__(self):
+        self.model = FakeChatModel(prompts=[])
+
+    def get(self, name: str) -> BaseChatModel:
+        return self.model
+
+    def all(self):
+        return {"gpt": self.model, "gemini": self.model}
+
+
+@pytest.fixture
+def llm_provider() -> FakeLLMProvider:
+    return FakeLLMProvider()
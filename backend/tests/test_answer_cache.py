@@ -0,0 +1,30 @@
+"""Answer cache keys and writes."""
+
+import asyncio
+
+import fakeredis
+import redis
+
+from src.models.core import SearchResponse
+from src.services.core_service.answer_cache import AnswerCache
+
+
+def test_normalized_queries_drop_filler_but_keep_word_order():
+    normalize = AnswerCache.normalize_query
+    assert normalize("That YouTube video about Rust?") == "youtube video rust"
+    assert normalize("flights paris to london") != normalize("flights london to paris")
+    assert normalize("what is the") == "what is the"
+
+
+def test_failed_cache_writes_do_not_raise(monkeypatch):
+    server = fakeredis.FakeServer()
+    cache = AnswerCache(
+        fakeredis.FakeRedis(server=server), fakeredis.FakeAsyncRedis(server=server)
+    )
+
+    async def down(*args, **kwargs):
+        raise redis.ConnectionError("redis is down")
+
+    monkeypatch.setattr(cache.async_client, "set", down)
+    response = SearchResponse(success=True, result="found", docs=[])
+    asyncio.run(cache.aset("u1", "history", "rust", "v1", response))
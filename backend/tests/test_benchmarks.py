@@ -0,0 +1,29 @@
+"""Smoke runs of every benchmark on a tiny corpus."""
+
+import pytest
+
+from benchmarks import (
+    ann_benchmark,
+    candidate_pool,
+    fusion_eval,
+    fuzzy_benchmark,
+    quantization_recall,
+    relevance_eval,
+)
+
+RUNS = [
+    (ann_benchmark, ["--pages", "120", "--queries", "5"]),
+    (quantization_recall, ["--pages", "120", "--queries", "5"]),
+    (fuzzy_benchmark, ["--sizes", "200", "--queries", "20"]),
+    (fusion_eval, ["--pages", "60", "--queries", "10"]),
+    (candidate_pool, ["--pages", "60", "--queries", "10"]),
+    (relevance_eval, []),
+]
+
+
+@pytest.mark.parametrize(
+    "benchmark, argv", RUNS, ids=[module.__name__ for module, _ in RUNS]
+)
+def test_benchmark_runs(benchmark, argv, capsys):
+    benchmark.main(argv)
+    assert capsys.readouterr().out.strip()
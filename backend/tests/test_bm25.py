@@ -0,0 +1,32 @@
+"""Parity of the BM25 inverted index with rank_bm25."""
+
+import random
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from src.services.core_service.bm25 import BM25Index
+
+
+def test_bm25_matches_rank_bm25():
+    rng = random.Random(1)
+    words = [f"w{n}" for n in range(300)]
+    docs = [
+        [rng.choice(words[: rng.randint(5, 300)]) for _ in range(rng.randint(3, 40))]
+        for _ in range(500)
+    ]
+    reference = BM25Okapi(docs)
+    index = BM25Index.from_bytes(BM25Index.build(docs).to_bytes())
+
+    for _ in range(100):
+        query = [rng.choice(words) for _ in range(rng.randint(1, 4))] + ["missing"]
+        expected = reference.get_scores(query)
+        ids, scores = index.search(query, 5)
+        assert np.allclose(scores, expected[ids])
+        assert np.allclose(scores, np.sort(expected[expected > 0])[::-1][:5])
+
+
+def test_bm25_without_matches_is_empty():
+    index = BM25Index.build([["a", "b"], ["c"]])
+    ids, scores = index.search(["zzz"], 3)
+    assert len(ids) == len(scores) == 0
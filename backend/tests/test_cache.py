@@ -0,0 +1,60 @@
+"""Byte store tiers of the embedding cache."""
+
+import os
+import time
+import threading
+
+from src.utility.cache import DiskByteStore, LRUByteStore, TieredByteStore
+
+
+def age(store: DiskByteStore, key: str, seconds: float) -> None:
+    then = time.time() - seconds
+    os.utime(store._path(key), (then, then))
+
+
+def test_disk_store_evicts_oldest_files_over_budget(tmp_path):
+    store = DiskByteStore(tmp_path, max_bytes=300, low_water=0.7)
+    store.set_many([(f"k{n}", bytes(100)) for n in range(3)])
+    for n in range(3):
+        age(store, f"k{n}", 100 - n)
+    # Reading refreshes k0, so k1 is now the oldest
+    assert store.get_many(["k0"]) == [bytes(100)]
+
+    store.set_many([("k3", bytes(100))])
+    assert store.get_many(["k0", "k1", "k2", "k3"]) == [
+        bytes(100),
+        None,
+        None,
+        bytes(100),
+    ]
+    assert store.current_bytes == 200
+    assert DiskByteStore(tmp_path).current_bytes == 200
+
+
+def test_concurrent_writes_of_one_key_publish_whole_values(tmp_path):
+    store = DiskByteStore(tmp_path)
+    values = [bytes([n]) * 200_000 for n in range(8)]
+    threads = [
+        threading.Thread(target=store.set_many, args=([("same", value)],))
+        for value in values
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert store.get_many(["same"])[0] in values
+    assert os.listdir(tmp_path / "sa") == ["same"]
+
+
+class FailingStore(LRUByteStore):
+    def set_many(self, items):
+        raise ConnectionError("redis is down")
+
+
+def test_failed_promotion_still_returns_lower_tier_hits(tmp_path):
+    disk = DiskByteStore(tmp_path)
+    disk.set_many([("k", b"vector")])
+    store = TieredByteStore([FailingStore(), disk])
+
+    assert store.get_many(["k", "missing"]) == [b"vector", None]
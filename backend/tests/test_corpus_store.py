@@ -0,0 +1,84 @@
+"""Columnar corpus storage."""
+
+import asyncio
+
+import fakeredis
+
+from src.services.core_service.corpus_store import (
+    SUMMARY_FIELDS,
+    CorpusStore,
+    content_digest,
+)
+from src.services.core_service.main import CoreRetrieval
+from src.services.core_service.rag import HybridRAGService
+
+ITEMS = [
+    {"url": "https://example.com/a", "content": "first page", "date": "d1"},
+    {"url": "https://example.com/b", "content": "zweite Seite ü", "date": None},
+]
+
+
+def make_store() -> CorpusStore:
+    server = fakeredis.FakeServer()
+    return CorpusStore(
+        fakeredis.FakeRedis(server=server), fakeredis.FakeAsyncRedis(server=server)
+    )
+
+
+def test_save_and_load_round_trip():
+    store = make_store()
+    assert store.load("u1", "history") == []
+
+    store.save("u1", "history", ITEMS)
+    assert store.load("u1", "history") == ITEMS
+    assert asyncio.run(store.aload("u1", "history")) == ITEMS
+
+
+def test_staged_segments_publish_in_one_step():
+    store = make_store()
+    store.save("u1", "history", ITEMS[:1])
+    store.stage("u1", "history", "t1", ITEMS[1:])
+    store.stage("u1", "history", "t1", ITEMS[:1])
+
+    assert store.load("u1", "history") == ITEMS[:1]
+    assert store.load_staged("u1", "history", "t1") == [*ITEMS[1:], ITEMS[0]]
+    store.publish("u1", "history", "t1")
+    assert store.load("u1", "history") == [*ITEMS[1:], ITEMS[0]]
+    assert store.load("u1", "history", fields=["url"]) == [
+        {"url": ITEMS[1]["url"]},
+        {"url": ITEMS[0]["url"]},
+    ]
+
+    store.stage("u1", "history", "t2", ITEMS)
+    store.discard("u1", "history", "t2")
+    assert store.load_staged("u1", "history", "t2") == []
+
+
+def test_load_materializes_only_requested_fields():
+    store = make_store()
+    store.save("u1", "history", ITEMS)
+
+    assert store.load("u1", "history", fields=["url"]) == [
+        {"url": item["url"]} for item in ITEMS
+    ]
+    summary = store.load("u1", "history", fields=SUMMARY_FIELDS)
+    assert [row["digest"] for row in summary] == [
+        content_digest(item["content"]) for item in ITEMS
+    ]
+    assert all("content" not in row for row in summary)
+
+
+def test_merge_detects_changes_from_digests(llm_provider):
+    store = make_store()
+    store.save("u1", "history", ITEMS)
+    summary = store.load("u1", "history", fields=SUMMARY_FIELDS)
+    service = CoreRetrieval(
+        llm_client=llm_provider, rag=HybridRAGService(embedding_provider="local")
+    )
+
+    _, changed = service.merge_history(stored=summary, incoming=ITEMS)
+    assert changed == []
+
+    edited = {**ITEMS[0], "content": "first page, edited"}
+    _, changed = service.merge_history(stored=summary, incoming=[edited, ITEMS[1]])
+    assert changed == [edited]
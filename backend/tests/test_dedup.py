@@ -0,0 +1,45 @@
+"""URL canonicalization and duplicate collapsing."""
+
+from src.services.core_service.dedup import HistoryDeduplicator, canonicalize_url
+
+
+def test_tracking_ids_are_stripped():
+    url = "http://www.example.com/post/?utm_source=x&fbclid=1&gclid=2&page=2#top"
+    assert canonicalize_url(url) == "https://example.com/post?page=2"
+    assert canonicalize_url("https://m.example.com/post/amp") == canonicalize_url(
+        "https://example.com/post"
+    )
+
+
+def test_content_selecting_params_are_kept():
+    for param in ("ref=main", "si=42", "amp=1", "spm=a1"):
+        url = f"https://example.com/page?{param}"
+        assert canonicalize_url(url) != canonicalize_url("https://example.com/page")
+
+
+def test_malformed_urls_do_not_raise():
+    assert canonicalize_url("http://A.com:abc/x") == "https://a.com:abc/x"
+    assert canonicalize_url("http://a.com:99999/x") == "https://a.com:99999/x"
+    assert canonicalize_url("http://a.com:8080/x") == "https://a.com:8080/x"
+    assert canonicalize_url("http://[::1/x") == "http://[::1/x"
+    items = [
+        {"url": "http://a.com:abc/x", "content": "one"},
+        {"url": "http://[::1/x", "content": "two"},
+    ]
+    assert len(HistoryDeduplicator().collapse(items)) == 2
+
+
+def test_collapse_merges_url_and_content_duplicates():
+    text = " ".join(f"word{n} shared text of one page" for n in range(10))
+    items = [
+        {
+            "url": "https://example.com/a?utm_medium=mail",
+            "content": "short",
+            "date": "d1",
+        },
+        {"url": "https://example.com/a", "content": "short", "date": "d2"},
+        {"url": "https://one.example.com/b", "content": text},
+        {"url": "https://two.example.com/b", "content": text + " extra"},
+    ]
+    collapsed = HistoryDeduplicator().collapse(items)
+    assert len(collapsed) == 2
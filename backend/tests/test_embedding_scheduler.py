@@ -0,0 +1,49 @@
+"""Failure handling in the shared embedding scheduler."""
+
+import threading
+from concurrent.futures import TimeoutError
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from src.utility.embedding_scheduler import EmbeddingScheduler
+
+
+class LengthEmbeddings(Embeddings):
+    """Embeds each text as its length, optionally waiting for a release."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.release.set()
+
+    def embed_documents(self, texts):
+        self.release.wait()
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_dead_dispatcher_fails_waiters_and_restarts(monkeypatch):
+    scheduler = EmbeddingScheduler(LengthEmbeddings(), max_wait_ms=0)
+
+    def broken(tokens):
+        raise RuntimeError("limiter broke")
+
+    monkeypatch.setattr(scheduler.limiter, "acquire", broken)
+    with pytest.raises(RuntimeError, match="limiter broke"):
+        scheduler.embed_documents(["a", "bb"])
+
+    monkeypatch.undo()
+    assert scheduler.embed_documents(["a", "bb"]) == [[1.0], [2.0]]
+
+
+def test_callers_give_up_after_the_timeout():
+    embeddings = LengthEmbeddings()
+    embeddings.release.clear()
+    scheduler = EmbeddingScheduler(embeddings, max_wait_ms=0, timeout=0.1)
+
+    with pytest.raises(TimeoutError):
+        scheduler.embed_query("stuck")
+    embeddings.release.set()
+    assert scheduler.embed_query("abc") == [3.0]
@@ -0,0 +1,74 @@
+"""Fusion of per-signal hits into a parent ranking."""
+
+import pytest
+
+from src.services.core_service.fusion import RankFusion
+
+WEIGHTS = {"faiss": 1.0, "bm25": 1.0}
+
+
+@pytest.mark.parametrize("method", ["rank", "rrf", "zscore", "convex"])
+def test_parent_ranked_first_everywhere_wins(method):
+    fusion = RankFusion(method=method, dominance_margin=0.2)
+    signals = {
+        "faiss": [(0, 0.9), (0, 0.8), (1, 0.5), (2, 0.4)],
+        "bm25": [(0, 12.0), (2, 6.0), (1, 3.0)],
+    }
+    ranked = fusion.fuse(signals, WEIGHTS)
+
+    assert [parent.parent_id for parent in ranked][0] == 0
+    assert all(0.0 <= parent.score <= 1.0 for parent in ranked)
+    assert all(type(parent.score) is float for parent in ranked)
+    assert ranked[0].signal_ranks == {"faiss": 1, "bm25": 1}
+    assert fusion.dominates(ranked, [0.9, 0.5, 0.4])
+
+
+def test_rank_and_rrf_score_a_unanimous_winner_one():
+    signals = {"faiss": [(3, 0.7), (4, 0.6)], "bm25": [(3, 5.0), (4, 4.0)]}
+    for method in ("rank", "rrf"):
+        ranked = RankFusion(method=method).fuse(signals, WEIGHTS)
+        assert ranked[0].score == pytest.approx(1.0)
+
+
+def test_missed_parent_and_empty_signal():
+    fusion = RankFusion(method="convex")
+    ranked = fusion.fuse({"faiss": [(0, 0.9), (1, 0.3)], "bm25": []}, WEIGHTS)
+    assert [parent.parent_id for parent in ranked] == [0, 1]
+    assert set(ranked[0].signal_scores) == {"faiss"}
+
+    ranked = fusion.fuse({"faiss": [(0, 0.9)], "bm25": [(1, 4.0)]}, WEIGHTS)
+    assert {parent.parent_id: parent.signal_scores for parent in ranked} == {
+        0: {"faiss": 0.9, "bm25": None},
+        1: {"faiss": None, "bm25": 4.0},
+    }
+
+
+def test_sum_aggregation_rewards_several_matching_chunks():
+    signals = {"bm25": [(0, 5.0), (1, 4.0), (1, 3.0)]}
+    by_max = RankFusion(method="convex", aggregation="max").fuse(signals, WEIGHTS)
+    by_sum = RankFusion(method="convex", aggregation="sum").fuse(signals, WEIGHTS)
+    assert by_max[0].parent_id == 0
+    assert by_sum[0].parent_id == 1
+
+
+def test_dominance_needs_a_clear_similarity_gap():
+    fusion = RankFusion(dominance_margin=0.2)
+    # A large raw BM25 gap alone does not make a winner
+    close = fusion.fuse(
+        {"faiss": [(0, 0.9), (1, 0.85)], "bm25": [(0, 10.0), (1, 2.0)]}, WEIGHTS
+    )
+    assert not fusion.dominates(close, [0.9, 0.8])
+    assert fusion.dominates(close, [0.9, 0.6])
+    assert not fusion.dominates(close, [0.9, None])
+
+    split = {"faiss": [(0, 0.9), (1, 0.3)], "bm25": [(1, 10.0), (0, 2.0)]}
+    assert not fusion.dominates(fusion.fuse(split, WEIGHTS), [0.9, 0.1])
+
+    assert not fusion.dominates([], [])
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        RankFusion(method="borda")
+    with pytest.raises(ValueError):
+        RankFusion(aggregation="mean")
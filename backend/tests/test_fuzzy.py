@@ -0,0 +1,34 @@
+"""Parity of the indexed fuzzy matcher with difflib."""
+
+import random
+import difflib
+
+from src.services.core_service.fuzzy import FuzzyIndex
+
+LETTERS = "etaoinshrdlcumwfgypbvkjxqz"
+
+
+def test_fuzzy_closest_matches_difflib():
+    rng = random.Random(0)
+
+    def word():
+        return "".join(rng.choices(LETTERS, k=rng.randint(2, 12)))
+
+    def typo(text):
+        i = rng.randrange(len(text))
+        return rng.choice(
+            [
+                text[:i] + text[i + 1 :],
+                text[:i] + rng.choice(LETTERS) + text[i:],
+                text[:i] + rng.choice(LETTERS) + text[i + 1 :],
+            ]
+        )
+
+    vocabulary = sorted({word() for _ in range(2000)})
+    index = FuzzyIndex(vocabulary)
+    queries = [typo(rng.choice(vocabulary)) for _ in range(300)]
+    queries += [word() for _ in range(100)]
+    for cutoff in (0.8, 0.9):
+        for query in queries:
+            expected = difflib.get_close_matches(query, vocabulary, n=1, cutoff=cutoff)
+            assert index.closest(query, cutoff) == (expected[0] if expected else None)
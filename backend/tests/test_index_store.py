@@ -0,0 +1,156 @@
+"""Redis index persistence and the in-process LRU."""
+
+import os
+import time
+import asyncio
+import threading
+
+import fakeredis
+import pytest
+
+from src.models.core import Document
+from src.services.core_service.index_store import DiskIndexStore, IndexStore
+from src.services.core_service.rag import HybridIndex, HybridRAGService
+
+PAGES = [
+    Document(
+        page_content=f"page {n} about topic {n % 3} " * 10,
+        metadata={"source": f"https://example.com/{n}", "date": "Unknown"},
+    )
+    for n in range(6)
+]
+
+
+@pytest.fixture
+def rag() -> HybridRAGService:
+    return HybridRAGService(embedding_provider="local")
+
+
+@pytest.fixture
+def store() -> IndexStore:
+    server = fakeredis.FakeServer()
+    return IndexStore(
+        client=fakeredis.FakeRedis(server=server),
+        async_client=fakeredis.aioredis.FakeRedis(server=server),
+    )
+
+
+def test_payload_round_trips_without_pickle(rag):
+    index = rag.build_index(PAGES)
+    restored = HybridIndex.from_bytes(index.to_bytes(), rag.embeddings)
+
+    assert [p.metadata for p in restored.parents] == [p.metadata for p in PAGES]
+    assert isinstance(restored.parents[0], Document)
+    assert [d.id for d in restored.child_docs] == [d.id for d in index.child_docs]
+    assert restored.vectorstore.index.ntotal == index.vectorstore.index.ntotal
+    assert restored.vocabulary.words == index.vocabulary.words
+
+
+def test_read_only_loads_share_until_saved_again(rag, store):
+    store.save("u1", "history", rag.build_index(PAGES))
+    first = store.load("u1", "history", rag.embeddings)
+    assert store.load("u1", "history", rag.embeddings) is first
+    assert asyncio.run(store.aload("u1", "history", rag.embeddings)) is first
+
+    writable = store.load("u1", "history", rag.embeddings, writable=True)
+    assert writable is not first
+
+    store.save("u1", "history", rag.build_index(PAGES[:3]))
+    fresh = store.load("u1", "history", rag.embeddings)
+    assert fresh is not first
+    assert len(fresh.parents) == 3
+
+
+def test_version_change_from_another_worker_is_seen(rag, store):
+    store.save("u1", "history", rag.build_index(PAGES))
+    first = store.load("u1", "history", rag.embeddings)
+
+    other = IndexStore(client=store.client, async_client=store.async_client)
+    other.save("u1", "history", rag.build_index(PAGES[:2]))
+    assert len(store.load("u1", "history", rag.embeddings).parents) == 2
+    assert store.load("u1", "history", rag.embeddings) is not first
+
+
+def test_delete_drops_resident_index(rag, store):
+    store.save("u1", "history", rag.build_index(PAGES))
+    store.load("u1", "history", rag.embeddings)
+    store.delete("u1", "history")
+    assert store.load("u1", "history", rag.embeddings) is None
+    assert store.resident.resident_bytes == 0
+
+
+def version_dirs(folder):
+    return sorted(path.name for path in folder.iterdir() if path.is_dir())
+
+
+def age(path, seconds=3600):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_disk_save_keeps_replaced_versions_for_the_grace_period(rag, tmp_path):
+    store = DiskIndexStore(tmp_path, grace=60)
+    store.save("u1", "history", rag.build_index(PAGES))
+    folder = store.directory("u1", "history")
+    replaced = store._pointer(folder)
+    age(folder / replaced)
+
+    store.save("u1", "history", rag.build_index(PAGES[:2]))
+    # Just replaced, so a reader in another process may still be opening it
+    assert replaced in version_dirs(folder)
+    assert len(store.load("u1", "history", rag.embeddings).parents) == 2
+
+    age(folder / replaced)
+    second = store._pointer(folder)
+    store.save("u1", "history", rag.build_index(PAGES))
+    assert version_dirs(folder) == sorted([second, store._pointer(folder)])
+
+
+def test_disk_delete_keeps_the_lock_file(rag, tmp_path):
+    store = DiskIndexStore(tmp_path)
+    store.save("u1", "history", rag.build_index(PAGES))
+    folder = store.directory("u1", "history")
+    lock = (folder / "LOCK").stat().st_ino
+
+    store.delete("u1", "history")
+    assert store.load("u1", "history", rag.embeddings) is None
+    assert (folder / "LOCK").stat().st_ino == lock
+    store.save("u1", "history", rag.build_index(PAGES))
+    assert (folder / "LOCK").stat().st_ino == lock
+
+
+def test_concurrent_disk_saves_leave_one_live_version(rag, tmp_path):
+    index = rag.build_index(PAGES)
+    stores = [DiskIndexStore(tmp_path) for _ in range(4)]
+    threads = [
+        threading.Thread(target=store.save, args=("u1", "history", index))
+        for store in stores
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    folder = stores[0].directory("u1", "history")
+    assert stores[0]._pointer(folder) in version_dirs(folder)
+    assert stores[0].load("u1", "history", rag.embeddings) is not None
+
+
+def test_sweep_removes_expired_folders_only(rag, tmp_path):
+    store = DiskIndexStore(tmp_path, ttl=60)
+    index = rag.build_index(PAGES)
+    store.save("old", "history", index)
+    store.save("live", "history", index)
+    old = store.directory("old", "history")
+    live = store.directory("live", "history")
+    age(old / "CURRENT")
+    age(old / store._pointer(old))
+    # Left behind by a save that died before swapping CURRENT
+    (live / "interrupted").mkdir()
+    age(live / "interrupted")
+
+    assert store.sweep() == 1
+    assert version_dirs(old) == [] and (old / "LOCK").exists()
+    assert version_dirs(live) == [store._pointer(live)]
+    assert store.load("live", "history", rag.embeddings) is not None
@@ -0,0 +1,92 @@
+"""Incremental NDJSON upload parsing."""
+
+import json
+import asyncio
+
+import pytest
+
+from src.services.core_service.ingest import IngestError, NdjsonIngestor
+
+
+def lines(count: int) -> bytes:
+    return b"".join(
+        json.dumps({"url": f"https://example.com/{n}", "content": f"page {n}"}).encode()
+        + b"\n"
+        for n in range(count)
+    )
+
+
+async def chunked(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start : start + size]
+
+
+async def collect(ingestor: NdjsonIngestor, body: bytes, size: int = 7):
+    return [batch async for batch in ingestor.batches(chunked(body, size))]
+
+
+def test_batches_split_lines_across_chunks():
+    body = lines(5) + b"\n" + b'{"url": "https://example.com/last", "content": "x"}'
+    batches = asyncio.run(collect(NdjsonIngestor(batch_size=2), body))
+
+    assert [len(batch) for batch in batches] == [2, 2, 2]
+    assert batches[0][0] == {
+        "url": "https://example.com/0",
+        "content": "page 0",
+        "date": None,
+    }
+    assert batches[-1][-1]["url"] == "https://example.com/last"
+
+
+def test_invalid_line_names_its_number():
+    body = lines(2) + b'{"url": "https://example.com/x"}\n'
+    with pytest.raises(IngestError) as error:
+        asyncio.run(collect(NdjsonIngestor(), body))
+    assert "Line 3" in str(error.value)
+    assert "content" in str(error.value)
+    assert not error.value.too_large
+
+
+def test_overlong_line_is_too_large():
+    long_line = json.dumps({"url": "u", "content": "x" * 200}).encode()
+    ingestor = NdjsonIngestor(max_line_bytes=100)
+    for body in (long_line + b"\n", long_line):
+        with pytest.raises(IngestError) as error:
+            asyncio.run(collect(ingestor, body, size=16))
+        assert error.value.too_large
+
+
+def test_ingest_hands_every_batch_to_the_consumer():
+    handled = []
+
+    async def handle(batch):
+        await asyncio.sleep(0)
+        handled.append(len(batch))
+
+    ingestor = NdjsonIngestor(batch_size=3)
+    count = asyncio.run(ingestor.ingest(chunked(lines(7), 11), handle))
+    assert count == 7
+    assert handled == [3, 3, 1]
+
+
+def test_ingest_surfaces_consumer_errors():
+    async def handle(batch):
+        raise RuntimeError("store unavailable")
+
+    ingestor = NdjsonIngestor(batch_size=1, max_pending_batches=1)
+    with pytest.raises(RuntimeError, match="store unavailable"):
+        asyncio.run(ingestor.ingest(chunked(lines(10), 5), handle))
+
+
+def test_ingest_stops_handling_batches_after_a_bad_line():
+    handled = []
+
+    async def handle(batch):
+        await asyncio.sleep(0.01)
+        handled.append(len(batch))
+
+    ingestor = NdjsonIngestor(batch_size=2)
+    with pytest.raises(IngestError):
+        asyncio.run(ingestor.ingest(chunked(lines(5) + b"{}\n", 64), handle))
+    # The first batch was being handled; the queued second one is dropped
+    assert handled == [2]
@@ -0,0 +1,22 @@
+"""Access to the process-wide /v1/metrics counters."""
+
+import pytest
+from fastapi import HTTPException
+
+from src.controller import core_controller
+
+
+def test_metrics_are_disabled_without_a_token(monkeypatch):
+    monkeypatch.setattr(core_controller, "metrics_token", None)
+    with pytest.raises(HTTPException) as error:
+        core_controller.require_metrics_token("Bearer anything")
+    assert error.value.status_code == 404
+
+
+def test_metrics_need_the_configured_token(monkeypatch):
+    monkeypatch.setattr(core_controller, "metrics_token", "secret")
+    for header in (None, "Bearer wrong", "secret"):
+        with pytest.raises(HTTPException) as error:
+            core_controller.require_metrics_token(header)
+        assert error.value.status_code == 401
+    core_controller.require_metrics_token("Bearer secret")
@@ -0,0 +1,66 @@
+"""Local relevance decisions from retrieval metadata."""
+
+from langchain_core.documents import Document
+
+from src.services.core_service.rag import HybridRAGService
+from src.services.post_processing_service.relevance import LocalRelevanceScorer
+
+
+def candidate(similarity, retrieval_score):
+    return {
+        "content": "snippet",
+        "metadata": {"similarity": similarity, "retrieval_score": retrieval_score},
+    }
+
+
+def test_confident_scores_are_decided_locally():
+    scorer = LocalRelevanceScorer(threshold=0.35, margin=0.05)
+    top, strong, weak = candidate(0.9, 1.0), candidate(0.8, 0.9), candidate(0.0, 0.1)
+    assert scorer.filter([top, strong, weak]) == [top, strong]
+    assert scorer.stats.snapshot()["local"] == 1
+
+
+def test_ambiguous_or_missing_similarity_defers_to_the_judge():
+    scorer = LocalRelevanceScorer(threshold=0.35, margin=0.05)
+    top = candidate(0.9, 1.0)
+    assert scorer.filter([top, candidate(0.35, 0.35)]) is None
+    assert scorer.filter([top, candidate(None, 0.9)]) is None
+    assert scorer.stats.snapshot()["judged"] == 2
+
+
+def test_settle_keeps_ambiguous_candidates_without_the_judge():
+    scorer = LocalRelevanceScorer(threshold=0.35, margin=0.05)
+    top, unsure, weak = candidate(0.9, 1.0), candidate(0.35, 0.35), candidate(0, 0)
+    assert scorer.settle([top, unsure, weak]) == [top, unsure, weak]
+    assert scorer.settle([top, weak]) == [top]
+    assert scorer.stats.snapshot() == {"local": 2, "judged": 0, "skip_rate": 1.0}
+
+
+def test_retrieval_provides_similarity_without_embedding_pages(monkeypatch):
+    rag = HybridRAGService(embedding_provider="local")
+    pages = [
+        Document(
+            page_content=f"page {n} about topic {n % 4} " * 10,
+            metadata={"source": f"https://example.com/{n}"},
+        )
+        for n in range(8)
+    ]
+    index = rag.build_index(pages)
+
+    def fail(texts):
+        raise AssertionError("relevance scoring must not embed documents")
+
+    monkeypatch.setattr(rag.embeddings, "embed_documents", fail)
+    parents = rag.retrieve_parents("topic 2", index=index)
+    similarities = [parent.metadata["similarity"] for parent in parents]
+    assert all(-1.0 <= value <= 1.0 for value in similarities)
+    assert similarities[0] == max(similarities)
+
+
+def test_uncalibrated_providers_always_defer_to_the_judge(monkeypatch, caplog):
+    monkeypatch.delenv("RELEVANCE_THRESHOLD", raising=False)
+    scorer = LocalRelevanceScorer(provider="gemini")
+    assert scorer.threshold is None
+    assert "RELEVANCE_THRESHOLD" in caplog.text
+    assert scorer.filter([candidate(0.9, 1.0), candidate(0.0, 0.1)]) is None
+    assert LocalRelevanceScorer(provider="local").threshold == 0.35
@@ -0,0 +1,75 @@
+"""Exact re-ranking of quantized indexes from stored vectors."""
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.services.core_service.index_store import DiskIndexStore
+from src.services.core_service.rag import HybridIndex, HybridRAGService
+
+
+def make_pages(count: int, offset: int = 0):
+    return [
+        Document(
+            page_content=f"page {n} about topic {n % 7} and subject {n % 11} " * 12,
+            metadata={"source": f"https://example.com/{n}"},
+        )
+        for n in range(offset, offset + count)
+    ]
+
+
+def make_rag() -> HybridRAGService:
+    return HybridRAGService(
+        embedding_provider="local", quantization="sq8", rerank_factor=4
+    )
+
+
+def assert_aligned(rag: HybridRAGService, index: HybridIndex):
+    store = index.vectorstore
+    assert index.exact.shape[0] == store.index.ntotal
+    for position, doc_id in store.index_to_docstore_id.items():
+        text = store.docstore.search(doc_id).page_content
+        expected = rag.embeddings.embed_documents([text])[0]
+        assert np.allclose(index.exact[position], expected, atol=1e-3)
+
+
+def test_rerank_reads_stored_vectors(monkeypatch):
+    rag = make_rag()
+    index = rag.build_index(make_pages(40))
+    assert index.exact is not None
+
+    def fail(texts):
+        raise AssertionError("re-rank must not embed documents")
+
+    monkeypatch.setattr(rag.embeddings, "embed_documents", fail)
+    parents = rag.retrieve_parents("topic 3 subject 5", index=index)
+    assert parents
+
+
+def test_upsert_keeps_exact_rows_aligned():
+    rag = make_rag()
+    index = rag.build_index(make_pages(30))
+    changed = make_pages(3, offset=5)
+    for page in changed:
+        page.page_content = "rewritten " + page.page_content
+    index = rag.upsert_index(index, changed + make_pages(4, offset=30))
+    assert_aligned(rag, index)
+
+
+def test_disk_store_maps_exact_vectors(tmp_path):
+    rag = make_rag()
+    store = DiskIndexStore(tmp_path)
+    store.save("u1", "history", rag.build_index(make_pages(20)))
+
+    index = store.load("u1", "history", rag.embeddings)
+    assert isinstance(index.exact, np.memmap)
+    assert rag.retrieve_parents("topic 2", index=index)
+    writable = store.load("u1", "history", rag.embeddings, writable=True)
+    assert not isinstance(writable.exact, np.memmap)
+
+
+def test_bytes_round_trip_keeps_exact_vectors():
+    rag = make_rag()
+    index = rag.build_index(make_pages(10))
+    restored = HybridIndex.from_bytes(index.to_bytes(), rag.embeddings)
+    assert restored.exact.dtype == np.float16
+    assert np.array_equal(restored.exact, index.exact)
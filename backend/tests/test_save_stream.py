@@ -0,0 +1,181 @@
+"""Streamed NDJSON saves through the /v1/save-data-stream handler."""
+
+import json
+import time
+import asyncio
+import threading
+
+import fakeredis
+import pytest
+from fastapi import HTTPException
+
+from src.controller import core_controller
+from src.services.core_service.answer_cache import AnswerCache
+from src.services.core_service.corpus_store import CorpusStore
+from src.services.core_service.index_store import IndexStore
+from src.services.core_service.ingest import NdjsonIngestor
+from src.services.core_service.main import CoreRetrieval
+from src.services.core_service.rag import HybridRAGService, LLMRag
+from src.services.post_processing_service.post_processing import PostProcessing
+
+ITEMS = [
+    {
+        "url": f"https://example.com/{n % 5}",
+        "content": f"page {n % 5} about topic {n % 3} " * 10,
+        "date": f"day {n}",
+    }
+    for n in range(8)
+]
+
+
+def ndjson(items) -> bytes:
+    return b"".join(json.dumps(item).encode() + b"\n" for item in items)
+
+
+@pytest.fixture
+def stores(monkeypatch):
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    async_client = fakeredis.FakeAsyncRedis(server=server)
+    corpus = CorpusStore(client, async_client)
+    index = IndexStore(client, async_client)
+    monkeypatch.setattr(core_controller, "corpus_store", corpus)
+    monkeypatch.setattr(core_controller, "index_store", index)
+    monkeypatch.setattr(
+        core_controller, "answer_cache", AnswerCache(client, async_client)
+    )
+    monkeypatch.setattr(core_controller, "ingestor", NdjsonIngestor(batch_size=2))
+    return corpus, index
+
+
+@pytest.fixture
+def service(llm_provider) -> CoreRetrieval:
+    return CoreRetrieval(
+        llm_client=llm_provider,
+        post_processing=PostProcessing(llm_provider=llm_provider),
+        rag=HybridRAGService(embedding_provider="local", quantization="none"),
+        llm_rag=LLMRag(llm_provider=llm_provider),
+    )
+
+
+class StreamedRequest:
+    """Request whose body arrives in parts, running a check between them."""
+
+    def __init__(self, parts, between=None):
+        self.parts = parts
+        self.between = between
+
+    async def stream(self):
+        for number, part in enumerate(self.parts):
+            if number and self.between:
+                await self.between()
+            yield part
+
+
+def save(service, request, mode="replace"):
+    return asyncio.run(
+        core_controller.save_data_stream(
+            request=request, user_id="u1", flag="history", mode=mode, service=service
+        )
+    )
+
+
+def test_upload_is_published_only_after_the_body_ends(stores, service):
+    corpus, index_store = stores
+    save(service, StreamedRequest([ndjson(ITEMS[:2])]))
+    seen = []
+
+    async def check_stored():
+        index = index_store.load("u1", "history", service.rag.embeddings)
+        seen.append((corpus.load("u1", "history"), len(index.parents)))
+
+    request = StreamedRequest([ndjson(ITEMS[2:4]), ndjson(ITEMS[4:])], check_stored)
+    result = save(service, request)
+
+    assert seen == [(ITEMS[:2], 2)]
+    assert result["received"] == result["updated"] == len(ITEMS) - 2
+    assert corpus.load("u1", "history") == ITEMS[2:]
+    index = index_store.load("u1", "history", service.rag.embeddings)
+    # Duplicates across batches collapse just as in a single build
+    full = service.build_index(ITEMS[2:], flag="history")
+    assert [p.metadata["source"] for p in index.parents] == (
+        [p.metadata["source"] for p in full.parents]
+    )
+    assert len(index.child_docs) == len(full.child_docs)
+
+
+def test_batches_do_not_reload_the_corpus(stores, service, monkeypatch):
+    corpus, _ = stores
+    save(service, StreamedRequest([ndjson(ITEMS[:4])]))
+    loads = []
+    store_load = corpus.load
+
+    def counted_load(*args, **kwargs):
+        loads.append(kwargs.get("fields"))
+        return store_load(*args, **kwargs)
+
+    monkeypatch.setattr(corpus, "load", counted_load)
+    edited = [{**item, "content": "rewritten page " * 10} for item in ITEMS[4:]]
+    parts = [ndjson(edited[n : n + 2]) for n in range(0, len(edited), 2)]
+    result = save(service, StreamedRequest(parts), "upsert")
+
+    # Digests are read once up front and the merge at commit reads the
+    # corpus, however many batches arrive
+    assert loads == [
+        core_controller.SUMMARY_FIELDS,
+        core_controller.SUMMARY_FIELDS,
+        None,
+    ]
+    assert result["updated"] == len(edited)
+
+
+def test_bad_line_saves_nothing(stores, service):
+    corpus, index_store = stores
+    save(service, StreamedRequest([ndjson(ITEMS[:2])]))
+    request = StreamedRequest([ndjson(ITEMS[2:6]) + b'{"url": "x"}\n'])
+
+    with pytest.raises(HTTPException) as error:
+        save(service, request)
+    assert error.value.status_code == 400
+    assert "nothing was saved" in error.value.detail
+    assert corpus.load("u1", "history") == ITEMS[:2]
+    index = index_store.load("u1", "history", service.rag.embeddings)
+    assert len(index.parents) == 2
+    assert not corpus.client.keys("*staging*")
+
+
+def test_streamed_upsert_merges_every_batch(stores, service):
+    corpus, _ = stores
+    save(service, StreamedRequest([ndjson(ITEMS[:4])]))
+    edited = {**ITEMS[1], "content": "rewritten page " * 10}
+
+    result = save(service, StreamedRequest([ndjson([ITEMS[0], edited])]), "upsert")
+    assert result["updated"] == 1
+    assert corpus.load("u1", "history") == [ITEMS[0], edited, *ITEMS[2:4]]
+
+
+def test_concurrent_upserts_keep_both_changes(stores, service, monkeypatch):
+    corpus, _ = stores
+    save(service, StreamedRequest([ndjson(ITEMS[:4])]))
+    store_save = corpus.save
+
+    def slow_save(*args):
+        # Widen the window between loading and saving the corpus
+        time.sleep(0.1)
+        store_save(*args)
+
+    monkeypatch.setattr(corpus, "save", slow_save)
+    edits = [{**ITEMS[n], "content": f"rewritten page {n} " * 10} for n in (1, 2)]
+    threads = [
+        threading.Thread(
+            target=core_controller._save_history,
+            args=(service, "u1", "history", "upsert", [edit]),
+        )
+        for edit in edits
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert corpus.load("u1", "history") == [ITEMS[0], *edits, ITEMS[3]]
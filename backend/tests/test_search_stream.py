@@ -0,0 +1,194 @@
+"""End-to-end search over a real index with offline embeddings."""
+
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.models.core import SearchRequest, SearchResponse
+from src.services.core_service.fusion import RankFusion
+from src.services.core_service.main import CoreRetrieval
+from src.services.core_service.rag import HybridRAGService, LLMRag
+from src.services.post_processing_service.post_processing import PostProcessing
+from src.services.post_processing_service.relevance import LocalRelevanceScorer
+
+HISTORY = [
+    {
+        "url": "https://doc.rust-lang.org/book/ownership",
+        "content": "Rust ownership, rust ownership rules",
+        "date": "Sun, Oct 18, 2026",
+    },
+    {
+        "url": "https://doc.rust-lang.org/book/borrowing",
+        "content": "Rust borrowing, references and ownership of values",
+        "date": "Sat, Oct 17, 2026",
+    },
+    {
+        "url": "https://example.com/sourdough",
+        "content": "Sourdough bread starter feeding schedule",
+        "date": "Fri, Oct 16, 2026",
+    },
+]
+
+
+def make_service(llm_provider) -> CoreRetrieval:
+    # A margin of one never marks a winner, so the judge step always runs
+    rag = HybridRAGService(
+        embedding_provider="local", fusion=RankFusion(dominance_margin=1.0)
+    )
+    return CoreRetrieval(
+        llm_client=llm_provider,
+        post_processing=PostProcessing(llm_provider=llm_provider),
+        rag=rag,
+        llm_rag=LLMRag(llm_provider=llm_provider),
+    )
+
+
+def test_stream_events_are_json_serializable(llm_provider):
+    service = make_service(llm_provider)
+    index = service.build_index(HISTORY, flag="history")
+    request = SearchRequest(userId="u1", query="rust ownership", flag="history")
+
+    events = list(service.stream_rag(data=request, index=index))
+    payloads = [json.loads(json.dumps(event)) for event in events]
+    steps = [payload["step"] for payload in payloads]
+    tokens = [p["data"]["text"] for p in payloads if p["step"] == "llm_token"]
+    assert tokens and all(tokens)
+    assert steps.index("retrieved_parents") < steps.index("llm_token")
+    assert max(n for n, step in enumerate(steps) if step == "llm_token") < (
+        steps.index("llm_response")
+    )
+
+    final = payloads[-1]
+    assert final["step"] == "final"
+    response = SearchResponse(**final["data"])
+    response.model_dump_json()
+    sources = [doc["metadata"]["source"] for doc in final["data"]["docs"]]
+    assert len(sources) >= 2
+    signals = final["data"]["docs"][0]["metadata"]["signal_scores"]
+    assert set(signals) == {"faiss", "bm25"}
+    assert any("content blocks" in prompt for prompt in llm_provider.model.prompts)
+
+
+def test_dominant_winner_keeps_other_relevant_pages(llm_provider):
+    service = make_service(llm_provider)
+    service.rag.fusion = RankFusion()
+    service.post_processing.relevance = LocalRelevanceScorer(provider="local")
+    index = service.build_index(HISTORY, flag="history")
+    rust_pages = {item["url"] for item in HISTORY[:2]}
+
+    for query, dominant in (("rust", False), ("rust ownership", True)):
+        llm_provider.model.prompts.clear()
+        parents = service.rag.retrieve_parents(query, index=index)
+        assert parents[0].metadata["dominant"] is dominant
+
+        request = SearchRequest(userId="u1", query=query, flag="history")
+        response = service.invoke_rag(data=request, index=index)
+        sources = {doc["metadata"]["source"] for doc in response.docs}
+        assert rust_pages <= sources
+        judged = any("content blocks" in p for p in llm_provider.model.prompts)
+        assert judged is not dominant
+
+
+def test_async_search_keeps_cpu_work_off_the_event_loop(llm_provider, monkeypatch):
+    service = make_service(llm_provider)
+    threads = {}
+
+    def spy(owner, name):
+        method = getattr(owner, name)
+
+        def wrapper(*args, **kwargs):
+            threads[name] = threading.current_thread()
+            return method(*args, **kwargs)
+
+        monkeypatch.setattr(owner, name, wrapper)
+
+    spy(service, "_build_parent_documents")
+    spy(service.rag, "_build_child_documents")
+    spy(service.rag, "_assemble_index")
+    spy(service.rag, "_semantic_search")
+    spy(service.rag, "_rank_parents")
+    request = SearchRequest(userId="u1", query="rust ownership", flag="history")
+
+    async def run():
+        return [event async for event in service.astream_rag(request, HISTORY)]
+
+    events = asyncio.run(run())
+    assert events[-1]["step"] == "final"
+    assert all(e["data"]["text"] for e in events if e["step"] == "llm_token")
+    assert set(threads) == {
+        "_build_parent_documents",
+        "_build_child_documents",
+        "_assemble_index",
+        "_semantic_search",
+        "_rank_parents",
+    }
+    assert threading.main_thread() not in threads.values()
+
+
+def test_closing_after_dominant_step_cancels_summary(llm_provider):
+    service = make_service(llm_provider)
+    index = service.build_index(HISTORY, flag="history")
+    parents = service.rag.retrieve_parents("rust ownership", index=index)
+    parents[0].metadata["dominant"] = True
+    started = asyncio.Event()
+
+    async def slow_summary(**kwargs):
+        started.set()
+        await asyncio.sleep(60)
+
+    service.llm_rag.asafe_invoke_llm_response = slow_summary
+
+    async def run():
+        steps = service._aanswer_steps("rust ownership", "history", parents)
+        step, _ = await steps.__anext__()
+        assert step == "post_processing"
+        await started.wait()
+        await steps.aclose()
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        await asyncio.sleep(0)
+        return [t for t in pending if not t.done()]
+
+    assert asyncio.run(run()) == []
+
+
+def test_closing_sync_steps_cancels_queued_and_streaming_work(llm_provider):
+    executor = ThreadPoolExecutor(max_workers=1)
+    service = make_service(llm_provider)
+    service.executor = executor
+    index = service.build_index(HISTORY, flag="history")
+    parents = service.rag.retrieve_parents("rust ownership", index=index)
+    parents[0].metadata["dominant"] = True
+
+    # Keep the only worker busy so the summary step stays queued
+    release = threading.Event()
+    executor.submit(release.wait)
+    steps = service._answer_steps("rust ownership", "history", parents)
+    assert next(steps)[0] == "post_processing"
+    steps.close()
+    release.set()
+    executor.shutdown(wait=True)
+    assert llm_provider.model.prompts == []
+
+    sent = []
+    resume = threading.Event()
+
+    def stream_summary(on_token, **kwargs):
+        on_token("first")
+        resume.wait(5)
+        for n in range(10):
+            on_token(f"token{n}")
+            sent.append(n)
+        return "done", "fake"
+
+    service.executor = ThreadPoolExecutor(max_workers=1)
+    service.llm_rag.stream_llm_response = stream_summary
+    steps = service._answer_steps(
+        "rust ownership", "history", parents, stream_tokens=True
+    )
+    assert next(steps)[0] == "post_processing"
+    assert next(steps)[0] == "llm_token"
+    steps.close()
+    resume.set()
+    service.executor.shutdown(wait=True)
+    assert sent == []
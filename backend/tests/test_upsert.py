@@ -0,0 +1,142 @@
+"""Incremental index updates."""
+
+import faiss
+from langchain_core.documents import Document
+
+from src.services.core_service.main import CoreRetrieval
+from src.services.core_service.rag import (
+    RETRAIN_GROWTH,
+    HybridIndex,
+    HybridRAGService,
+    LLMRag,
+)
+from src.services.post_processing_service.post_processing import PostProcessing
+
+
+def make_pages(count: int, offset: int = 0):
+    return [
+        Document(
+            page_content=f"page {n} about topic {n % 7} and subject {n % 11} " * 12,
+            metadata={"source": f"https://example.com/{n}"},
+        )
+        for n in range(offset, offset + count)
+    ]
+
+
+def test_upsert_retrains_outgrown_quantizer():
+    rag = HybridRAGService(embedding_provider="local", quantization="sq8")
+    index = rag.build_index(make_pages(10))
+    first = index.vectorstore.index
+    trained_on = index.trained_on
+    assert trained_on == first.ntotal
+
+    index = rag.upsert_index(index, make_pages(2, offset=10))
+    assert index.vectorstore.index is first
+
+    grown = make_pages(RETRAIN_GROWTH * 10, offset=12)
+    index = rag.upsert_index(index, grown)
+    assert index.vectorstore.index is not first
+    assert index.trained_on == len(index.child_docs) > RETRAIN_GROWTH * trained_on
+    assert isinstance(index.vectorstore.index, faiss.IndexScalarQuantizer)
+
+
+def test_flat_index_is_never_retrained():
+    rag = HybridRAGService(embedding_provider="local", quantization="none")
+    index = rag.build_index(make_pages(5))
+    first = index.vectorstore.index
+    assert index.trained_on == 0
+
+    index = rag.upsert_index(index, make_pages(30, offset=5))
+    assert index.vectorstore.index is first
+    assert first.ntotal == len(index.child_docs)
+
+
+ARTICLE = " ".join(
+    f"paragraph {n} on rust ownership borrowing lifetimes and the borrow checker"
+    for n in range(12)
+)
+
+
+def grouped_sources(index):
+    return sorted(
+        sorted([parent.metadata["source"]] + parent.metadata["aliases"])
+        for parent in index.parents
+        if parent.page_content
+    )
+
+
+def test_upsert_collapses_near_duplicates_like_a_full_build(llm_provider):
+    service = CoreRetrieval(
+        llm_client=llm_provider,
+        post_processing=PostProcessing(llm_provider=llm_provider),
+        rag=HybridRAGService(embedding_provider="local", quantization="none"),
+        llm_rag=LLMRag(llm_provider=llm_provider),
+    )
+    stored = [
+        {"url": "https://blog.example.com/rust", "content": ARTICLE, "date": "d1"},
+        {"url": "https://example.com/bread", "content": "sourdough " * 30},
+    ]
+    incoming = [
+        {"url": "https://mirror.example.org/rust", "content": ARTICLE + " end"},
+    ]
+    index = service.build_index(stored, flag="history")
+    corpus, changed = service.merge_history(stored, incoming)
+
+    index = service.upsert_index(index, changed, flag="history", corpus=corpus)
+    full = service.build_index(corpus, flag="history")
+
+    assert grouped_sources(index) == grouped_sources(full)
+    assert len(index.child_docs) == len(full.child_docs)
+
+
+def count_embedded(rag, monkeypatch):
+    embedded = []
+    embed = rag.embeddings.embed_documents
+
+    def spy(texts):
+        embedded.extend(texts)
+        return embed(texts)
+
+    monkeypatch.setattr(rag.embeddings, "embed_documents", spy)
+    return embedded
+
+
+def test_ivf_upsert_embeds_only_new_chunks(monkeypatch):
+    rag = HybridRAGService(
+        embedding_provider="local", quantization="none", ann_min_chunks=100
+    )
+    index = rag.build_index(make_pages(60))
+    ivf = index.vectorstore.index
+    assert rag._is_ivf(index.vectorstore)
+    embedded = count_embedded(rag, monkeypatch)
+
+    changed = make_pages(2, offset=5)
+    for page in changed:
+        page.page_content = "rewritten sourdough " + page.page_content
+    index = rag.upsert_index(index, changed + make_pages(1, offset=60))
+
+    assert index.vectorstore.index is ivf
+    assert len(embedded) == sum(
+        1 for child in index.child_docs if child.metadata["parent_id"] in (5, 6, 60)
+    )
+    assert ivf.ntotal == len(index.child_docs)
+    restored = HybridIndex.from_bytes(index.to_bytes(), rag.embeddings)
+    for current in (index, restored):
+        top = rag.retrieve_parents("rewritten sourdough page 5", index=current)[0]
+        assert top.metadata["source"] == "https://example.com/5"
+
+
+def test_retraining_reuses_stored_vectors(monkeypatch):
+    rag = HybridRAGService(
+        embedding_provider="local", quantization="none", ann_min_chunks=100
+    )
+    index = rag.build_index(make_pages(40))
+    assert not rag._is_ivf(index.vectorstore)
+    embedded = count_embedded(rag, monkeypatch)
+
+    new_pages = make_pages(15, offset=40)
+    index = rag.upsert_index(index, new_pages)
+    assert rag._is_ivf(index.vectorstore)
+    assert index.trained_on == len(index.child_docs)
+    new_chunks = [c for c in index.child_docs if c.metadata["parent_id"] >= 40]
+    assert len(embedded) == len(new_chunks)
@@ -21,6 +21,16 @@ const initialState = {
   finalReceived: false,
 };
 
+// Early stream events carry result previews; shape them like final docs
+const previewToDoc = (preview) => ({
+  content: preview.snippet || "",
+  metadata: {
+    source: preview.url,
+    title: preview.title || "",
+    date: preview.date,
+  },
+});
+
 const userReducer = (state, action) => {
   switch (action.type) {
     case "SET_STATE":
@@ -110,6 +120,7 @@ const UserState = ({ children }) => {
         const reader = response.body.getReader();
         const decoder = new TextDecoder("utf-8");
         let buffer = "";
+        let streamedText = "";
 
         while (true) {
           const { value, done } = await reader.read();
@@ -136,6 +147,7 @@ const UserState = ({ children }) => {
 
             if (step === "retrieved_parents") {
               const count = data.count || 0;
+              setState({ docs: (data.docs || []).map(previewToDoc) });
               setState({
                 step: {
                   step,
@@ -144,6 +156,16 @@ const UserState = ({ children }) => {
                 },
               });
               setState({ noti: `Retrieved ${count} sources...` });
+            } else if (step === "llm_token") {
+              streamedText += data.text || "";
+              setState({
+                step: {
+                  step: "llm_response",
+                  title: "LLM Response",
+                  content: streamedText,
+                },
+                noti: "Generating response...",
+              });
             } else if (step === "llm_response") {
               setState({
                 step: {
@@ -170,6 +192,7 @@ const UserState = ({ children }) => {
               });
             } else if (step === "post_processing") {
               const validatedDocs = data.validated_docs || 0;
+              setState({ docs: (data.docs || []).map(previewToDoc) });
               setState({
                 step: {
                   step,